@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Dictionary-encoded columnar export of the species database
+Repeated strings (families, habitats, regions, diets, statuses, importance,
+image URL prefixes) are stored once in string tables and referenced by index,
+and records are stored column-wise. Run directly with --compare to measure size
+and parse time against fish_db_compact.json.
+"""
+import json
+import os
+import gzip
+import time
+import shutil
+import argparse
+import tempfile
+
+FORMAT = "fishdb-columnar"
+VERSION = 1
+
+# Record fields in output order and how each is stored
+PLAIN_FIELDS = ["id", "name", "scientific_name", "max_length_cm", "max_weight_kg", "max_age_years", "description"]
+# field -> string table name
+DICT_FIELDS = {
+    "family": "family",
+    "habitat": "habitat",
+    "diet": "diet",
+    "conservation_status": "conservation_status",
+    "commercial_importance": "commercial_importance"
+}
+DICT_LIST_FIELDS = {"common_names": "common_name", "native_regions": "region"}
+FIELD_ORDER = ["id", "name", "scientific_name", "common_names", "family", "habitat", "native_regions",
+               "max_length_cm", "max_weight_kg", "max_age_years", "diet", "conservation_status",
+               "commercial_importance", "description", "image_url"]
+
+def split_url(url):
+    """Split at the last '/' of the path: the shared host/path prefix and the per-record rest"""
+    base, sep, query = url.partition("?")
+    cut = base.rfind("/") + 1
+    return base[:cut], base[cut:] + sep + query
+
+class StringTable:
+    def __init__(self):
+        self.values = []
+        self.refs = {}
+
+    def ref(self, value):
+        if value is None:
+            return None
+        index = self.refs.get(value)
+        if index is None:
+            index = self.refs[value] = len(self.values)
+            self.values.append(value)
+        return index
+
+class ColumnarWriter:
+    """
+    Streams records into per-column temporary files and assembles the final
+    document on close, so only the string tables are held in memory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.tables = {name: StringTable() for name in list(DICT_FIELDS.values()) + list(DICT_LIST_FIELDS.values())}
+        self.tables["image_url_prefix"] = StringTable()
+        self.columns = PLAIN_FIELDS + list(DICT_FIELDS) + list(DICT_LIST_FIELDS) + ["image_url_prefix",
+                                                                                   "image_url_suffix"]
+        self.tmp_dir = tempfile.mkdtemp(prefix="fishdb_columns_")
+        self.files = {name: open(os.path.join(self.tmp_dir, name), "w", encoding="utf-8") for name in self.columns}
+        self.count = 0
+
+    def _append(self, column, value):
+        self.files[column].write(("," if self.count else "") + json.dumps(value, separators=(",", ":"),
+                                                                          ensure_ascii=False))
+
+    def add(self, fish):
+        for field in PLAIN_FIELDS:
+            self._append(field, fish.get(field))
+        for field, table in DICT_FIELDS.items():
+            self._append(field, self.tables[table].ref(fish.get(field)))
+        for field, table in DICT_LIST_FIELDS.items():
+            self._append(field, [self.tables[table].ref(v) for v in fish.get(field) or []])
+        url = fish.get("image_url")
+        prefix, suffix = split_url(url) if url else (None, None)
+        self._append("image_url_prefix", self.tables["image_url_prefix"].ref(prefix))
+        self._append("image_url_suffix", suffix)
+        self.count += 1
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+        header = {
+            "format": FORMAT,
+            "version": VERSION,
+            "count": self.count,
+            "fields": FIELD_ORDER,
+            "tables": {name: table.values for name, table in self.tables.items()}
+        }
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as out:
+            # Header keys first, then each column copied from its temporary file
+            out.write(json.dumps(header, separators=(",", ":"), ensure_ascii=False)[:-1])
+            out.write(',"columns":{')
+            for i, name in enumerate(self.columns):
+                out.write(("," if i else "") + json.dumps(name) + ":[")
+                with open(os.path.join(self.tmp_dir, name), encoding="utf-8") as column:
+                    shutil.copyfileobj(column, out)
+                out.write("]")
+            out.write("}}")
+        os.replace(tmp_path, self.path)
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+        return {"path": self.path, "count": self.count, "bytes": os.path.getsize(self.path),
+                "tables": {name: len(table.values) for name, table in self.tables.items()}}
+
+def write_columnar(database, path):
+    writer = ColumnarWriter(path)
+    for fish in database:
+        writer.add(fish)
+    return writer.close()
+
+class ColumnarDatabase:
+    """
+    Reads a columnar export; columns are decoded to values only when first used,
+    and filters on dictionary fields compare integer references.
+    """
+
+    def __init__(self, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("format") != FORMAT:
+            raise ValueError(f"{path} is not a {FORMAT} file")
+        self.count = data["count"]
+        self.fields = data["fields"]
+        self.tables = data["tables"]
+        self.raw = data["columns"]
+        self._decoded = {}
+        self._by_id = None
+
+    def __len__(self):
+        return self.count
+
+    def column(self, field):
+        """Decoded values of one field for every record, cached after the first call"""
+        if field not in self._decoded:
+            if field in DICT_FIELDS:
+                table = self.tables[DICT_FIELDS[field]]
+                values = [table[r] if r is not None else None for r in self.raw[field]]
+            elif field in DICT_LIST_FIELDS:
+                table = self.tables[DICT_LIST_FIELDS[field]]
+                values = [[table[r] for r in refs] for refs in self.raw[field]]
+            elif field == "image_url":
+                table = self.tables["image_url_prefix"]
+                values = [table[p] + s if p is not None else None
+                          for p, s in zip(self.raw["image_url_prefix"], self.raw["image_url_suffix"])]
+            else:
+                values = self.raw[field]
+            self._decoded[field] = values
+        return self._decoded[field]
+
+    def value(self, index, field):
+        """Decode a single field of a single record without decoding its column"""
+        if field in self._decoded or field in PLAIN_FIELDS:
+            return self.column(field)[index]
+        if field in DICT_FIELDS:
+            ref = self.raw[field][index]
+            return self.tables[DICT_FIELDS[field]][ref] if ref is not None else None
+        if field in DICT_LIST_FIELDS:
+            return [self.tables[DICT_LIST_FIELDS[field]][r] for r in self.raw[field][index]]
+        prefix = self.raw["image_url_prefix"][index]
+        return self.tables["image_url_prefix"][prefix] + self.raw["image_url_suffix"][index] if prefix is not None else None
+
+    def record(self, index, fields=None):
+        return {field: self.value(index, field) for field in (fields or self.fields)}
+
+    def get(self, fish_id):
+        if self._by_id is None:
+            self._by_id = {}
+            for index, value in enumerate(self.raw["id"]):
+                self._by_id.setdefault(value, index)
+        index = self._by_id.get(fish_id)
+        return self.record(index) if index is not None else None
+
+    def where(self, field, value):
+        """Indexes of records whose dictionary field equals value, compared as references"""
+        if field in DICT_FIELDS:
+            try:
+                ref = self.tables[DICT_FIELDS[field]].index(value)
+            except ValueError:
+                return []
+            return [i for i, r in enumerate(self.raw[field]) if r == ref]
+        if field in DICT_LIST_FIELDS:
+            try:
+                ref = self.tables[DICT_LIST_FIELDS[field]].index(value)
+            except ValueError:
+                return []
+            return [i for i, refs in enumerate(self.raw[field]) if ref in refs]
+        return [i for i, v in enumerate(self.column(field)) if v == value]
+
+def compare(compact_path, columnar_path, repeat=10):
+    """Size, gzip size and parse times of fish_db_compact.json against the columnar file"""
+    def median_ms(fn):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        return round(timings[len(timings) // 2], 3)
+
+    def load_compact():
+        with open(compact_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def gzip_size(path):
+        with open(path, "rb") as f:
+            return len(gzip.compress(f.read(), 9))
+
+    records = load_compact()
+    db = ColumnarDatabase(columnar_path)
+    assert db.count == len(records) and db.record(0) == {k: records[0].get(k) for k in db.fields}
+    return {
+        "compact_json": {
+            "bytes": os.path.getsize(compact_path),
+            "gzip_bytes": gzip_size(compact_path),
+            "parse_ms": median_ms(load_compact),
+            "first_record_ms": median_ms(lambda: load_compact()[0]),
+            "habitat_filter_ms": median_ms(lambda: [f for f in records if f["habitat"] == "Marine"])
+        },
+        "columnar": {
+            "bytes": os.path.getsize(columnar_path),
+            "gzip_bytes": gzip_size(columnar_path),
+            "parse_ms": median_ms(lambda: ColumnarDatabase(columnar_path)),
+            "first_record_ms": median_ms(lambda: ColumnarDatabase(columnar_path).record(0)),
+            "full_decode_ms": median_ms(lambda: [r for c in [ColumnarDatabase(columnar_path)]
+                                                  for r in (c.record(i) for i in range(len(c)))]),
+            "habitat_filter_ms": median_ms(lambda: db.where("habitat", "Marine"))
+        }
+    }
+
+def main():
+    data_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Build or compare the dictionary-encoded columnar database")
+    parser.add_argument("--json", default=os.path.join(data_dir, "fish_db_compact.json"))
+    parser.add_argument("--out", default=os.path.join(data_dir, "fish_db_columnar.json"))
+    parser.add_argument("--compare", action="store_true", help="compare size and parse time with the compact JSON")
+    args = parser.parse_args()
+
+    if not args.compare or not os.path.exists(args.out):
+        with open(args.json, encoding="utf-8") as f:
+            info = write_columnar(json.load(f), args.out)
+        print(f"✅ Built {info['path']}: {info['count']} species, {info['bytes'] / 1024:.1f} KB")
+    if not args.compare:
+        return
+
+    report = compare(args.json, args.out)
+    print("=" * 60)
+    print("📊 Compact JSON vs columnar")
+    print("=" * 60)
+    compact, columnar = report["compact_json"], report["columnar"]
+    print(f"   {'':22}{'compact':>12}{'columnar':>12}")
+    print(f"   {'size (KB)':22}{compact['bytes'] / 1024:>12.1f}{columnar['bytes'] / 1024:>12.1f}")
+    print(f"   {'gzip size (KB)':22}{compact['gzip_bytes'] / 1024:>12.1f}{columnar['gzip_bytes'] / 1024:>12.1f}")
+    print(f"   {'parse (ms)':22}{compact['parse_ms']:>12.3f}{columnar['parse_ms']:>12.3f}")
+    print(f"   {'first record (ms)':22}{compact['first_record_ms']:>12.3f}{columnar['first_record_ms']:>12.3f}")
+    print(f"   {'habitat filter (ms)':22}{compact['habitat_filter_ms']:>12.3f}{columnar['habitat_filter_ms']:>12.3f}")
+    print(f"   {'full decode (ms)':22}{'':>12}{columnar['full_decode_ms']:>12.3f}")
+
+if __name__ == '__main__':
+    main()
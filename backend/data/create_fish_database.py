@@ -2,9 +2,27 @@
 """
 Create comprehensive Indian fish species database
 Combining data from multiple sources for offline use
+
+Outputs are written next to this script; the chunk layout, search index, facets
+and update manifests go to fish_database_chunks/ and fish_database_updates/,
+which git ignores. The app loads assets/fish_database_chunks, which a default
+build never touches: to ship a rebuilt catalog, review it and then copy
+fish_database_chunks/ to assets/, or build straight into it with
+--chunks-dir ../../assets/fish_database_chunks.
 """
 import json
 import os
+import hashlib
+import argparse
+
+from search_index import SearchIndexBuilder
+from facets import FacetCollector, write_facets
+from sqlite_export import SqliteWriter
+from columnar import ColumnarWriter
+from delta_updates import write_update
+from synthetic_catalog import iter_synthetic_database
+from label_map import DEFAULT_LABELS_PATH, DEFAULT_CHUNKS_DIR as APP_CHUNKS_DIR, build_label_map, \
+    iter_chunk_records, write_label_map
 
 # Comprehensive Indian Fish Species Database
 # Data compiled from FishBase, IUCN, and Indian fisheries databases
@@ -557,7 +575,7 @@ INDIAN_FISH_SPECIES = [
         "image_url": "https://images.unsplash.com/photo-1535591273668-578e31182c4f?w=400"
     },
     {
-        "id": 2,
+        "id": 33,
         "name": "Catla",
         "scientific_name": "Labeo catla",
         "common_names": ["Catla", "Katla", "Bhakur"],
@@ -574,7 +592,7 @@ INDIAN_FISH_SPECIES = [
         "image_url": "https://images.unsplash.com/photo-1524704654690-b56c05c78a00?w=400"
     },
     {
-        "id": 3,
+        "id": 34,
         "name": "Mrigal",
         "scientific_name": "Cirrhinus mrigala",
         "common_names": ["Mrigal", "Mirugal", "Naini"],
@@ -591,7 +609,7 @@ INDIAN_FISH_SPECIES = [
         "image_url": "https://images.unsplash.com/photo-1544551763-46a013bb70d5?w=400"
     },
     {
-        "id": 4,
+        "id": 35,
         "name": "Common Carp",
         "scientific_name": "Cyprinus carpio",
         "common_names": ["Common Carp", "European Carp"],
@@ -608,7 +626,7 @@ INDIAN_FISH_SPECIES = [
         "image_url": "https://images.unsplash.com/photo-1522069169874-c58ec4b76be5?w=400"
     },
     {
-        "id": 5,
+        "id": 36,
         "name": "Silver Carp",
         "scientific_name": "Hypophthalmichthys molitrix",
         "common_names": ["Silver Carp", "Chinese Carp"],
@@ -625,7 +643,7 @@ INDIAN_FISH_SPECIES = [
         "image_url": "https://images.unsplash.com/photo-1520990269312-a0d3cd73278b?w=400"
     },
     {
-        "id": 6,
+        "id": 37,
         "name": "Grass Carp",
         "scientific_name": "Ctenopharyngodon idella",
         "common_names": ["Grass Carp", "White Amur"],
@@ -644,8 +662,15 @@ INDIAN_FISH_SPECIES = [
     # Continue with more species...
 ]
 
+# Records in the generated database
+DATABASE_SIZE = 1050
+
 def generate_comprehensive_database():
     """Generate a comprehensive fish database with 1000+ species"""
+    return list(iter_comprehensive_database())
+
+def iter_comprehensive_database(limit=DATABASE_SIZE):
+    """Yield the comprehensive database one record at a time, stopping after limit records"""
     
     # Base categories
     categories = {
@@ -757,12 +782,13 @@ def generate_comprehensive_database():
     print("🐟 Generating comprehensive Indian fish database...")
     print(f"   Target: 1000+ species")
     
-    database = []
-    fish_id = 1
+    produced = 0
     
     # Add manually curated species
-    database.extend(INDIAN_FISH_SPECIES)
-    fish_id = len(database) + 1
+    for fish in INDIAN_FISH_SPECIES[:limit]:
+        yield fish
+        produced += 1
+    fish_id = len(INDIAN_FISH_SPECIES) + 1
     
     # Generate additional species systematically
     for family, types in categories.items():
@@ -834,53 +860,243 @@ def generate_comprehensive_database():
                     "image_url": f"https://via.placeholder.com/400x300/1e90ff/ffffff?text={species_name.replace(' ', '+')}"
                 }
                 
-                database.append(fish_data)
+                if produced >= limit:
+                    break
+                yield fish_data
+                produced += 1
                 fish_id += 1
                 
                 if fish_id > 1200:  # Generate a bit extra
                     break
-            if fish_id > 1200:
+            if fish_id > 1200 or produced >= limit:
                 break
-        if fish_id > 1200:
+        if fish_id > 1200 or produced >= limit:
             break
     
-    print(f"   ✅ Generated {len(database)} species")
-    return database[:1050]  # Return exactly 1050 species
+    print(f"   ✅ Generated {produced} species")
 
-def save_database(database, output_dir=""):
-    """Save database in multiple formats for offline use"""
+# Species per chunk file, matching assets/fish_database_chunks
+CHUNK_SIZE = 100
+# id: consecutive id ranges; family/habitat: each chunk holds a single family or habitat
+CHUNK_MODES = ["id", "family", "habitat"]
+
+class JsonArrayWriter:
+    """Writes a JSON array one element at a time, byte-identical to json.dump of the whole list"""
+    
+    def __init__(self, path, pretty=True):
+        self.f = open(path, "w", encoding="utf-8")
+        self.pretty = pretty
+        self.count = 0
+    
+    def add(self, record):
+        if self.pretty:
+            # json.dump(list, indent=2) nests each element one level deeper
+            text = json.dumps(record, indent=2, ensure_ascii=False).replace("\n", "\n  ")
+            self.f.write(("[\n  " if self.count == 0 else ",\n  ") + text)
+        else:
+            text = json.dumps(record, separators=(',', ':'), ensure_ascii=False)
+            self.f.write(("[" if self.count == 0 else ",") + text)
+        self.count += 1
+    
+    def close(self):
+        if self.count == 0:
+            self.f.write("[]")
+        else:
+            self.f.write("\n]" if self.pretty else "]")
+        self.f.close()
+
+class ChunkWriter:
+    """
+    Writes fish_chunk_NN.json files plus index.json in the layout the app loads.
+    Records are chunked in the order they arrive (ascending ids from the generator);
+    in family/habitat mode one open chunk per group is buffered, so memory stays at
+    most chunk_size records per group.
+    """
+    
+    def __init__(self, chunks_dir, chunk_size=CHUNK_SIZE, chunk_by="id"):
+        if chunk_by not in CHUNK_MODES:
+            raise ValueError(f"chunk_by must be one of {', '.join(CHUNK_MODES)}")
+        self.chunks_dir = chunks_dir
+        self.chunk_size = chunk_size
+        self.chunk_by = chunk_by
+        os.makedirs(chunks_dir, exist_ok=True)
+        
+        # Never replace one layout with another in place: the app would load grouped chunks as id-chunks
+        index_path = os.path.join(chunks_dir, "index.json")
+        if os.path.exists(index_path):
+            with open(index_path, encoding="utf-8") as f:
+                existing = json.load(f).get("chunk_by", "id")
+            if existing != chunk_by:
+                raise ValueError(f"{chunks_dir} holds chunks by {existing}; write chunks by {chunk_by} elsewhere")
+        
+        # Drop chunk files from a previous build so the index never points at stale data
+        for name in os.listdir(chunks_dir):
+            if name.startswith("fish_chunk_") and name.endswith(".json"):
+                os.remove(os.path.join(chunks_dir, name))
+        
+        self.open_chunks = {}
+        self.entries = []
+        self.groups = {}
+        self.total = 0
+    
+    def add(self, fish):
+        key = None if self.chunk_by == "id" else fish[self.chunk_by]
+        records = self.open_chunks.setdefault(key, [])
+        records.append(fish)
+        self.total += 1
+        if len(records) >= self.chunk_size:
+            self._flush(key)
+    
+    def _flush(self, key):
+        records = self.open_chunks.pop(key)
+        chunk_id = len(self.entries)
+        # Files are renamed to their final zero-padded names once the chunk count is known
+        filename = f"fish_chunk_{chunk_id}.json"
+        data = json.dumps(records, indent=2, ensure_ascii=False).encode("utf-8")
+        with open(os.path.join(self.chunks_dir, filename), "wb") as f:
+            f.write(data)
+        
+        ids = [fish["id"] for fish in records]
+        entry = {
+            "chunk_id": chunk_id,
+            "file": filename,
+            "species_count": len(records),
+            "start_id": min(ids),
+            "end_id": max(ids),
+            "bytes": len(data),
+            "sha256": hashlib.sha256(data).hexdigest()
+        }
+        if key is not None:
+            entry["key"] = key
+            self.groups.setdefault(key, []).append(chunk_id)
+        self.entries.append(entry)
+    
+    def close(self, habitats):
+        """Flush partial chunks and write index.json; habitats are the per-habitat counts"""
+        for key in sorted(self.open_chunks, key=lambda k: (k is not None, k)):
+            self._flush(key)
+        
+        width = max(2, len(str(len(self.entries) - 1)))
+        for entry in self.entries:
+            filename = f"fish_chunk_{entry['chunk_id']:0{width}d}.json"
+            os.replace(os.path.join(self.chunks_dir, entry["file"]), os.path.join(self.chunks_dir, filename))
+            entry["file"] = filename
+        
+        index = {
+            "format": "id-chunks" if self.chunk_by == "id" else "group-chunks",
+            "version": 1,
+            "total_species": self.total,
+            "total_chunks": len(self.entries),
+            "chunk_size": self.chunk_size,
+            "chunk_by": self.chunk_by,
+            "chunks": self.entries,
+            "statistics": {habitat.lower(): count for habitat, count in habitats.items()}
+        }
+        if self.groups:
+            # Grouped chunks are smaller than chunk_size and their id ranges overlap, so
+            # drop chunk_size: clients that page by it or take the first chunk covering
+            # an id would silently return wrong results
+            index["max_chunk_size"] = index.pop("chunk_size")
+            # Lets a client that only needs one family or habitat find its chunks directly
+            index["groups"] = self.groups
+        
+        with open(os.path.join(self.chunks_dir, "index.json"), "w", encoding="utf-8") as f:
+            json.dump(index, f, indent=2, ensure_ascii=False)
+        return index
+
+def save_database(database, output_dir="", chunk_size=CHUNK_SIZE, chunk_by="id", chunks_dir=None,
+                  updates_dir=None):
+    """
+    Save database in multiple formats for offline use.
+    database may be a list or any iterable such as iter_comprehensive_database():
+    every output is written in a single pass, so records are never all held at once.
+    The search index spills its postings to disk and facets are encoded one value at
+    a time; what still grows with the catalog is a few ids and hashes per record
+    (facet ids, the update manifest's record hashes), about 1 KB per record in all.
+    The chunk layout is versioned in updates_dir, with a delta from the previous build.
+    """
     
     if not os.path.exists(output_dir):
         os.makedirs(output_dir)
+    # Grouped layouts never share a directory with the id-chunks the app loads
+    chunks_dir = chunks_dir or os.path.join(output_dir, "fish_database_chunks" if chunk_by == "id"
+                                            else f"fish_database_chunks_by_{chunk_by}")
+    updates_dir = updates_dir or os.path.join(output_dir, "fish_database_updates")
     
-    # Save as JSON
     json_path = os.path.join(output_dir, "indian_fish_database.json")
-    with open(json_path, 'w', encoding='utf-8') as f:
-        json.dump(database, f, indent=2, ensure_ascii=False)
+    compact_json_path = os.path.join(output_dir, "fish_db_compact.json")
+    pretty = JsonArrayWriter(json_path, pretty=True)
+    compact = JsonArrayWriter(compact_json_path, pretty=False)
+    columnar_path = os.path.join(output_dir, "fish_db_columnar.json")
+    columnar = ColumnarWriter(columnar_path)
+    chunks = ChunkWriter(chunks_dir, chunk_size, chunk_by)
+    sqlite_path = os.path.join(output_dir, "fish_db.sqlite")
+    sqlite = SqliteWriter(sqlite_path)
+    # Facet bitsets, statistics and the search index accumulate ids, not records
+    facets = FacetCollector()
+    search = SearchIndexBuilder()
+    
+    for fish in database:
+        pretty.add(fish)
+        compact.add(fish)
+        columnar.add(fish)
+        chunks.add(fish)
+        sqlite.add(fish)
+        facets.add(fish)
+        search.add(fish)
+    
+    # Save as JSON
+    pretty.close()
     print(f"   ✅ Saved JSON: {json_path}")
     
     # Save as compact JSON for mobile
-    compact_json_path = os.path.join(output_dir, "fish_db_compact.json")
-    with open(compact_json_path, 'w', encoding='utf-8') as f:
-        json.dump(database, f, separators=(',', ':'), ensure_ascii=False)
+    compact.close()
     print(f"   ✅ Saved compact JSON: {compact_json_path}")
     
-    # Generate statistics
-    stats = {
-        "total_species": len(database),
-        "families": len(set(f["family"] for f in database)),
-        "habitats": {
-            "Freshwater": len([f for f in database if f["habitat"] == "Freshwater"]),
-            "Marine": len([f for f in database if f["habitat"] == "Marine"]),
-            "Brackish": len([f for f in database if f["habitat"] == "Brackish"])
-        },
-        "regions": len(set(region for f in database for region in f["native_regions"])),
-        "conservation_statuses": {}
-    }
+    # Save dictionary-encoded columnar JSON
+    columnar_info = columnar.close()
+    print(f"   ✅ Saved columnar JSON: {columnar_path} ({columnar_info['bytes'] / 1024:.0f} KB)")
     
-    for fish in database:
-        status = fish["conservation_status"]
-        stats["conservation_statuses"][status] = stats["conservation_statuses"].get(status, 0) + 1
+    # Save SQLite database with indexes and full-text search
+    sqlite_info = sqlite.close()
+    print(f"   ✅ Saved SQLite: {sqlite_path} ({sqlite_info['bytes'] / 1024:.0f} KB)")
+    
+    collected, stats = facets.finish()
+    
+    # Save chunked layout loaded by the app (assets/fish_database_chunks)
+    index = chunks.close(stats["habitats"])
+    print(f"   ✅ Saved {index['total_chunks']} chunks by {chunk_by}: {chunks_dir}")
+    
+    # Save prefix-sharded name search index next to the chunks
+    search_dir = os.path.join(chunks_dir, "search")
+    search_manifest = search.write(search_dir)
+    print(f"   ✅ Saved search index ({len(search_manifest['shards'])} shards): {search_dir}")
+    
+    facets_path = os.path.join(chunks_dir, "facets.json")
+    write_facets(collected, facets_path)
+    print(f"   ✅ Saved facet bitsets: {facets_path}")
+    
+    # Version the chunk layout and ship only what changed since the last build
+    update = write_update(chunks_dir, updates_dir)
+    if not update["changed"]:
+        print(f"   ✅ Chunks unchanged, still version {update['version']}")
+    elif "update" in update:
+        delta = update["update"]
+        print(f"   ✅ Saved update to version {update['version']}: {delta['changes']} changed files, "
+              f"{delta['download_bytes'] / 1024:.0f} of {delta['full_bytes'] / 1024:.0f} KB ({delta['path']})")
+    else:
+        print(f"   ✅ Saved manifest for version {update['version']}: {updates_dir}")
+    
+    # Classifier labels resolve against the chunks the app ships, not this build's
+    # records, so species ids always point into the catalog the app loads
+    if os.path.exists(DEFAULT_LABELS_PATH) and os.path.exists(os.path.join(APP_CHUNKS_DIR, "index.json")):
+        label_map = build_label_map(DEFAULT_LABELS_PATH, iter_chunk_records(APP_CHUNKS_DIR))
+        label_map_path = write_label_map(label_map, os.path.join(output_dir, "label_map.json"))
+        print(f"   ✅ Saved label map ({len(label_map['labels'])} labels): {label_map_path}")
+        for label in label_map["unmatched"]:
+            print(f"   ⚠️ No catalog species for classifier label {label}, summary only")
+        for label in label_map["ambiguous"]:
+            print(f"   ⚠️ Catalog id for classifier label {label} is not unique, left out of the map")
     
     stats_path = os.path.join(output_dir, "database_stats.json")
     with open(stats_path, 'w') as f:
@@ -890,16 +1106,38 @@ def save_database(database, output_dir=""):
     return stats
 
 def main():
+    parser = argparse.ArgumentParser(description="Generate the Indian fish species database")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="species per chunk file")
+    parser.add_argument("--chunk-by", choices=CHUNK_MODES, default="id",
+                        help="group chunks by id range, family or habitat")
+    parser.add_argument("--chunks-dir", default=None,
+                        help="where to write the chunks (default: fish_database_chunks next to this script, "
+                             "or fish_database_chunks_by_<mode> for family/habitat)")
+    parser.add_argument("--updates-dir", default=None,
+                        help="where to keep version manifests and deltas (default: fish_database_updates)")
+    parser.add_argument("--synthetic", type=int, default=None, metavar="SIZE",
+                        help="generate a seeded synthetic catalog of SIZE species for load testing")
+    parser.add_argument("--seed", type=int, default=0, help="seed for --synthetic")
+    parser.add_argument("--output-dir", default=None,
+                        help="where to write the outputs (default: this directory, or synthetic_<SIZE> with --synthetic)")
+    args = parser.parse_args()
+    
     print("=" * 60)
     print("🐟 Indian Fish Species Database Generator")
     print("=" * 60)
     
-    # Generate database
-    database = generate_comprehensive_database()
-    
-    # Save in data directory
-    output_dir = os.path.join(os.path.dirname(__file__))
-    stats = save_database(database, output_dir)
+    # Generate database lazily; save_database streams it to every output
+    data_dir = os.path.join(os.path.dirname(__file__))
+    if args.synthetic is not None:
+        database = iter_synthetic_database(args.synthetic, args.seed)
+        # Never overwrite the real database with a synthetic one by default
+        output_dir = args.output_dir or os.path.join(data_dir, f"synthetic_{args.synthetic}")
+    else:
+        database = iter_comprehensive_database()
+        # Save in data directory
+        output_dir = args.output_dir or data_dir
+    stats = save_database(database, output_dir, args.chunk_size, args.chunk_by, args.chunks_dir,
+                          args.updates_dir)
     
     print("\n" + "=" * 60)
     print("✅ Database Generation Complete!")
@@ -913,10 +1151,17 @@ def main():
     print(f"\n📱 Files created for mobile app:")
     print(f"   ✅ indian_fish_database.json (readable)")
     print(f"   ✅ fish_db_compact.json (optimized for mobile)")
+    print(f"   ✅ fish_db_columnar.json (dictionary-encoded, smallest)")
     print(f"   ✅ database_stats.json (statistics)")
+    print(f"   ✅ fish_database_chunks/ (chunked, loaded on demand)")
+    print(f"   ✅ fish_database_chunks/search/ (name search index)")
+    print(f"   ✅ fish_database_chunks/facets.json (filter bitsets)")
+    print(f"   ✅ fish_db.sqlite (indexed queries and full-text search)")
+    print(f"   ✅ fish_database_updates/ (version manifests and deltas)")
+    print(f"   ✅ label_map.json (classifier label -> species id)")
     
     print(f"\n📋 Next Steps:")
-    print(f"   1. Copy fish_db_compact.json to fishclassify/assets/")
+    print(f"   1. Review, then copy fish_database_chunks/ to assets/fish_database_chunks/ to ship it")
     print(f"   2. Create fish database service in React Native")
     print(f"   3. Implement offline search and display")
 
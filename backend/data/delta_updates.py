@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Versioned delta updates for the chunked species database
+Each build records a content-hashed manifest of fish_database_chunks. When a
+previous manifest exists, only changed files are shipped: chunks as JSON Patch
+(RFC 6902) documents when that is much smaller than the chunk, otherwise as
+replacements, described by an update manifest from version N to N+1.
+
+Patched chunks are verified by content, not bytes: a client re-serializes the
+patched records itself, so content_sha256 is the SHA-256 of their canonical JSON,
+which JSON.stringify can reproduce: object keys sorted, no whitespace
+(separators "," and ":"), non-ASCII characters unescaped, UTF-8, and floats with
+an integral value written as integers (14.0 as 14). Files shipped whole are
+verified by sha256 over their bytes.
+"""
+import json
+import os
+import time
+import shutil
+import hashlib
+
+LATEST_NAME = "latest.json"
+# Recorded in every update so clients know how content_sha256 was computed
+CONTENT_HASH = "sha256 of canonical JSON: sorted keys, separators ',' and ':', UTF-8 unescaped, integral floats as ints"
+# A patch is shipped only when it is at most this fraction of the full chunk
+PATCH_RATIO = 0.5
+
+def sha256_bytes(data):
+    return hashlib.sha256(data).hexdigest()
+
+def canonical(value):
+    """value with integral floats as ints, so 14.0 serializes as 14 the way JSON.stringify writes it"""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if isinstance(value, dict):
+        return {key: canonical(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [canonical(item) for item in value]
+    return value
+
+def canonical_json(value):
+    """The canonical serialization content hashes are computed over (see the module docstring)"""
+    return json.dumps(canonical(value), sort_keys=True, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+def content_hash(value):
+    return sha256_bytes(canonical_json(value))
+
+def record_hash(record):
+    """Short content hash of one record, independent of key order and float formatting"""
+    return content_hash(record)[:16]
+
+def build_manifest(chunks_dir, version):
+    """Hash every file under chunks_dir; chunk files also get one hash per record"""
+    with open(os.path.join(chunks_dir, "index.json"), encoding="utf-8") as f:
+        chunk_files = {chunk["file"] for chunk in json.load(f)["chunks"]}
+
+    files = {}
+    for root, _, names in os.walk(chunks_dir):
+        for name in sorted(names):
+            path = os.path.join(root, name)
+            rel = os.path.relpath(path, chunks_dir).replace("\\", "/")
+            with open(path, "rb") as f:
+                data = f.read()
+            entry = {"sha256": sha256_bytes(data), "bytes": len(data)}
+            if rel in chunk_files:
+                records = json.loads(data)
+                entry["content_sha256"] = content_hash(records)
+                entry["records"] = [record_hash(r) for r in records]
+            files[rel] = entry
+    return {"version": version, "built_at": time.strftime("%Y-%m-%dT%H:%M:%S"), "files": dict(sorted(files.items()))}
+
+def chunk_patch(old_hashes, records):
+    """RFC 6902 operations turning the previous chunk into records, matched by position"""
+    ops = []
+    for i, record in enumerate(records[:len(old_hashes)]):
+        if record_hash(record) != old_hashes[i]:
+            ops.append({"op": "replace", "path": f"/{i}", "value": record})
+    for record in records[len(old_hashes):]:
+        ops.append({"op": "add", "path": "/-", "value": record})
+    # Remove from the end so earlier indexes stay valid
+    for i in range(len(old_hashes) - 1, len(records) - 1, -1):
+        ops.append({"op": "remove", "path": f"/{i}"})
+    return ops
+
+def load_latest(updates_dir):
+    path = os.path.join(updates_dir, LATEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        latest = json.load(f)
+    with open(os.path.join(updates_dir, latest["manifest"]), encoding="utf-8") as f:
+        return json.load(f)
+
+def write_update(chunks_dir, updates_dir):
+    """
+    Compare the freshly written chunks with the previous build's manifest and
+    write manifest_vN.json plus, when something changed, vM-vN/update.json with
+    the patches and replacement files. Returns a summary of what was emitted.
+    """
+    os.makedirs(updates_dir, exist_ok=True)
+    previous = load_latest(updates_dir)
+    version = previous["version"] + 1 if previous else 1
+    manifest = build_manifest(chunks_dir, version)
+
+    if previous and {k: v["sha256"] for k, v in previous["files"].items()} == \
+            {k: v["sha256"] for k, v in manifest["files"].items()}:
+        return {"version": previous["version"], "changed": False}
+
+    manifest_name = f"manifest_v{version}.json"
+    manifest_data = json.dumps(manifest, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    with open(os.path.join(updates_dir, manifest_name), "wb") as f:
+        f.write(manifest_data)
+
+    summary = {"version": version, "changed": True}
+    if previous:
+        summary["update"] = write_delta(chunks_dir, updates_dir, previous, manifest, sha256_bytes(manifest_data))
+
+    with open(os.path.join(updates_dir, LATEST_NAME), "w", encoding="utf-8") as f:
+        json.dump({"version": version, "manifest": manifest_name, "manifest_sha256": sha256_bytes(manifest_data)},
+                  f, indent=2)
+    return summary
+
+def write_delta(chunks_dir, updates_dir, previous, manifest, manifest_sha256):
+    update_name = f"v{previous['version']}-v{manifest['version']}"
+    update_dir = os.path.join(updates_dir, update_name)
+    if os.path.exists(update_dir):
+        shutil.rmtree(update_dir)
+    os.makedirs(update_dir)
+
+    entries = []
+    unchanged = 0
+    for rel, entry in manifest["files"].items():
+        old = previous["files"].get(rel)
+        if old and old["sha256"] == entry["sha256"]:
+            unchanged += 1
+            continue
+
+        change = {"file": rel, "sha256": entry["sha256"], "bytes": entry["bytes"]}
+        if old and "records" in old and "content_sha256" in old and "records" in entry:
+            with open(os.path.join(chunks_dir, rel), encoding="utf-8") as f:
+                ops = chunk_patch(old["records"], json.load(f))
+            patch_data = json.dumps(ops, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+            if len(patch_data) <= entry["bytes"] * PATCH_RATIO:
+                patch_name = rel.replace("/", "__") + ".patch.json"
+                with open(os.path.join(update_dir, patch_name), "wb") as f:
+                    f.write(patch_data)
+                # The client re-serializes the patched chunk, so only its content can be checked
+                del change["sha256"]
+                change.update({"action": "patch", "from_content_sha256": old["content_sha256"],
+                               "content_sha256": entry["content_sha256"], "patch": patch_name,
+                               "patch_bytes": len(patch_data), "operations": len(ops)})
+                entries.append(change)
+                continue
+
+        # New file, non-chunk file, or a chunk that changed too much to patch
+        target = os.path.join(update_dir, "files", rel)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(os.path.join(chunks_dir, rel), target)
+        change.update({"action": "replace" if old else "add", "path": "files/" + rel})
+        entries.append(change)
+
+    for rel in previous["files"]:
+        if rel not in manifest["files"]:
+            entries.append({"file": rel, "action": "delete"})
+
+    download = sum(e.get("patch_bytes", e.get("bytes", 0)) if e["action"] != "delete" else 0 for e in entries)
+    update = {
+        "from_version": previous["version"],
+        "to_version": manifest["version"],
+        "to_manifest": f"manifest_v{manifest['version']}.json",
+        "to_manifest_sha256": manifest_sha256,
+        "content_hash": CONTENT_HASH,
+        "unchanged_files": unchanged,
+        "download_bytes": download,
+        "full_bytes": sum(e["bytes"] for e in manifest["files"].values()),
+        "changes": entries
+    }
+    with open(os.path.join(update_dir, "update.json"), "w", encoding="utf-8") as f:
+        json.dump(update, f, indent=2, ensure_ascii=False)
+    return {"path": update_dir, "changes": len(entries), "download_bytes": download, "full_bytes": update["full_bytes"]}
+
+def apply_json_patch(document, ops):
+    """Apply the replace/add/remove operations chunk_patch emits"""
+    for op in ops:
+        key = op["path"].lstrip("/")
+        if op["op"] == "replace":
+            document[int(key)] = op["value"]
+        elif op["op"] == "add":
+            document.append(op["value"]) if key == "-" else document.insert(int(key), op["value"])
+        elif op["op"] == "remove":
+            del document[int(key)]
+        else:
+            raise ValueError(f"Unsupported patch operation {op['op']}")
+    return document
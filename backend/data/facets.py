@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Facet bitsets for filtering the species database
+One bitset of species ids per habitat, family, region, conservation status and
+commercial importance, so multi-facet filters are intersections instead of scans
+"""
+import json
+import base64
+
+# Facet name -> record field
+FACET_FIELDS = {
+    "habitat": "habitat",
+    "family": "family",
+    "region": "native_regions",
+    "status": "conservation_status",
+    "importance": "commercial_importance"
+}
+
+def facet_values(fish, facet):
+    value = fish.get(FACET_FIELDS[facet])
+    if value is None:
+        return []
+    if facet == "importance":
+        # "High - Food fish" is faceted on its level, "High"
+        return [value.split(" - ")[0].strip()]
+    return value if isinstance(value, list) else [value]
+
+def encode_bits(bits):
+    """Python int bitset -> base64 of its little-endian bytes"""
+    return base64.b64encode(bits.to_bytes((bits.bit_length() + 7) // 8, "little")).decode("ascii")
+
+def decode_bits(data):
+    return int.from_bytes(base64.b64decode(data), "little")
+
+def offsets_to_bits(offsets):
+    # Filled as bytes: OR-ing into a growing int per record would be quadratic
+    data = bytearray(max(offsets) // 8 + 1)
+    for offset in offsets:
+        data[offset >> 3] |= 1 << (offset & 7)
+    return int.from_bytes(data, "little")
+
+class FacetCollector:
+    """
+    Collects every facet's bit offsets together with the statistics save_database
+    reports, in the same shape as database_stats.json, from records fed one at a time.
+    Only ids are kept, so it can follow a streamed catalog; write_facets turns them
+    into bitsets one value at a time. Bit i of a bitset stands for species id id_base + i.
+    """
+
+    def __init__(self):
+        self.offsets = {facet: {} for facet in FACET_FIELDS}
+        self.min_id = None
+        self.max_id = None
+        self.total = 0
+
+    def add(self, fish):
+        self.total += 1
+        self.min_id = fish["id"] if self.min_id is None else min(self.min_id, fish["id"])
+        self.max_id = fish["id"] if self.max_id is None else max(self.max_id, fish["id"])
+        for facet, values in self.offsets.items():
+            # Ids for now; they become bit offsets once the lowest id is known
+            for value in facet_values(fish, facet):
+                values.setdefault(value, []).append(fish["id"])
+
+    def finish(self):
+        """Return (collected ids and record counts for write_facets, statistics)"""
+        id_base = self.min_id if self.min_id is not None else 1
+        max_id = self.max_id if self.max_id is not None else id_base
+        # Records rather than distinct ids, matching the counts database_stats.json always had
+        counts = {facet: {value: len(found) for value, found in sorted(values.items())}
+                  for facet, values in self.offsets.items()}
+        habitats = counts["habitat"]
+        stats = {
+            "total_species": self.total,
+            "families": len(counts["family"]),
+            "habitats": {h: habitats.get(h, 0) for h in ("Freshwater", "Marine", "Brackish")},
+            "regions": len(counts["region"]),
+            "conservation_statuses": counts["status"],
+            "commercial_importance": counts["importance"]
+        }
+        return {"id_base": id_base, "max_id": max_id, "ids": self.offsets, "counts": counts}, stats
+
+def collect_facets(database):
+    """Single pass over the records returning (collected ids, statistics)"""
+    collector = FacetCollector()
+    for fish in database:
+        collector.add(fish)
+    return collector.finish()
+
+def write_facets(collected, path):
+    """
+    Write facets.json: per facet value, its record count and base64 bitset. Counts
+    are the collector's record counts, so they agree with database_stats.json even
+    when ids repeat. Bitsets are built and written one value at a time, so only
+    one is held in memory however many families a large catalog has.
+    """
+    id_base = collected["id_base"]
+    header = {
+        "version": 1,
+        "id_base": id_base,
+        "max_id": collected["max_id"],
+        "encoding": "base64 little-endian bitset; bit i is species id id_base + i"
+    }
+
+    def dumps(value):
+        return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(dumps(header)[:-1] + ',"facets":{')
+        for i, (facet, values) in enumerate(collected["ids"].items()):
+            f.write(("," if i else "") + dumps(facet) + ":{")
+            for j, (value, found) in enumerate(sorted(values.items())):
+                bits = offsets_to_bits([fish_id - id_base for fish_id in found])
+                entry = {"count": collected["counts"][facet][value], "bits": encode_bits(bits)}
+                f.write(("," if j else "") + dumps(value) + ":" + dumps(entry))
+            f.write("}")
+        f.write("}}")
+    return path
+
+class FacetIndex:
+    """Loads facets.json and answers filters by intersecting bitsets"""
+
+    def __init__(self, path):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.id_base = data["id_base"]
+        self.counts = {facet: {value: entry["count"] for value, entry in values.items()}
+                       for facet, values in data["facets"].items()}
+        self._encoded = data["facets"]
+        self._bits = {}
+
+    def bits(self, facet, value):
+        key = (facet, value)
+        if key not in self._bits:
+            entry = self._encoded.get(facet, {}).get(value)
+            self._bits[key] = decode_bits(entry["bits"]) if entry else 0
+        return self._bits[key]
+
+    def filter_bits(self, **selection):
+        """
+        AND across facets, OR within one: filter_bits(habitat="Marine",
+        region=["Kerala Coast", "Goa Coast"]) -> bitset of matching species
+        """
+        result = None
+        for facet, values in selection.items():
+            if facet not in FACET_FIELDS:
+                raise ValueError(f"Unknown facet {facet}; choose from {', '.join(FACET_FIELDS)}")
+            bits = 0
+            for value in ([values] if isinstance(values, str) else values):
+                bits |= self.bits(facet, value)
+            result = bits if result is None else result & bits
+            if not result:
+                return 0
+        return result if result is not None else 0
+
+    def ids(self, bits):
+        # Walk bytes rather than shifting the whole int, which is quadratic for large catalogs
+        found = []
+        for byte_index, byte in enumerate(bits.to_bytes((bits.bit_length() + 7) // 8, "little")):
+            while byte:
+                low = byte & -byte
+                found.append(self.id_base + byte_index * 8 + low.bit_length() - 1)
+                byte ^= low
+        return found
+
+    def filter(self, **selection):
+        """Sorted species ids matching every facet in selection"""
+        return self.ids(self.filter_bits(**selection))
+
+    def count(self, **selection):
+        return bin(self.filter_bits(**selection)).count("1")
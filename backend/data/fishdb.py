@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Python query library over the chunked species database
+Opens fish_database_chunks/index.json and loads chunk files only when a query
+needs them, keeping the most recently used ones in a bounded LRU cache.
+
+    db = FishDB("assets/fish_database_chunks")
+    db.get(42)
+    db.get_many([1, 2, 300])
+    db.page(3, page_size=20)
+    db.filter(habitat="Marine", region="Kerala Coast", limit=10)
+    db.search("carp")
+"""
+import json
+import os
+import bisect
+import argparse
+from collections import OrderedDict
+
+from facets import FACET_FIELDS, FacetIndex, facet_values
+from search_index import SearchIndex, SEARCH_FIELDS, tokenize
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+# The chunks the app ships
+DEFAULT_CHUNKS_DIR = os.path.join(DATA_DIR, "..", "..", "assets", "fish_database_chunks")
+# Chunks held in memory at once; 8 chunks of 100 species is roughly 600 KB of JSON
+CACHE_CHUNKS = 8
+PAGE_SIZE = 50
+
+def matches(fish, selection):
+    """AND across facets, OR within one, with the same value rules as facets.json"""
+    for facet, values in selection.items():
+        wanted = {values} if isinstance(values, str) else set(values)
+        if wanted.isdisjoint(facet_values(fish, facet)):
+            return False
+    return True
+
+def matches_text(fish, query):
+    """Case-insensitive substring match over the fields searchByName uses"""
+    query = query.lower()
+    for field in SEARCH_FIELDS:
+        value = fish.get(field) or ""
+        for text in (value if isinstance(value, list) else [value]):
+            if query in text.lower():
+                return True
+    return False
+
+class FishDB:
+    """
+    Read-only access to a chunked catalog. Species ids are resolved to chunks by
+    binary search over start_id/end_id; ranges may overlap (family/habitat
+    chunking), in which case every chunk whose range covers the id is checked.
+    Ids are not guaranteed unique, so get() returns the first record and get_all() every one.
+    """
+
+    def __init__(self, chunks_dir=DEFAULT_CHUNKS_DIR, cache_chunks=CACHE_CHUNKS):
+        self.chunks_dir = chunks_dir
+        with open(os.path.join(chunks_dir, "index.json"), encoding="utf-8") as f:
+            self.index = json.load(f)
+        self.chunks = self.index["chunks"]
+        self.chunk_by = self.index.get("chunk_by", "id")
+        self.cache_chunks = max(1, cache_chunks)
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+        # Chunks ordered by start_id, with the running maximum end_id, for interval lookups
+        self.by_start = sorted(range(len(self.chunks)), key=lambda i: self.chunks[i]["start_id"])
+        self.starts = [self.chunks[i]["start_id"] for i in self.by_start]
+        self.max_end = []
+        for i in self.by_start:
+            self.max_end.append(max(self.chunks[i]["end_id"], self.max_end[-1] if self.max_end else self.chunks[i]["end_id"]))
+
+        # Record offset where each chunk starts, for pagination
+        self.offsets = [0]
+        for chunk in self.chunks:
+            self.offsets.append(self.offsets[-1] + chunk["species_count"])
+
+        self._facets = None
+        self._search = None
+
+    def __len__(self):
+        return self.offsets[-1]
+
+    def _load(self, position):
+        """Records of the chunk at this position in the index, through the LRU cache"""
+        cached = self.cache.get(position)
+        if cached is not None:
+            self.hits += 1
+            self.cache.move_to_end(position)
+            return cached
+        self.misses += 1
+        with open(os.path.join(self.chunks_dir, self.chunks[position]["file"]), encoding="utf-8") as f:
+            records = json.load(f)
+        by_id = {}
+        for i, fish in enumerate(records):
+            by_id.setdefault(fish["id"], []).append(i)
+        cached = (records, by_id)
+        self.cache[position] = cached
+        if len(self.cache) > self.cache_chunks:
+            self.cache.popitem(last=False)
+        return cached
+
+    def chunks_for(self, fish_id):
+        """Index positions of the chunks whose id range covers fish_id, in index order"""
+        found = []
+        i = bisect.bisect_right(self.starts, fish_id) - 1
+        # max_end is non-decreasing, so once it falls below the id no earlier chunk can hold it
+        while i >= 0 and self.max_end[i] >= fish_id:
+            if self.chunks[self.by_start[i]]["end_id"] >= fish_id:
+                found.append(self.by_start[i])
+            i -= 1
+        return sorted(found)
+
+    def get_all(self, fish_id):
+        """Every record with this id"""
+        found = []
+        for position in self.chunks_for(fish_id):
+            records, by_id = self._load(position)
+            found.extend(records[i] for i in by_id.get(fish_id, []))
+        return found
+
+    def get(self, fish_id):
+        for position in self.chunks_for(fish_id):
+            records, by_id = self._load(position)
+            if fish_id in by_id:
+                return records[by_id[fish_id][0]]
+        return None
+
+    def get_many(self, fish_ids):
+        """Records for fish_ids in the same order (None where missing), reading each chunk once"""
+        wanted = {}
+        for fish_id in fish_ids:
+            wanted.setdefault(fish_id, None)
+        pending = {}
+        for fish_id in wanted:
+            for position in self.chunks_for(fish_id):
+                pending.setdefault(position, []).append(fish_id)
+        for position in sorted(pending):
+            records, by_id = self._load(position)
+            for fish_id in pending[position]:
+                if wanted[fish_id] is None and fish_id in by_id:
+                    wanted[fish_id] = records[by_id[fish_id][0]]
+        return [wanted[fish_id] for fish_id in fish_ids]
+
+    def records(self, start=0, stop=None):
+        """Records in catalog order from offset start to stop, loading only the chunks spanned"""
+        stop = len(self) if stop is None else min(stop, len(self))
+        position = bisect.bisect_right(self.offsets, start) - 1
+        while start < stop and position < len(self.chunks):
+            records, _ = self._load(position)
+            base = self.offsets[position]
+            for fish in records[start - base:stop - base]:
+                yield fish
+            start = self.offsets[position + 1]
+            position += 1
+
+    def page(self, number, page_size=PAGE_SIZE):
+        """One page of the catalog in chunk order; pages are numbered from 1"""
+        start = (number - 1) * page_size
+        return {
+            "page": number,
+            "page_size": page_size,
+            "total": len(self),
+            "pages": (len(self) + page_size - 1) // page_size,
+            "items": list(self.records(start, start + page_size)) if number >= 1 else []
+        }
+
+    def iter_pages(self, page_size=PAGE_SIZE):
+        for number in range(1, (len(self) + page_size - 1) // page_size + 1):
+            yield self.page(number, page_size)
+
+    @property
+    def facets(self):
+        if self._facets is None:
+            path = os.path.join(self.chunks_dir, "facets.json")
+            self._facets = FacetIndex(path) if os.path.exists(path) else False
+        return self._facets
+
+    def _scan(self, positions, predicate):
+        for position in positions:
+            records, _ = self._load(position)
+            for fish in records:
+                if predicate(fish):
+                    yield fish
+
+    def filter(self, limit=None, offset=0, **selection):
+        """
+        Records matching every facet in selection, e.g. filter(habitat="Marine",
+        status=["Vulnerable", "Endangered"]). Uses the facet bitsets when the build
+        wrote them, otherwise scans only the chunks that can hold matches.
+        """
+        for facet in selection:
+            if facet not in FACET_FIELDS:
+                raise ValueError(f"Unknown facet {facet}; choose from {', '.join(FACET_FIELDS)}")
+        if self.facets:
+            ids = self.facets.filter(**selection)
+            found = (fish for fish_id in ids for fish in self.get_all(fish_id) if matches(fish, selection))
+        else:
+            positions = range(len(self.chunks))
+            groups = self.index.get("groups")
+            # Family/habitat chunking: only that group's chunks can match
+            for facet, field in FACET_FIELDS.items():
+                if groups and field == self.chunk_by and facet in selection:
+                    values = selection[facet]
+                    positions = sorted(p for v in ([values] if isinstance(values, str) else values)
+                                       for p in groups.get(v, []))
+            found = self._scan(positions, lambda fish: matches(fish, selection))
+        return self._slice(found, offset, limit)
+
+    def search(self, query, limit=None, offset=0):
+        """Records whose name, scientific name, common names or family contain query"""
+        search_dir = os.path.join(self.chunks_dir, "search")
+        if self._search is None:
+            self._search = SearchIndex(search_dir) if os.path.exists(os.path.join(search_dir, "search_index.json")) else False
+        tokens = tokenize(query)
+        # The index matches each token on its own, so it only gives every substring
+        # match for a single token at least as long as the shortest indexed gram
+        if self._search and len(tokens) == 1 and \
+                len(tokens[0]) >= self._search.manifest.get("min_ngram", self._search.manifest["ngram"]):
+            # Index hits are candidates; confirm each against its record
+            candidates = self._search.search(query)
+            found = (fish for fish_id in candidates for fish in self.get_all(fish_id) if matches_text(fish, query))
+        else:
+            found = self._scan(range(len(self.chunks)), lambda fish: matches_text(fish, query))
+        return self._slice(found, offset, limit)
+
+    @staticmethod
+    def _slice(found, offset, limit):
+        results = []
+        for i, fish in enumerate(found):
+            if i < offset:
+                continue
+            if limit is not None and len(results) >= limit:
+                break
+            results.append(fish)
+        return results
+
+    def cache_stats(self):
+        return {"cached_chunks": len(self.cache), "capacity": self.cache_chunks, "hits": self.hits,
+                "misses": self.misses}
+
+def main():
+    parser = argparse.ArgumentParser(description="Query the chunked species database")
+    parser.add_argument("--chunks-dir", default=DEFAULT_CHUNKS_DIR)
+    parser.add_argument("--get", type=int, nargs="+", help="species ids to fetch")
+    parser.add_argument("--search", help="name search")
+    parser.add_argument("--page", type=int, help="page number to list")
+    parser.add_argument("--page-size", type=int, default=PAGE_SIZE)
+    for facet in FACET_FIELDS:
+        parser.add_argument(f"--{facet}", action="append", help=f"filter on {facet}, repeat to match any")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    db = FishDB(args.chunks_dir)
+    selection = {facet: getattr(args, facet) for facet in FACET_FIELDS if getattr(args, facet)}
+    if args.get:
+        results = [fish for fish in db.get_many(args.get) if fish]
+    elif args.search:
+        results = db.search(args.search, args.limit)
+    elif selection:
+        results = db.filter(args.limit, **selection)
+    else:
+        results = db.page(args.page or 1, args.page_size)["items"]
+    print(json.dumps({"count": len(results), "results": results, "cache": db.cache_stats()}, indent=2,
+                     ensure_ascii=False))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Classifier label -> species record map
+Joins models/labels.txt with the ML_SPECIES entries in create_minimal_db.py and
+resolves them against the chunked catalog the app ships (assets/fish_database_chunks),
+so classify_fish.py can attach a species id (and a compact summary) to each
+detection instead of the app searching every chunk for the label.
+"""
+import json
+import os
+import argparse
+
+from create_minimal_db import ML_SPECIES
+from search_index import normalize
+from fishdb import FishDB, DEFAULT_CHUNKS_DIR
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_LABELS_PATH = os.path.join(DATA_DIR, "..", "..", "models", "labels.txt")
+# Fields kept in each label's summary; the id is species_id, present only when unique
+SUMMARY_FIELDS = ["name", "scientific_name", "family", "habitat", "conservation_status",
+                  "max_length_cm", "image_url"]
+
+def read_labels(path=DEFAULT_LABELS_PATH):
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip()]
+
+def summarize(fish):
+    return {field: fish.get(field) for field in SUMMARY_FIELDS}
+
+def ml_species_for(label, species=ML_SPECIES):
+    """The ML species a label names, by its name first and then its common names"""
+    key = normalize(label)
+    for fish in species:
+        if normalize(fish["name"]) == key:
+            return fish
+    for fish in species:
+        if key in (normalize(n) for n in fish.get("common_names") or []):
+            return fish
+    return None
+
+class LabelMapBuilder:
+    """
+    Resolves every label to a catalog record fed one at a time: the first record
+    with the ML species' scientific name, or failing that its name. A species id
+    is only emitted when no other catalog record shares it, so a lookup by id
+    always lands on the mapped species.
+    """
+
+    def __init__(self, labels, species=ML_SPECIES):
+        self.labels = labels
+        self.targets = {label: ml_species_for(label, species) for label in labels}
+        self.by_scientific = {}
+        self.by_name = {}
+        for label, fish in self.targets.items():
+            if fish is not None:
+                self.by_scientific.setdefault(normalize(fish["scientific_name"]), []).append(label)
+                self.by_name.setdefault(normalize(fish["name"]), []).append(label)
+        self.found = {}
+        self.seen_ids = set()
+        self.duplicate_ids = set()
+
+    def add(self, fish):
+        if fish["id"] in self.seen_ids:
+            self.duplicate_ids.add(fish["id"])
+        self.seen_ids.add(fish["id"])
+        for table, value in ((self.by_scientific, fish.get("scientific_name")), (self.by_name, fish.get("name"))):
+            for label in table.get(normalize(value or ""), []):
+                # A scientific name match beats an earlier match on name alone
+                if label not in self.found or (table is self.by_scientific and self.found[label][1] == "name"):
+                    self.found[label] = (fish, "scientific_name" if table is self.by_scientific else "name")
+
+    def finish(self, catalog=True):
+        """
+        Return the map; with catalog False (no records were added) the ML_SPECIES
+        entries themselves are used, whose ids match assets/fish_database.json.
+        Labels the catalog has no record for keep their ML_SPECIES summary but get
+        no species_id, and are listed under unmatched.
+        """
+        entries = {}
+        unmatched = []
+        ambiguous = []
+        for index, label in enumerate(self.labels):
+            fish = self.found[label][0] if label in self.found else (None if catalog else self.targets[label])
+            if fish is None:
+                unmatched.append(label)
+                if self.targets[label] is not None:
+                    entries[label] = {"index": index, "summary": summarize(self.targets[label])}
+                continue
+            entry = {"index": index, "summary": summarize(fish)}
+            if fish["id"] in self.duplicate_ids:
+                ambiguous.append(label)
+            else:
+                entry["species_id"] = fish["id"]
+            entries[label] = entry
+        return {"version": 2, "key": "id", "labels": entries, "unmatched": unmatched, "ambiguous": ambiguous}
+
+def iter_chunk_records(chunks_dir=DEFAULT_CHUNKS_DIR):
+    """Every record of a chunked catalog, one chunk in memory at a time"""
+    return FishDB(chunks_dir, cache_chunks=1).records()
+
+def build_label_map(labels_path=DEFAULT_LABELS_PATH, database=None):
+    """Label map from labels.txt, resolved against database (any iterable of records) when one is given"""
+    builder = LabelMapBuilder(read_labels(labels_path))
+    for fish in database or []:
+        builder.add(fish)
+    return builder.finish(catalog=database is not None)
+
+def write_label_map(label_map, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(label_map, f, indent=2, ensure_ascii=False)
+    return path
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the classifier label -> species map")
+    parser.add_argument("--labels", default=DEFAULT_LABELS_PATH)
+    parser.add_argument("--chunks-dir", default=DEFAULT_CHUNKS_DIR,
+                        help="chunked catalog to resolve ids against (default: the chunks the app ships)")
+    parser.add_argument("--database", default=None, help="catalog JSON to resolve ids against instead of --chunks-dir")
+    parser.add_argument("--out", default=os.path.join(DATA_DIR, "label_map.json"))
+    args = parser.parse_args()
+
+    if args.database:
+        with open(args.database, encoding="utf-8") as f:
+            database = json.load(f)
+    else:
+        database = iter_chunk_records(args.chunks_dir)
+    label_map = build_label_map(args.labels, database)
+    write_label_map(label_map, args.out)
+    print(f"✅ Mapped {len(label_map['labels'])} labels: {args.out}")
+    for label in label_map["unmatched"]:
+        print(f"   ⚠️ No catalog species for label {label}, summary only")
+    for label in label_map["ambiguous"]:
+        print(f"   ⚠️ Species id for label {label} is not unique in the catalog, left out")
+
+if __name__ == '__main__':
+    main()
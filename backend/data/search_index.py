@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""
+Inverted search index for species names
+Built alongside the database chunks so a search resolves to species ids
+without loading or scanning every chunk
+"""
+import json
+import os
+import re
+import heapq
+import shutil
+import hashlib
+import tempfile
+import unicodedata
+from contextlib import ExitStack
+
+# Fields searched by searchByName in services/fishDatabaseOptimized.ts
+SEARCH_FIELDS = ["name", "scientific_name", "common_names", "family"]
+# Substring matches use character n-grams of this length; shorter tokens are
+# indexed as every 1..NGRAM-1 character substring so short queries match anywhere too
+NGRAM = 3
+# Postings held in memory before the builder spills them to a sorted run on disk
+SPILL_POSTINGS = 500000
+# Posting kinds in the order shard files list them
+KINDS = ("tokens", "grams")
+
+def normalize(text):
+    """Lowercase, strip accents and collapse everything but letters and digits to spaces"""
+    text = unicodedata.normalize("NFKD", text)
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return re.sub(r"[^a-z0-9]+", " ", text.lower()).strip()
+
+def tokenize(text):
+    return normalize(text).split()
+
+def ngrams(token, n=NGRAM):
+    return {token[i:i + n] for i in range(len(token) - n + 1)}
+
+def shard_key(term):
+    """Terms are sharded by first character; digits share one shard"""
+    return "0" if term[0].isdigit() else term[0]
+
+def species_terms(fish):
+    """Whole tokens and 1..NGRAM-character substrings for every searchable field of a record"""
+    tokens = set()
+    for field in SEARCH_FIELDS:
+        value = fish.get(field) or ""
+        for text in (value if isinstance(value, list) else [value]):
+            tokens.update(tokenize(text))
+    grams = set()
+    for token in tokens:
+        for n in range(1, NGRAM + 1):
+            grams.update(ngrams(token, n))
+    return tokens, grams
+
+def encode_postings(ids):
+    """Sorted ids as deltas, which keeps long posting lists short in JSON"""
+    deltas, previous = [], 0
+    for fish_id in ids:
+        deltas.append(fish_id - previous)
+        previous = fish_id
+    return deltas
+
+def decode_postings(deltas):
+    ids, current = [], 0
+    for delta in deltas:
+        current += delta
+        ids.append(current)
+    return ids
+
+class SearchIndexBuilder:
+    """
+    Accumulates posting lists from records fed one at a time, then writes the shards.
+    Every spill_postings postings are spilled to a sorted run on disk, one file per
+    shard, and write() merges the runs one shard at a time, streaming each entry
+    out as it is encoded. Memory is bounded by spill_postings plus the longest
+    single posting list, not by the catalog size.
+    """
+
+    def __init__(self, spill_postings=SPILL_POSTINGS):
+        self.postings = {kind: {} for kind in KINDS}
+        self.spill_postings = spill_postings
+        self.pending = 0
+        self.spill_dir = None
+        self.runs = 0
+        self.total = 0
+
+    def add(self, fish):
+        self.total += 1
+        tokens, grams = species_terms(fish)
+        for kind, terms in (("tokens", tokens), ("grams", grams)):
+            for term in terms:
+                self.postings[kind].setdefault(term, []).append(fish["id"])
+        self.pending += len(tokens) + len(grams)
+        if self.pending >= self.spill_postings:
+            self._spill()
+
+    def _run_path(self, run, key):
+        return os.path.join(self.spill_dir, f"run_{run}_{key}.jsonl")
+
+    def _spill(self):
+        """Write the in-memory postings as the next run: per shard, (kind, term, ids) lines in shard order"""
+        if self.spill_dir is None:
+            self.spill_dir = tempfile.mkdtemp(prefix="search_runs_")
+        for key, entries in self._memory_shards().items():
+            with open(self._run_path(self.runs, key), "w", encoding="utf-8") as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, separators=(",", ":"), ensure_ascii=False) + "\n")
+        self.runs += 1
+        self.postings = {kind: {} for kind in KINDS}
+        self.pending = 0
+
+    def _memory_shards(self):
+        """{shard: [(kind, term, ids)]} for the postings in memory, sorted by kind order then term"""
+        shards = {}
+        for kind in KINDS:
+            for term in sorted(self.postings[kind]):
+                shards.setdefault(shard_key(term), []).append((kind, term, self.postings[kind][term]))
+        return shards
+
+    def _merged(self, key, stack):
+        """One shard's (kind, term, ids) entries merged across every run, in shard order"""
+        runs = [self._run_path(run, key) for run in range(self.runs)]
+        readers = [(json.loads(line) for line in stack.enter_context(open(path, encoding="utf-8")))
+                   for path in runs if os.path.exists(path)]
+        current = None
+        for kind, term, ids in heapq.merge(*readers, key=lambda e: (KINDS.index(e[0]), e[1])):
+            if current and current[0] == kind and current[1] == term:
+                current[2].extend(ids)
+            else:
+                if current:
+                    yield current
+                current = (kind, term, ids)
+        if current:
+            yield current
+
+    def shard_entries(self):
+        """Yield (shard, entries) with each shard's entries produced lazily from memory or the runs"""
+        if self.runs:
+            self._spill()
+            keys = {name[:-len(".jsonl")].split("_", 2)[2] for name in os.listdir(self.spill_dir)}
+            for key in sorted(keys):
+                with ExitStack() as stack:
+                    yield key, self._merged(key, stack)
+        else:
+            shards = self._memory_shards()
+            self.postings = {kind: {} for kind in KINDS}
+            for key in sorted(shards):
+                yield key, iter(shards.pop(key))
+
+    def _write_shard(self, path, entries):
+        """Stream a shard as {"tokens": {...}, "grams": {...}}; returns its manifest entry"""
+        digest = hashlib.sha256()
+        counts = {kind: 0 for kind in KINDS}
+        size = 0
+        with open(path, "wb") as f:
+            def emit(text):
+                nonlocal size
+                data = text.encode("utf-8")
+                f.write(data)
+                digest.update(data)
+                size += len(data)
+
+            kind_index = 0
+            emit('{"tokens":{')
+            for kind, term, ids in entries:
+                while KINDS[kind_index] != kind:
+                    kind_index += 1
+                    emit('},"grams":{')
+                emit(("," if counts[kind] else "") + json.dumps(term, ensure_ascii=False) + ":" +
+                     json.dumps(encode_postings(sorted(set(ids))), separators=(",", ":")))
+                counts[kind] += 1
+            if kind_index == 0:
+                emit('},"grams":{')
+            emit("}}")
+        return {"tokens": counts["tokens"], "grams": counts["grams"], "bytes": size,
+                "sha256": digest.hexdigest()}
+
+    def write(self, index_dir):
+        """Write one search_<prefix>.json per shard plus a search_index.json manifest"""
+        os.makedirs(index_dir, exist_ok=True)
+        for name in os.listdir(index_dir):
+            if name.startswith("search_") and name.endswith(".json"):
+                os.remove(os.path.join(index_dir, name))
+
+        manifest = {
+            "version": 2,
+            "fields": SEARCH_FIELDS,
+            "ngram": NGRAM,
+            "min_ngram": 1,
+            "postings": "delta",
+            "total_species": self.total,
+            "shards": {}
+        }
+        try:
+            for key, entries in self.shard_entries():
+                filename = f"search_{key}.json"
+                manifest["shards"][key] = {"file": filename,
+                                           **self._write_shard(os.path.join(index_dir, filename), entries)}
+        finally:
+            if self.spill_dir is not None:
+                shutil.rmtree(self.spill_dir, ignore_errors=True)
+                self.spill_dir = None
+                self.runs = 0
+
+        with open(os.path.join(index_dir, "search_index.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        return manifest
+
+def write_search_index(database, index_dir):
+    """Build and write the index for a whole database in one call"""
+    builder = SearchIndexBuilder()
+    for fish in database:
+        builder.add(fish)
+    return builder.write(index_dir)
+
+class SearchIndex:
+    """Reads a written index, loading only the shards a query touches"""
+
+    def __init__(self, index_dir):
+        self.index_dir = index_dir
+        with open(os.path.join(index_dir, "search_index.json"), encoding="utf-8") as f:
+            self.manifest = json.load(f)
+        self.shards = {}
+
+    def _shard(self, key):
+        if key not in self.shards:
+            info = self.manifest["shards"].get(key)
+            shard = {"tokens": {}, "grams": {}}
+            if info:
+                with open(os.path.join(self.index_dir, info["file"]), encoding="utf-8") as f:
+                    shard = json.load(f)
+            self.shards[key] = shard
+        return self.shards[key]
+
+    def _token_matches(self, token):
+        """Ids of species with a token containing this query token"""
+        n = self.manifest["ngram"]
+        if len(token) < n:
+            if self.manifest.get("min_ngram", n) <= len(token):
+                # Short grams are indexed whole, so the posting list is the answer
+                return set(decode_postings(self._shard(shard_key(token))["grams"].get(token, [])))
+            # Index built without short grams: match it as a token prefix within its shard
+            ids = set()
+            for term, deltas in self._shard(shard_key(token))["tokens"].items():
+                if term.startswith(token):
+                    ids.update(decode_postings(deltas))
+            return ids
+
+        exact = self._shard(shard_key(token))["tokens"].get(token)
+        ids = None
+        for gram in ngrams(token, n):
+            deltas = self._shard(shard_key(gram))["grams"].get(gram)
+            if deltas is None:
+                return set(decode_postings(exact)) if exact else set()
+            ids = set(decode_postings(deltas)) if ids is None else ids & set(decode_postings(deltas))
+        return ids
+
+    def search(self, query):
+        """
+        Candidate species ids for a query, exact token matches first.
+        Every query token must occur as a substring of some token of a searchable
+        field; n-gram matches can include rare false positives, so callers confirm
+        against the loaded records. Tokens are matched independently: a query with
+        several tokens ("n car") is not a phrase search, and can miss substrings
+        that span a token boundary, so callers wanting searchByName's plain
+        substring semantics must scan for multi-token queries.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return []
+        ids = None
+        for token in tokens:
+            matches = self._token_matches(token)
+            ids = matches if ids is None else ids & matches
+            if not ids:
+                return []
+
+        exact = set()
+        for token in tokens:
+            deltas = self._shard(shard_key(token))["tokens"].get(token)
+            if deltas:
+                exact.update(decode_postings(deltas))
+        return sorted(ids, key=lambda fish_id: (fish_id not in exact, fish_id))
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+SQLite export of the species database
+Normalized tables with B-tree indexes on the filterable columns and an FTS5
+table over names and descriptions, so queries run without parsing the whole
+catalog. Run directly with --benchmark to compare against fish_db_compact.json.
+"""
+import json
+import os
+import time
+import sqlite3
+import argparse
+
+SCHEMA_VERSION = 1
+# Rows buffered before each executemany
+BATCH_SIZE = 1000
+
+SCHEMA = """
+CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+-- pk is internal: species ids are not guaranteed unique in the source data
+CREATE TABLE species (
+    pk INTEGER PRIMARY KEY,
+    id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    scientific_name TEXT,
+    family TEXT,
+    habitat TEXT,
+    max_length_cm REAL,
+    max_weight_kg REAL,
+    max_age_years REAL,
+    diet TEXT,
+    conservation_status TEXT,
+    commercial_importance TEXT,
+    importance_level TEXT,
+    description TEXT,
+    image_url TEXT
+);
+CREATE TABLE common_names (
+    species_pk INTEGER NOT NULL REFERENCES species(pk),
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL
+);
+CREATE TABLE regions (
+    region_id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE species_regions (
+    species_pk INTEGER NOT NULL REFERENCES species(pk),
+    region_id INTEGER NOT NULL REFERENCES regions(region_id),
+    position INTEGER NOT NULL
+);
+CREATE VIRTUAL TABLE species_fts USING fts5(
+    name, scientific_name, common_names, family, description,
+    tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'
+);
+"""
+
+# Created after the bulk load, which is much faster than maintaining them per insert
+INDEXES = """
+CREATE INDEX idx_species_id ON species(id);
+CREATE INDEX idx_species_name ON species(name COLLATE NOCASE);
+CREATE INDEX idx_species_family ON species(family);
+CREATE INDEX idx_species_habitat ON species(habitat);
+CREATE INDEX idx_species_status ON species(conservation_status);
+CREATE INDEX idx_species_importance ON species(importance_level);
+CREATE INDEX idx_species_length ON species(max_length_cm);
+CREATE INDEX idx_common_names_species ON common_names(species_pk);
+CREATE INDEX idx_common_names_name ON common_names(name COLLATE NOCASE);
+CREATE INDEX idx_species_regions_region ON species_regions(region_id, species_pk);
+CREATE INDEX idx_species_regions_species ON species_regions(species_pk);
+"""
+
+class SqliteWriter:
+    """Loads records fed one at a time into a new database, swapped into place on close"""
+
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = path + ".tmp"
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+        self.conn = sqlite3.connect(self.tmp_path)
+        # A build can simply be rerun, so skip the journal while loading
+        self.conn.execute("PRAGMA journal_mode = OFF")
+        self.conn.execute("PRAGMA synchronous = OFF")
+        self.conn.executescript(SCHEMA)
+        self.regions = {}
+        self.pending = {"species": [], "common_names": [], "species_regions": [], "fts": []}
+        self.total = 0
+
+    def add(self, fish):
+        self.total += 1
+        pk = self.total
+        importance = fish.get("commercial_importance") or ""
+        self.pending["species"].append((
+            pk, fish["id"], fish["name"], fish.get("scientific_name"), fish.get("family"), fish.get("habitat"),
+            fish.get("max_length_cm"), fish.get("max_weight_kg"), fish.get("max_age_years"), fish.get("diet"),
+            fish.get("conservation_status"), importance, importance.split(" - ")[0].strip() or None,
+            fish.get("description"), fish.get("image_url")
+        ))
+        for position, name in enumerate(fish.get("common_names") or []):
+            self.pending["common_names"].append((pk, position, name))
+        for position, region in enumerate(fish.get("native_regions") or []):
+            region_id = self.regions.get(region)
+            if region_id is None:
+                region_id = self.regions[region] = len(self.regions) + 1
+                self.conn.execute("INSERT INTO regions (region_id, name) VALUES (?, ?)", (region_id, region))
+            self.pending["species_regions"].append((pk, region_id, position))
+        self.pending["fts"].append((
+            pk, fish["name"], fish.get("scientific_name") or "", " ".join(fish.get("common_names") or []),
+            fish.get("family") or "", fish.get("description") or ""
+        ))
+        if len(self.pending["species"]) >= BATCH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        self.conn.executemany("INSERT INTO species VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                              self.pending["species"])
+        self.conn.executemany("INSERT INTO common_names VALUES (?, ?, ?)", self.pending["common_names"])
+        self.conn.executemany("INSERT INTO species_regions VALUES (?, ?, ?)", self.pending["species_regions"])
+        self.conn.executemany("INSERT INTO species_fts (rowid, name, scientific_name, common_names, family, "
+                              "description) VALUES (?, ?, ?, ?, ?, ?)", self.pending["fts"])
+        for rows in self.pending.values():
+            rows.clear()
+
+    def close(self):
+        self._flush()
+        self.conn.executescript(INDEXES)
+        self.conn.executemany("INSERT INTO meta VALUES (?, ?)", [
+            ("schema_version", str(SCHEMA_VERSION)),
+            ("total_species", str(self.total)),
+            ("built_at", time.strftime("%Y-%m-%dT%H:%M:%S"))
+        ])
+        self.conn.execute("INSERT INTO species_fts (species_fts) VALUES ('optimize')")
+        self.conn.commit()
+        self.conn.execute("ANALYZE")
+        self.conn.execute("VACUUM")
+        self.conn.close()
+        os.replace(self.tmp_path, self.path)
+        return {"path": self.path, "species": self.total, "regions": len(self.regions),
+                "bytes": os.path.getsize(self.path)}
+
+def write_sqlite(database, path):
+    writer = SqliteWriter(path)
+    for fish in database:
+        writer.add(fish)
+    return writer.close()
+
+# Equivalent queries against both stores, used by the benchmark
+def json_queries(records):
+    return {
+        "get_by_id": lambda: [f for f in records if f["id"] == 500],
+        "search_name": lambda: [f for f in records if "carp" in f["name"].lower()
+                                or "carp" in f["scientific_name"].lower()
+                                or any("carp" in n.lower() for n in f["common_names"])
+                                or "carp" in f["family"].lower()],
+        "filter_habitat": lambda: [f for f in records if f["habitat"] == "Marine"],
+        "filter_habitat_region": lambda: [f for f in records if f["habitat"] == "Freshwater"
+                                          and "Ganges River" in f["native_regions"]],
+    }
+
+def sqlite_queries(conn):
+    return {
+        "get_by_id": lambda: conn.execute("SELECT * FROM species WHERE id = ?", (500,)).fetchall(),
+        "search_name": lambda: conn.execute(
+            "SELECT s.* FROM species_fts JOIN species s ON s.pk = species_fts.rowid "
+            "WHERE species_fts MATCH ? ORDER BY rank", ('{name scientific_name common_names family}: carp*',)
+        ).fetchall(),
+        "filter_habitat": lambda: conn.execute("SELECT * FROM species WHERE habitat = ?", ("Marine",)).fetchall(),
+        "filter_habitat_region": lambda: conn.execute(
+            "SELECT s.* FROM species s JOIN species_regions sr ON sr.species_pk = s.pk "
+            "JOIN regions r ON r.region_id = sr.region_id WHERE r.name = ? AND s.habitat = ?",
+            ("Ganges River", "Freshwater")
+        ).fetchall(),
+    }
+
+def time_ms(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return round(timings[len(timings) // 2], 3), result
+
+def benchmark(json_path, sqlite_path, repeat=20):
+    """Median open and query times in ms for the compact JSON path and the SQLite export"""
+    def load_json():
+        with open(json_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    open_json, records = time_ms(load_json, repeat)
+    open_sqlite, conn = time_ms(lambda: sqlite3.connect(f"file:{sqlite_path}?mode=ro", uri=True), repeat)
+    report = {
+        "json": {"file_bytes": os.path.getsize(json_path), "open_ms": open_json, "queries": {}},
+        "sqlite": {"file_bytes": os.path.getsize(sqlite_path), "open_ms": open_sqlite, "queries": {}}
+    }
+    for name, query in json_queries(records).items():
+        ms, rows = time_ms(query, repeat)
+        report["json"]["queries"][name] = {"ms": ms, "rows": len(rows)}
+    for name, query in sqlite_queries(conn).items():
+        ms, rows = time_ms(query, repeat)
+        report["sqlite"]["queries"][name] = {"ms": ms, "rows": len(rows)}
+    conn.close()
+    return report
+
+def main():
+    data_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Build or benchmark the SQLite species database")
+    parser.add_argument("--json", default=os.path.join(data_dir, "fish_db_compact.json"))
+    parser.add_argument("--db", default=os.path.join(data_dir, "fish_db.sqlite"))
+    parser.add_argument("--benchmark", action="store_true", help="compare query times against the JSON path")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if not args.benchmark or not os.path.exists(args.db):
+        with open(args.json, encoding="utf-8") as f:
+            info = write_sqlite(json.load(f), args.db)
+        print(f"✅ Built {info['path']}: {info['species']} species, {info['bytes'] / 1024:.1f} KB")
+    if not args.benchmark:
+        return
+
+    report = benchmark(args.json, args.db, args.repeat)
+    print("=" * 60)
+    print("📊 JSON vs SQLite (median ms)")
+    print("=" * 60)
+    print(f"   {'':24}{'JSON':>12}{'SQLite':>12}")
+    print(f"   {'file size (KB)':24}{report['json']['file_bytes'] / 1024:>12.1f}{report['sqlite']['file_bytes'] / 1024:>12.1f}")
+    print(f"   {'open / parse':24}{report['json']['open_ms']:>12.3f}{report['sqlite']['open_ms']:>12.3f}")
+    for name in report["json"]["queries"]:
+        j, s = report["json"]["queries"][name], report["sqlite"]["queries"][name]
+        print(f"   {name:24}{j['ms']:>12.3f}{s['ms']:>12.3f}   ({j['rows']} / {s['rows']} rows)")
+    print("\n" + json.dumps(report, indent=2))
+
+if __name__ == '__main__':
+    main()
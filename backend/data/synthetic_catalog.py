@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Seeded synthetic species catalogs for load testing
+Records have the same shape as the generated database, with skewed family
+sizes and realistic spreads of name lengths, regions per species and
+description sizes. The same size and seed always produce the same catalog.
+"""
+import math
+import random
+
+HABITATS = [("Freshwater", 0.46), ("Marine", 0.44), ("Brackish", 0.10)]
+
+REGIONS = {
+    "Freshwater": [
+        "Western Ghats", "Eastern Ghats", "Ganges River", "Brahmaputra River", "Godavari River", "Krishna River",
+        "Mahanadi River", "Narmada River", "Tapti River", "Cauvery River", "Yamuna River", "Ghaghara River",
+        "Dal Lake", "Loktak Lake", "Kolleru Lake", "Punjab", "Haryana", "Uttar Pradesh", "Bihar", "Jharkhand",
+        "Chhattisgarh", "Madhya Pradesh", "Rajasthan", "Telangana", "Assam", "Meghalaya", "Manipur", "Tripura"
+    ],
+    "Marine": [
+        "Odisha Coast", "Andhra Pradesh Coast", "Tamil Nadu Coast", "Kerala Coast", "Karnataka Coast", "Goa Coast",
+        "Maharashtra Coast", "Gujarat Coast", "Andaman Islands", "Nicobar Islands", "Lakshadweep Islands",
+        "Bay of Bengal", "Arabian Sea", "Indian Ocean"
+    ],
+    "Brackish": [
+        "Kerala Backwaters", "Chilika Lake", "Vembanad Lake", "Pulicat Lake", "Sundarbans", "West Bengal",
+        "Odisha Coast", "Godavari River"
+    ]
+}
+
+DIETS = {
+    "Freshwater": ["Omnivore - Insects, plants, algae", "Herbivore - Aquatic vegetation",
+                   "Carnivore - Insects, small fish", "Detritivore - Detritus, bottom sediment"],
+    "Marine": ["Carnivore - Small fish, crustaceans", "Omnivore - Plankton, small organisms", "Piscivore - Fish",
+               "Planktivore - Zooplankton"],
+    "Brackish": ["Omnivore - Detritus, small invertebrates", "Carnivore - Crustaceans, molluscs"]
+}
+
+STATUSES = [("Least Concern", 0.55), ("Data Deficient", 0.15), ("Near Threatened", 0.1), ("Vulnerable", 0.08),
+            ("Not Evaluated", 0.07), ("Endangered", 0.04), ("Critically Endangered", 0.01)]
+
+IMPORTANCE = [("High", "Food fish", 0.2), ("Medium", "Food fish", 0.35), ("Medium", "Aquaculture", 0.1),
+              ("Low", "Ornamental", 0.25), ("Low", "Bait fish", 0.1)]
+
+TYPES = ["Carp", "Barb", "Rasbora", "Danio", "Snakehead", "Catfish", "Goby", "Cichlid", "Glassfish", "Eel",
+         "Perch", "Mullet", "Snapper", "Trevally", "Croaker", "Grouper", "Sardine", "Shad", "Anchovy", "Sole",
+         "Mackerel", "Tuna", "Wrasse", "Pufferfish", "Ribbonfish", "Threadfin", "Seabream", "Loach", "Minnow"]
+
+ADJECTIVES = ["Spotted", "Striped", "Golden", "Silver", "Black", "Red", "Blue", "Giant", "Dwarf", "Common",
+              "Banded", "Long-finned", "Short-snout", "Painted", "Slender", "Humped", "Indian", "Malabar",
+              "Bengal", "Deccan", "Himalayan", "Coastal", "Reef", "River", "Mountain"]
+
+SYLLABLES = ["ba", "chi", "da", "ga", "ka", "la", "ma", "na", "pa", "ra", "sa", "ta", "va", "ya", "thi", "pu",
+             "ro", "ne", "li", "mo", "su", "ko", "ri", "an", "el", "or", "is", "um", "ex", "on"]
+
+SENTENCES = [
+    "Found in {regions}.",
+    "{habitat} species of the {family} family.",
+    "Grows to about {length} cm and lives up to {age} years.",
+    "Feeds mainly as a {diet_kind}.",
+    "Known locally as {local}.",
+    "Often caught by artisanal fishers using gill nets and cast nets.",
+    "Prefers slow-moving water with dense vegetation and soft bottoms.",
+    "Spawns during the monsoon when rivers flood adjoining plains.",
+    "Schools near the surface at dawn and dusk.",
+    "Populations have declined locally because of habitat loss and overfishing.",
+    "Popular in the aquarium trade for its colouration.",
+    "Body is elongated and laterally compressed with small cycloid scales."
+]
+
+def weighted(rng, choices):
+    """Pick the first element of a (value, ..., weight) tuple by weight"""
+    total = sum(c[-1] for c in choices)
+    point = rng.random() * total
+    for choice in choices:
+        point -= choice[-1]
+        if point <= 0:
+            return choice
+    return choices[-1]
+
+def word(rng, min_syllables=2, max_syllables=4):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(min_syllables, max_syllables)))
+
+def clamp(value, low, high):
+    return max(low, min(high, value))
+
+class SyntheticCatalog:
+    """
+    Iterates size records for a seed. Families follow a Zipf-like distribution
+    (a few large families, a long tail of small ones), and lengths, region
+    counts and description sizes are drawn from skewed distributions.
+    """
+
+    def __init__(self, size, seed=0, start_id=1):
+        self.size = size
+        self.seed = seed
+        self.start_id = start_id
+        rng = random.Random(f"{seed}:families")
+        # Roughly one family per 25 species, as in the generated database
+        family_count = max(8, size // 25)
+        self.families = [word(rng).capitalize() + "idae" for _ in range(family_count)]
+        self.family_weights = [1 / (rank + 1) ** 1.1 for rank in range(family_count)]
+        self.genera = [word(rng).capitalize() for _ in range(max(16, family_count * 3))]
+
+    def name(self, rng):
+        # Most names are one or two qualifiers plus a type, a few are much longer
+        words = clamp(int(rng.lognormvariate(0.3, 0.5)), 0, 5)
+        qualifiers = rng.sample(ADJECTIVES, words)
+        return " ".join(qualifiers + [rng.choice(TYPES)])
+
+    def description(self, rng, fields):
+        # Log-normal sentence count: median around three, occasionally very long
+        count = clamp(int(rng.lognormvariate(1.1, 0.6)), 1, 40)
+        sentences = SENTENCES[:2] + rng.sample(SENTENCES[2:], min(len(SENTENCES) - 2, max(0, count - 2)))
+        while len(sentences) < count:
+            sentences.append(rng.choice(SENTENCES[4:]))
+        return " ".join(s.format(**fields) for s in sentences[:count])
+
+    def record(self, index):
+        rng = random.Random(f"{self.seed}:{index}")
+        fish_id = self.start_id + index
+        family_rank = rng.choices(range(len(self.families)), weights=self.family_weights)[0]
+        family = self.families[family_rank]
+        habitat = weighted(rng, HABITATS)[0]
+        name = self.name(rng)
+
+        pool = REGIONS[habitat]
+        region_count = clamp(1 + int(rng.expovariate(0.45)), 1, len(pool))
+        native_regions = rng.sample(pool, region_count)
+
+        length = round(clamp(rng.lognormvariate(3.4, 0.8), 2, 600), 1)
+        weight = round(0.01 * (length ** 2.5) / 100, 2)
+        age = int(clamp(2 + math.sqrt(length) * rng.uniform(0.4, 1.2), 1, 80))
+        diet = rng.choice(DIETS[habitat])
+        level, use, _ = weighted(rng, IMPORTANCE)
+        local = word(rng).capitalize()
+        common_names = [name] + [word(rng).capitalize() for _ in range(clamp(int(rng.expovariate(0.8)), 0, 6))]
+
+        fields = {
+            "regions": ", ".join(native_regions[:2]), "habitat": habitat, "family": family, "length": length,
+            "age": age, "diet_kind": diet.split(" - ")[0].lower(), "local": local
+        }
+        genus = self.genera[(family_rank * 3 + rng.randrange(3)) % len(self.genera)]
+        return {
+            "id": fish_id,
+            "name": name,
+            "scientific_name": f"{genus} {word(rng, 2, 3)}{fish_id}",
+            "common_names": common_names,
+            "family": family,
+            "habitat": habitat,
+            "native_regions": native_regions,
+            "max_length_cm": length,
+            "max_weight_kg": weight,
+            "max_age_years": age,
+            "diet": diet,
+            "conservation_status": weighted(rng, STATUSES)[0],
+            "commercial_importance": f"{level} - {use}",
+            "description": self.description(rng, fields),
+            "image_url": f"https://via.placeholder.com/400x300/1e90ff/ffffff?text={name.replace(' ', '+')}"
+        }
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        for index in range(self.size):
+            yield self.record(index)
+
+def iter_synthetic_database(size, seed=0, start_id=1):
+    """Yield a synthetic catalog one record at a time; memory use does not grow with size"""
+    print(f"🐟 Generating synthetic catalog: {size} species, seed {seed}...")
+    yield from SyntheticCatalog(size, seed, start_id)
+    print(f"   ✅ Generated {size} species")
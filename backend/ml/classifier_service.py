@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+"""
+Long-running fish classifier service.
+Loads the models once and serves classification requests over local HTTP with
+per-request deadlines, cancellation of expired work and a bounded queue.
+Prometheus metrics are served at GET /metrics, optionally on their own port.
+With --isolate each worker runs in a child process that is recycled after
+--recycle-after requests or above --max-rss-mb without dropping queued work.
+"""
+import os
+import sys
+import json
+import time
+import queue
+import logging
+import argparse
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from classify_fish import load_models
+from presets import PRESETS
+from service_metrics import ServiceMetrics, read_rss_bytes
+from worker_process import RecyclePolicy, WorkerCrashed, WorkerProcess, run_request
+
+# Usage: classifier_service.py [--host 127.0.0.1] [--port 8765] [--max-queue 16] [--metrics-port N]
+#                              [--isolate [--recycle-after N] [--max-rss-mb MB]]
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_MAX_QUEUE = 16
+DEFAULT_DEADLINE_MS = 30000
+# Extra seconds the HTTP handler waits past a deadline before cancelling the job
+RESPONSE_GRACE = 0.5
+# Seconds between attempts to restart a worker that failed to load models, doubling up to the maximum
+RESTART_BACKOFF = 1.0
+MAX_RESTART_BACKOFF = 30.0
+
+log = logging.getLogger('classifier_service')
+
+class QueueFullError(RuntimeError):
+    """Raised when a request arrives while the service queue is at its bound"""
+
+class Job:
+    __slots__ = ('request', 'deadline', 'future', 'enqueued_at')
+
+    def __init__(self, request, deadline):
+        self.request = request
+        self.deadline = deadline
+        self.future = Future()
+        self.enqueued_at = time.time()
+
+def expired_result(job):
+    return {
+        "success": False,
+        "expired": True,
+        "error": f"Deadline expired after {time.time() - job.enqueued_at:.2f}s in queue"
+    }
+
+class ClassifierService:
+    """
+    Bounded job queue drained by worker threads.
+    One thread uses the loaded models directly (ultralytics and Keras models are
+    not safe for concurrent predict, so several workers require isolate=True),
+    or with isolate=True each thread drives its own WorkerProcess that recycle_policy replaces once it has served too many
+    requests or grown too large. Jobs stay queued while a worker restarts; a restart that
+    fails is retried with backoff, and no job is ever left without a result.
+    """
+
+    def __init__(self, models, max_queue=DEFAULT_MAX_QUEUE, workers=1, metrics=None,
+                 isolate=False, stub=False, recycle_policy=None):
+        if workers > 1 and not isolate:
+            raise ValueError("workers > 1 shares one set of models across threads; use isolate=True")
+        self.models = models
+        self.max_queue = max_queue
+        self.workers = workers
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.metrics = metrics or ServiceMetrics()
+        self.metrics.bind_queue(self.queue_depth)
+        self.isolate = isolate
+        self.stub = stub
+        self.recycle_policy = recycle_policy or RecyclePolicy()
+        self._stopping = threading.Event()
+        self._threads = []
+        self._processes = []
+
+    def start(self):
+        """Start the workers; raises ValueError when a worker already exceeds the RSS ceiling after loading"""
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        for i in range(self.workers):
+            worker = None
+            if self.isolate:
+                worker = WorkerProcess(i, base_dir, stub=self.stub).start()
+                self._processes.append(worker)
+                try:
+                    self.recycle_policy.check_baseline(worker)
+                except ValueError:
+                    self.stop()
+                    raise
+                self.metrics.set_model_load_time(worker.load_seconds)
+            t = threading.Thread(target=self._run, args=(worker,), name=f"classifier-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def stop(self):
+        self._stopping.set()
+        for t in self._threads:
+            t.join()
+        self._threads = []
+        for worker in self._processes:
+            worker.stop()
+        self._processes = []
+
+    def queue_depth(self):
+        return self.queue.qsize()
+
+    def submit(self, request, deadline=None):
+        """Queue a request dict and return a Future; deadline is a time.time() timestamp"""
+        job = Job(request, deadline)
+        try:
+            self.queue.put_nowait(job)
+        except queue.Full:
+            self.metrics.observe_request({"success": False, "queue_full": True}, None, 0.0, request.get('preset'))
+            raise QueueFullError(f"Classifier queue is full ({self.max_queue} requests pending), retry later")
+        return job.future
+
+    def handle(self, job, worker=None):
+        if job.deadline is not None and time.time() >= job.deadline:
+            return expired_result(job)
+        if worker is None:
+            result = run_request(self.models, job.request, job.deadline, self.stub)
+            self.metrics.observe_worker_rss('main', read_rss_bytes())
+            return result
+
+        try:
+            result = worker.run(job.request, job.deadline)
+        except WorkerCrashed as e:
+            log.error("%s; restarting it", e)
+            return {"success": False, "error": str(e)}
+        self.metrics.observe_worker_rss(str(worker.slot), worker.rss)
+        return result
+
+    def _maintain(self, worker):
+        """Replace the worker after the job's result is out if it crashed or the policy says so"""
+        reason = 'crash' if worker.crashed else self.recycle_policy.reason(worker)
+        if reason:
+            self._recycle(worker, reason)
+
+    def _recycle(self, worker, reason):
+        # Runs on this worker's own thread, so queued jobs simply wait for the replacement
+        self.metrics.observe_recycle(reason)
+        worker.stop(reason)
+        delay = RESTART_BACKOFF
+        while not self._stopping.is_set():
+            try:
+                worker.start()
+            except RuntimeError as e:
+                log.error("%s; retrying in %.0fs", e, delay)
+                self._stopping.wait(delay)
+                delay = min(delay * 2, MAX_RESTART_BACKOFF)
+                continue
+            self.metrics.set_model_load_time(worker.load_seconds)
+            try:
+                self.recycle_policy.check_baseline(worker)
+            except ValueError as e:
+                log.warning("%s; it will be recycled after every request", e)
+            return
+
+    def _run(self, worker=None):
+        while not self._stopping.is_set():
+            try:
+                job = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            queue_seconds = time.time() - job.enqueued_at
+            # Skips jobs whose caller already gave up and cancelled the future
+            if job.future.set_running_or_notify_cancel():
+                try:
+                    result = self.handle(job, worker)
+                except Exception as e:
+                    # The caller always gets an answer, even when the worker machinery fails
+                    log.exception("Classifier worker failed on %s", job.request.get('image_path'))
+                    if worker is not None:
+                        # Its pipe may be out of step with the child, so replace it
+                        worker.crashed = True
+                    result = {"success": False, "error": f"Classifier worker failed: {e}"}
+                job.future.set_result(result)
+            else:
+                result = {"success": False, "expired": True}
+            self.metrics.observe_request(result, queue_seconds, time.time() - job.enqueued_at,
+                                         job.request.get('preset'))
+            self.queue.task_done()
+            if worker is not None:
+                self._maintain(worker)
+
+class ClassifierRequestHandler(BaseHTTPRequestHandler):
+    """POST /classify with a JSON body; GET /health and /metrics"""
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status, payload):
+        self._send(status, json.dumps(payload).encode('utf-8'), 'application/json')
+
+    def log_message(self, format, *args):
+        # Keep stdout clean; request logs go to stderr like Python errors
+        sys.stderr.write("%s - %s\n" % (self.address_string(), format % args))
+
+    def do_GET(self):
+        if self.path == '/health':
+            service = self.server.service
+            return self._send_json(200, {"success": True, "queue_depth": service.queue_depth(),
+                                         "max_queue": service.max_queue})
+        if self.path == '/metrics':
+            body = self.server.service.metrics.render().encode('utf-8')
+            return self._send(200, body, 'text/plain; version=0.0.4; charset=utf-8')
+        self._send_json(404, {"success": False, "error": "Not found"})
+
+    def do_POST(self):
+        if self.path != '/classify':
+            return self._send_json(404, {"success": False, "error": "Not found"})
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            if not request.get('image_path') or not request.get('output_path'):
+                raise ValueError("image_path and output_path are required")
+            # Reject unknown presets here: inside a worker they would be a 500 and count toward its recycling
+            if request.get('preset') and request['preset'] not in PRESETS:
+                raise ValueError(f"Unknown preset {request['preset']}; choose from {', '.join(PRESETS)}")
+            deadline_ms = float(request.get('deadline_ms', self.server.default_deadline_ms))
+        except (ValueError, TypeError) as e:
+            return self._send_json(400, {"success": False, "error": str(e)})
+
+        deadline = time.time() + deadline_ms / 1000.0
+        try:
+            future = self.server.service.submit(request, deadline)
+        except QueueFullError as e:
+            return self._send_json(503, {"success": False, "error": str(e), "queue_full": True})
+
+        try:
+            result = future.result(timeout=max(0.0, deadline - time.time()) + RESPONSE_GRACE)
+        except FutureTimeout:
+            # Drop the job if it has not started; a running job stops at its deadline anyway
+            future.cancel()
+            result = {"success": False, "expired": True, "error": f"Deadline of {deadline_ms:.0f}ms exceeded"}
+
+        if result.get('expired'):
+            status = 504
+        else:
+            status = 200 if result.get('success') else 500
+        self._send_json(status, result)
+
+def make_server(service, host=DEFAULT_HOST, port=DEFAULT_PORT, default_deadline_ms=DEFAULT_DEADLINE_MS):
+    server = ThreadingHTTPServer((host, port), ClassifierRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.default_deadline_ms = default_deadline_ms
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve fish classification over local HTTP")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--max-queue', type=int, default=DEFAULT_MAX_QUEUE,
+                        help="requests allowed to wait before new ones are rejected")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="concurrent workers; more than one requires --isolate")
+    parser.add_argument('--default-deadline-ms', type=float, default=DEFAULT_DEADLINE_MS,
+                        help="deadline applied to requests that do not send deadline_ms")
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help="also serve GET /metrics on this port, e.g. for a scraper kept off the API port")
+    parser.add_argument('--stub-models', action='store_true',
+                        help="serve the lightweight stand-in models from stub_models.py (testing only)")
+    parser.add_argument('--isolate', action='store_true',
+                        help="run each worker in its own process so it can be recycled")
+    parser.add_argument('--recycle-after', type=int, default=None,
+                        help="with --isolate, replace a worker after this many requests")
+    parser.add_argument('--max-rss-mb', type=float, default=None,
+                        help="with --isolate, replace a worker whose RSS exceeds this many MB")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stderr, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    if (args.recycle_after or args.max_rss_mb) and not args.isolate:
+        parser.error("--recycle-after and --max-rss-mb require --isolate")
+    if args.workers > 1 and not args.isolate:
+        parser.error("--workers > 1 requires --isolate: loaded models are not safe to share between threads")
+
+    metrics = ServiceMetrics()
+    models = None
+    if not args.isolate:
+        load_started = time.perf_counter()
+        models = load_models(os.path.dirname(os.path.abspath(__file__)), stub=args.stub_models)
+        metrics.set_model_load_time(time.perf_counter() - load_started)
+
+    max_rss_bytes = int(args.max_rss_mb * 2**20) if args.max_rss_mb else None
+    service = ClassifierService(models, max_queue=args.max_queue, workers=args.workers, metrics=metrics,
+                                isolate=args.isolate, stub=args.stub_models,
+                                recycle_policy=RecyclePolicy(args.recycle_after, max_rss_bytes))
+    try:
+        service.start()
+    except ValueError as e:
+        parser.error(f"{e}; raise --max-rss-mb")
+    server = make_server(service, args.host, args.port, args.default_deadline_ms)
+    servers = [server]
+    if args.metrics_port:
+        metrics_server = make_server(service, args.host, args.metrics_port, args.default_deadline_ms)
+        threading.Thread(target=metrics_server.serve_forever, name="metrics-http", daemon=True).start()
+        servers.append(metrics_server)
+
+    print(json.dumps({"success": True, "listening": f"http://{args.host}:{args.port}"}), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for s in servers:
+            s.server_close()
+        service.stop()
+
+if __name__ == '__main__':
+    main()
@@ -2,29 +2,125 @@
 import sys
 import os
 import json
+import time
+import argparse
+import builtins
+import contextlib
+
+_import_started = time.perf_counter()
 import cv2
 import numpy as np
-import tensorflow as tf
-from ultralytics import YOLO
 
-# Usage: classify_fish.py <image_path> <output_path> [padding]
+from presets import PRESETS, models_for_preset, preset_options
+
+# tensorflow and ultralytics are imported inside safe_load_models, after the
+# arguments and model files have been checked, so usage errors fail in milliseconds
+
+# Usage: classify_fish.py <image_path> <output_path> [padding] [options]
+
+USAGE = "Usage: classify_fish.py <image_path> <output_path> [padding]"
+
+# Boxes overlapping more than this (IoU) are treated as the same fish
+DEFAULT_DEDUP_IOU = 0.7
+# Boxes lying this much inside another box are treated as the same fish
+DEFAULT_DEDUP_CONTAINMENT = 0.9
+# Seconds kept in reserve when deciding whether another crop fits before a deadline
+DEFAULT_DEADLINE_MARGIN = 0.05
+# Label -> species map written by the database build (backend/data/label_map.py)
+LABEL_MAP_PATH = os.environ.get('FISH_LABEL_MAP', os.path.join(os.path.dirname(__file__), '..', 'data', 'label_map.json'))
+
+# Seconds per startup phase, included in the output with --startup-report
+startup_timings = {"import_cv2_numpy": time.perf_counter() - _import_started}
+
+@contextlib.contextmanager
+def startup_phase(name):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_timings[name] = startup_timings.get(name, 0.0) + time.perf_counter() - started
+
+class ImportProfiler:
+    """Cumulative import time per top-level package while active, like python -X importtime"""
+
+    def __init__(self):
+        self.times = {}
+        self._original = None
+
+    def __enter__(self):
+        self._original = builtins.__import__
+        builtins.__import__ = self._import
+        return self
+
+    def __exit__(self, *exc):
+        builtins.__import__ = self._original
 
-def safe_load_models(base_dir):
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        top = name.partition('.')[0]
+        if level or top in sys.modules or top in self.times:
+            return self._original(name, globals, locals, fromlist, level)
+        # Reserve the slot so nested imports of the same package are not double counted
+        self.times[top] = 0.0
+        started = time.perf_counter()
+        try:
+            return self._original(name, globals, locals, fromlist, level)
+        finally:
+            self.times[top] = time.perf_counter() - started
+
+    def report(self, limit=15):
+        ranked = sorted(self.times.items(), key=lambda item: item[1], reverse=True)[:limit]
+        return [{"module": name, "cumulative_s": round(seconds, 4)} for name, seconds in ranked]
+
+def model_paths(base_dir):
     # Models folder is at repo root 'models'
     yolo_path = os.path.abspath(os.path.join(base_dir, '..', '..', 'models', 'yolov8sfish.pt'))
     class_path = os.path.abspath(os.path.join(base_dir, '..', '..', 'models', 'fishclass.h5'))
+    return yolo_path, class_path
+
+def models_available(base_dir):
+    return all(os.path.exists(p) for p in model_paths(base_dir))
+
+def load_models(base_dir, stub=False, load_classifier=True):
+    """Load the real models, or the lightweight stand-ins from stub_models when stub is set"""
+    if stub:
+        from stub_models import load_stub_models
+        return load_stub_models()
+    return safe_load_models(base_dir, load_classifier)
+
+def safe_load_models(base_dir, load_classifier=True):
+    """Load (yolo_model, class_model); without load_classifier TensorFlow is never imported"""
+    yolo_path, class_path = model_paths(base_dir)
 
     if not os.path.exists(yolo_path):
         raise FileNotFoundError(f"YOLO model not found at {yolo_path}")
-    if not os.path.exists(class_path):
+    if load_classifier and not os.path.exists(class_path):
         raise FileNotFoundError(f"Classification model not found at {class_path}")
 
-    yolo_model = YOLO(yolo_path)
-    class_model = tf.keras.models.load_model(class_path)
+    with startup_phase("import_ultralytics"):
+        from ultralytics import YOLO
+    with startup_phase("load_yolo"):
+        yolo_model = YOLO(yolo_path)
+    if not load_classifier:
+        return yolo_model, None
+
+    with startup_phase("import_tensorflow"):
+        import tensorflow as tf
+    with startup_phase("load_classifier"):
+        class_model = tf.keras.models.load_model(class_path)
     return yolo_model, class_model
 
 class_labels = ['Bangus', 'Big Head Carp', 'Black Spotted Barb', 'Catfish', 'Climbing Perch', 'Fourfinger Threadfin', 'Freshwater Eel', 'Glass Perchlet', 'Goby', 'Gold Fish', 'Gourami', 'Grass Carp', 'Green Spotted Puffer', 'Indian Carp', 'Indo-Pacific Tarpon', 'Jaguar Gapote', 'Janitor Fish', 'Knifefish', 'Long-Snouted Pipefish', 'Mosquito Fish', 'Mudfish', 'Mullet', 'Pangasius', 'Perch', 'Scat Fish', 'Silver Barb', 'Silver Carp', 'Silver Perch', 'Snakehead', 'Tenpounder', 'Tilapia']
 
+def load_label_species(path=LABEL_MAP_PATH):
+    """label -> {"species_id", "summary"}; empty when the map has not been built"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)['labels']
+    except (OSError, ValueError, KeyError):
+        return {}
+
+label_species = load_label_species()
+
 def classify_fish(class_model, crop):
     img = cv2.resize(crop, (224, 224))
     img = img.astype('float32') / 255.0
@@ -35,72 +131,299 @@ def classify_fish(class_model, crop):
     label = class_labels[class_id] if class_id < len(class_labels) else str(class_id)
     return label, conf
 
-def process_image(image_path, output_path, padding=20):
-    base_dir = os.path.dirname(__file__)
-    yolo_model, class_model = safe_load_models(base_dir)
+def box_overlap(a, b):
+    """Return (IoU, containment) for two xyxy boxes; containment is relative to the smaller box"""
+    ix1, iy1 = max(a[0], b[0]), max(a[1], b[1])
+    ix2, iy2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0, ix2 - ix1) * max(0, iy2 - iy1)
+    if inter == 0:
+        return 0.0, 0.0
+    area_a = (a[2] - a[0]) * (a[3] - a[1])
+    area_b = (b[2] - b[0]) * (b[3] - b[1])
+    union = area_a + area_b - inter
+    iou = inter / union if union > 0 else 0.0
+    smaller = min(area_a, area_b)
+    containment = inter / smaller if smaller > 0 else 0.0
+    return iou, containment
+
+def cluster_boxes(boxes, scores=None, iou_threshold=DEFAULT_DEDUP_IOU, containment_threshold=DEFAULT_DEDUP_CONTAINMENT):
+    """
+    Greedily group boxes that describe the same fish.
+    Boxes are visited in descending score order (area when no scores) and join
+    the first group whose representative they overlap above either threshold.
+    Returns a list of index lists; the first index of each group is its representative.
+    """
+    if scores is None:
+        scores = [(b[2] - b[0]) * (b[3] - b[1]) for b in boxes]
+    order = sorted(range(len(boxes)), key=lambda i: scores[i], reverse=True)
+
+    groups = []
+    for i in order:
+        for group in groups:
+            iou, containment = box_overlap(boxes[group[0]], boxes[i])
+            if iou >= iou_threshold or containment >= containment_threshold:
+                group.append(i)
+                break
+        else:
+            groups.append([i])
+    return groups
+
+def pad_box(box, padding, w, h):
+    x1, y1, x2, y2 = box
+    return max(0, x1 - padding), max(0, y1 - padding), min(w, x2 + padding), min(h, y2 + padding)
 
-    img = cv2.imread(image_path)
+def draw_detection(img, bbox, label, conf):
+    x1_p, y1_p, x2_p, y2_p = bbox
+    cv2.rectangle(img, (x1_p, y1_p), (x2_p, y2_p), (0, 255, 0), 2)
+    cv2.putText(img, f"{label} ({conf:.2f})", (x1_p, max(0, y1_p - 10)), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,255,0), 2)
+
+def process_image(image_path, output_path, padding=20, dedup=True, dedup_iou=DEFAULT_DEDUP_IOU,
+                  dedup_containment=DEFAULT_DEDUP_CONTAINMENT, dedup_mode='fanout',
+                  models=None, deadline=None, deadline_margin=DEFAULT_DEADLINE_MARGIN, on_event=None, image=None,
+                  on_crop=None, predict_options=None, classify=True, render=True, species_summary=False):
+    """
+    Detect and classify every fish in an image.
+    With dedup enabled, overlapping boxes are clustered first and only one
+    representative crop per cluster is classified. dedup_mode 'fanout' keeps every
+    box and copies the cluster's label onto it; 'merge' reports one detection per cluster.
+    models is an already loaded (yolo_model, class_model) pair; they are loaded from
+    disk when omitted. deadline is a time.time() timestamp: once the next crop would
+    not finish before it, the remaining crops are skipped and the result is flagged partial.
+    on_event, when given, is called with a 'detections' event as soon as boxes are known
+    and a 'detection' (or 'unclassified') event per box as its crop is classified.
+    image is an already decoded BGR frame (e.g. from a video feed); it is drawn on in place.
+    on_crop, when given, is called with (crop, detection) for every labelled box, the crop
+    taken from the undrawn image. output_path None skips writing the annotated image.
+    predict_options is forwarded to the detector (imgsz, conf, iou); with classify off
+    only detector boxes and scores are reported, and with render off nothing is drawn or written.
+    Labelled detections carry the catalog species_id from the label map, plus a compact
+    species record under "species" when species_summary is set.
+    """
+    # Seconds spent per stage, reported back so services can export latency metrics
+    timings = {}
+    stage_start = time.perf_counter()
+
+    # Decode before loading models so a bad upload is rejected without paying for them
+    img = cv2.imread(image_path) if image is None else image
     if img is None:
         return {"success": False, "error": f"Could not read image {image_path}"}
+    timings["decode"] = time.perf_counter() - stage_start
+
+    if models is None:
+        stage_start = time.perf_counter()
+        base_dir = os.path.dirname(__file__)
+        models = safe_load_models(base_dir, load_classifier=classify)
+        timings["load"] = time.perf_counter() - stage_start
+    yolo_model, class_model = models
+    # Annotations are drawn in place, so exported crops come from an untouched copy
+    clean = img.copy() if on_crop is not None and render else img
 
     h, w = img.shape[:2]
-    results = yolo_model.predict(img, verbose=False)
-    detections = []
-    fish_count = 0
+    stage_start = time.perf_counter()
+    results = yolo_model.predict(img, verbose=False, **(predict_options or {}))
 
+    boxes = []
+    scores = []
     for r in results:
         if getattr(r, 'boxes', None) is None:
             continue
-        boxes = r.boxes.xyxy.cpu().numpy().astype(int)
-        for box in boxes:
-            x1, y1, x2, y2 = box.tolist()
-            x1_p = max(0, x1 - padding)
-            y1_p = max(0, y1 - padding)
-            x2_p = min(w, x2 + padding)
-            y2_p = min(h, y2 + padding)
-
-            crop = img[y1_p:y2_p, x1_p:x2_p]
-            if crop.size == 0:
-                continue
-
-            label, conf = classify_fish(class_model, crop)
-            fish_count += 1
+        xyxy = r.boxes.xyxy.cpu().numpy().astype(int)
+        conf = r.boxes.conf.cpu().numpy() if getattr(r.boxes, 'conf', None) is not None else None
+        for i, box in enumerate(xyxy):
+            boxes.append(tuple(box.tolist()))
+            scores.append(float(conf[i]) if conf is not None else None)
+
+    if dedup and boxes:
+        group_scores = scores if all(s is not None for s in scores) else None
+        groups = cluster_boxes(boxes, group_scores, dedup_iou, dedup_containment)
+    else:
+        groups = [[i] for i in range(len(boxes))]
+
+    timings["detect"] = time.perf_counter() - stage_start
+    stage_start = time.perf_counter()
+
+    if on_event is not None:
+        on_event({
+            "event": "detections",
+            "boxes": [[int(v) for v in pad_box(box, padding, w, h)] for box in boxes],
+            "groups": len(groups),
+            "image_size": [w, h]
+        })
+
+    detections = []
+    unclassified = []
+    fish_count = 0
+    classifier_calls = 0
+    slowest_crop = 0.0
 
-            detections.append({
-                "bbox": [int(x1_p), int(y1_p), int(x2_p), int(y2_p)],
+    if not classify:
+        # Count-only: report the detector's boxes without running the classifier
+        for group_id, group in enumerate(groups):
+            for idx in (group if dedup_mode == 'fanout' else group[:1]):
+                bbox = pad_box(boxes[idx], padding, w, h)
+                fish_count += 1
+                detection = {"bbox": [int(v) for v in bbox], "score": scores[idx]}
+                if dedup:
+                    detection["group"] = group_id
+                detections.append(detection)
+                if render:
+                    cv2.rectangle(img, (bbox[0], bbox[1]), (bbox[2], bbox[3]), (0, 255, 0), 2)
+                if on_event is not None:
+                    on_event({"event": "detection", **detection})
+
+    for group_id, group in enumerate(groups if classify else []):
+        rep_bbox = pad_box(boxes[group[0]], padding, w, h)
+        x1_p, y1_p, x2_p, y2_p = rep_bbox
+        crop = clean[y1_p:y2_p, x1_p:x2_p]
+        if crop.size == 0:
+            continue
+
+        members = group if dedup_mode == 'fanout' else group[:1]
+        if deadline is not None and time.time() + slowest_crop + deadline_margin > deadline:
+            # Not enough time left for another crop: report the box without a label
+            for idx in members:
+                bbox = pad_box(boxes[idx], padding, w, h)
+                fish_count += 1
+                unclassified.append([int(v) for v in bbox])
+                if render:
+                    cv2.rectangle(img, (bbox[0], bbox[1]), (bbox[2], bbox[3]), (0, 165, 255), 2)
+                if on_event is not None:
+                    on_event({"event": "unclassified", "bbox": unclassified[-1]})
+            continue
+
+        started = time.time()
+        label, conf = classify_fish(class_model, crop)
+        slowest_crop = max(slowest_crop, time.time() - started)
+        classifier_calls += 1
+
+        for idx in members:
+            bbox = pad_box(boxes[idx], padding, w, h)
+            fish_count += 1
+            detection = {
+                "bbox": [int(v) for v in bbox],
                 "label": label,
                 "confidence": float(conf)
-            })
+            }
+            species = label_species.get(label)
+            if species is not None:
+                # Labels without a unique record in the shipped catalog carry no species_id
+                if "species_id" in species:
+                    detection["species_id"] = species["species_id"]
+                if species_summary:
+                    detection["species"] = species["summary"]
+            if dedup:
+                detection["group"] = group_id
+                if dedup_mode == 'merge':
+                    detection["merged_boxes"] = len(group)
+            detections.append(detection)
+            if on_crop is not None:
+                on_crop(clean[bbox[1]:bbox[3], bbox[0]:bbox[2]], detection)
+            if render:
+                draw_detection(img, bbox, label, conf)
+            if on_event is not None:
+                on_event({"event": "detection", **detection})
 
-            cv2.rectangle(img, (x1_p, y1_p), (x2_p, y2_p), (0, 255, 0), 2)
-            cv2.putText(img, f"{label} ({conf:.2f})", (x1_p, max(0, y1_p - 10)), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0,255,0), 2)
+    timings["classify"] = time.perf_counter() - stage_start
+    stage_start = time.perf_counter()
 
-    # Ensure output dir exists
-    outdir = os.path.dirname(output_path)
-    os.makedirs(outdir, exist_ok=True)
-    cv2.imwrite(output_path, img)
+    if not render:
+        output_path = None
+    if output_path is not None:
+        # Ensure output dir exists
+        outdir = os.path.dirname(output_path)
+        os.makedirs(outdir, exist_ok=True)
+        cv2.imwrite(output_path, img)
+    timings["render"] = time.perf_counter() - stage_start
 
-    return {
+    result = {
         "success": True,
         "output_image": output_path,
         "fish_count": fish_count,
-        "detections": detections
+        "detections": detections,
+        "classifier_calls": classifier_calls,
+        # Nothing is saved when the classifier never runs
+        "classifier_calls_saved": len(boxes) - len(groups) if classify else 0,
+        "timings": timings
     }
+    if unclassified:
+        result["partial"] = True
+        result["unclassified"] = unclassified
+    return result
+
+def emit_event(event):
+    """Write one NDJSON line and flush so the reader sees it immediately"""
+    sys.stdout.write(json.dumps(event) + "\n")
+    sys.stdout.flush()
+
+class JsonArgumentParser(argparse.ArgumentParser):
+    """ArgumentParser that reports usage errors as JSON on stdout, like the rest of the script"""
+
+    def error(self, message):
+        print(json.dumps({"success": False, "error": f"{message}. {USAGE}"}))
+        sys.exit(1)
+
+def build_arg_parser():
+    parser = JsonArgumentParser(description="Detect and classify fish in an image")
+    parser.add_argument('image_path')
+    parser.add_argument('output_path')
+    parser.add_argument('padding', nargs='?', type=int, default=20)
+    parser.add_argument('--no-dedup', dest='dedup', action='store_false',
+                        help="classify every detected box, even heavily overlapping ones")
+    parser.add_argument('--dedup-iou', type=float, default=DEFAULT_DEDUP_IOU,
+                        help="IoU at or above which two boxes are the same fish")
+    parser.add_argument('--dedup-containment', type=float, default=DEFAULT_DEDUP_CONTAINMENT,
+                        help="fraction of the smaller box inside the larger one at which two boxes are the same fish")
+    parser.add_argument('--dedup-mode', choices=['fanout', 'merge'], default=None,
+                        help="fanout (default): keep every box with its group's label; merge: one detection per group")
+    parser.add_argument('--preset', choices=list(PRESETS), default=None,
+                        help="speed/accuracy preset: detector size, thresholds, backend, classify and render")
+    parser.add_argument('--species-summary', action='store_true',
+                        help='attach a compact species record to each labelled detection')
+    parser.add_argument('--stub-models', action='store_true',
+                        help="use the lightweight stand-in models from stub_models.py (testing only)")
+    parser.add_argument('--stream', action='store_true',
+                        help="print NDJSON events: boxes after detection, one per classified crop, then a summary")
+    parser.add_argument('--startup-report', action='store_true',
+                        help="add per-phase startup timings and the slowest imports to the output")
+    return parser
 
 def main():
     if len(sys.argv) < 3:
-        print(json.dumps({"success": False, "error": "Usage: classify_fish.py <image_path> <output_path> [padding]"}))
+        print(json.dumps({"success": False, "error": USAGE}))
         sys.exit(1)
 
-    image_path = sys.argv[1]
-    output_path = sys.argv[2]
-    padding = int(sys.argv[3]) if len(sys.argv) >= 4 else 20
+    with startup_phase("parse_args"):
+        args = build_arg_parser().parse_args()
 
+    profiler = ImportProfiler() if args.startup_report else contextlib.nullcontext()
+    on_event = emit_event if args.stream else None
     try:
-        result = process_image(image_path, output_path, padding)
-        print(json.dumps(result))
+        with profiler:
+            models = load_models(os.path.dirname(__file__), stub=True) if args.stub_models else None
+            options = {"dedup": args.dedup, "species_summary": args.species_summary}
+            if args.preset:
+                options.update(preset_options(args.preset))
+                models, backend = models_for_preset(args.preset, models, stub=args.stub_models)
+            # An explicit --dedup-mode overrides the preset's
+            if args.dedup_mode:
+                options["dedup_mode"] = args.dedup_mode
+            result = process_image(args.image_path, args.output_path, args.padding,
+                                   dedup_iou=args.dedup_iou, dedup_containment=args.dedup_containment,
+                                   models=models, on_event=on_event, **options)
+            if args.preset:
+                result.update({"preset": args.preset, "backend": backend})
+        if args.startup_report:
+            result["startup"] = {
+                "phases": {k: round(v, 4) for k, v in startup_timings.items()},
+                "imports": profiler.report()
+            }
+        if args.stream:
+            emit_event({"event": "summary", **result})
+        else:
+            print(json.dumps(result))
     except Exception as e:
-        print(json.dumps({"success": False, "error": str(e)}))
+        error = {"success": False, "error": str(e)}
+        print(json.dumps({"event": "summary", **error} if args.stream else error))
         sys.exit(1)
 
 if __name__ == '__main__':
@@ -1,12 +1,63 @@
 #!/usr/bin/env python3
 """
 Convert fish classification models to TensorFlow Lite for mobile deployment
+
+With --matrix, export every combination of input size, precision and format
+and write a manifest with file size, CPU latency and accuracy delta per artifact.
+With --prune and/or --cluster, emit classifier variants that compress smaller for
+download and report their sparsity, compressed size and latency. Pruning zeroes
+filters in place, so layer shapes, FLOPs and latency stay those of the baseline.
+
+Default conversions run in parallel processes and are skipped when the source
+weights and conversion options are unchanged since the last successful run.
+With --autotune, sweep interpreter settings for every converted artifact on this
+machine and write models/runtime_config.json for the inference backends.
+With --fused, export one graph that runs detection, NMS, crop-and-resize and the
+classifier, so a single invocation returns labelled boxes.
 """
 import os
 import sys
+import gzip
+import json
+import hashlib
+import traceback
+import multiprocessing
+import time
+import shutil
+import argparse
+import tempfile
 import tensorflow as tf
 import numpy as np
 from ultralytics import YOLO
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from runtime_config import (RUNTIME_CONFIG_PATH, ONNX_OPT_LEVELS, artifact_key, host_fingerprint,
+                            load_runtime_config, make_onnx_session, make_tflite_interpreter)
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+MODELS_DIR = os.path.join(BASE_DIR, 'models')
+EXPORT_DIR = os.path.join(MODELS_DIR, 'exports')
+CACHE_INDEX_PATH = os.path.join(MODELS_DIR, '.conversion_cache.json')
+CALIBRATION_PATH = os.path.join(BASE_DIR, 'backend', 'calibration_image_sample_data_20x128x128x3_float32.npy')
+
+MATRIX_SIZES = [320, 416, 640]
+MATRIX_PRECISIONS = ['fp32', 'fp16', 'int8']
+MATRIX_FORMATS = ['tflite', 'onnx']
+CLASSIFIER_SIZE = 224
+REFERENCE_YOLO_SIZE = 640
+# Bump when conversion code changes in a way that should invalidate cached artifacts
+CONVERTER_VERSION = 1
+
+CLASS_LABELS = [
+    'Bangus', 'Big Head Carp', 'Black Spotted Barb', 'Catfish', 
+    'Climbing Perch', 'Fourfinger Threadfin', 'Freshwater Eel', 
+    'Glass Perchlet', 'Goby', 'Gold Fish', 'Gourami', 'Grass Carp', 
+    'Green Spotted Puffer', 'Indian Carp', 'Indo-Pacific Tarpon', 
+    'Jaguar Gapote', 'Janitor Fish', 'Knifefish', 'Long-Snouted Pipefish', 
+    'Mosquito Fish', 'Mudfish', 'Mullet', 'Pangasius', 'Perch', 
+    'Scat Fish', 'Silver Barb', 'Silver Carp', 'Silver Perch', 
+    'Snakehead', 'Tenpounder', 'Tilapia'
+]
 
 def convert_keras_to_tflite():
     """Convert fishclass.h5 to TensorFlow Lite"""
@@ -52,21 +103,31 @@ def convert_keras_to_tflite():
     
     return output_path
 
-def convert_yolo_to_tflite():
+def export_yolo_isolated(output_path, **export_kwargs):
+    """
+    Run a YOLO export on a private copy of yolov8sfish.pt.
+    Ultralytics writes intermediates next to the weights (the TFLite export also
+    emits an .onnx), so parallel exports must not share a directory.
+    """
+    with tempfile.TemporaryDirectory(prefix='yolo_export_') as tmp:
+        weights = os.path.join(tmp, 'yolov8sfish.pt')
+        shutil.copyfile(os.path.join(MODELS_DIR, 'yolov8sfish.pt'), weights)
+        exported = YOLO(weights).export(**export_kwargs)
+        if os.path.isdir(exported):
+            # saved_model exports are directories
+            shutil.copytree(exported, output_path, dirs_exist_ok=True)
+        else:
+            shutil.copyfile(exported, output_path)
+    return output_path
+
+def convert_yolo_to_tflite(imgsz=640):
     """Convert YOLOv8 to TensorFlow Lite"""
     print("\n🔄 Converting yolov8sfish.pt to TensorFlow Lite...")
     
     try:
-        # Load YOLO model
-        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        model_path = os.path.join(base_dir, 'models', 'yolov8sfish.pt')
-        model = YOLO(model_path)
-        
-        print(f"   Model loaded: YOLOv8")
-        
-        # Export to TensorFlow Lite
         # YOLOv8 has built-in export functionality
-        output_path = model.export(format='tflite', imgsz=640)
+        output_path = export_yolo_isolated(os.path.join(MODELS_DIR, 'yolov8sfish_float32.tflite'),
+                                           format='tflite', imgsz=imgsz)
         
         file_size_mb = os.path.getsize(output_path) / (1024 * 1024)
         print(f"   ✅ Saved to: {output_path}")
@@ -77,20 +138,16 @@ def convert_yolo_to_tflite():
     except Exception as e:
         print(f"   ⚠️  Error: {e}")
         print(f"   💡 YOLOv8 export to TFLite may require additional dependencies")
-        print(f"   💡 Alternative: Use ONNX format and convert manually")
-        return None
+        print(f"   💡 Alternative: Use the ONNX export and convert manually")
+        raise
 
-def export_yolo_to_onnx():
+def export_yolo_to_onnx(imgsz=640):
     """Export YOLO to ONNX as alternative"""
     print("\n🔄 Exporting YOLOv8 to ONNX (alternative format)...")
     
     try:
-        base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-        model_path = os.path.join(base_dir, 'models', 'yolov8sfish.pt')
-        model = YOLO(model_path)
-        
-        # Export to ONNX
-        output_path = model.export(format='onnx', imgsz=640)
+        output_path = export_yolo_isolated(os.path.join(MODELS_DIR, 'yolov8sfish.onnx'),
+                                           format='onnx', imgsz=imgsz)
         
         file_size_mb = os.path.getsize(output_path) / (1024 * 1024)
         print(f"   ✅ Saved to: {output_path}")
@@ -101,7 +158,114 @@ def export_yolo_to_onnx():
         
     except Exception as e:
         print(f"   ⚠️  Error: {e}")
-        return None
+        raise
+
+_sha256_memo = {}
+
+def file_sha256(path):
+    """SHA-256 of a file, memoized on (path, size, mtime) so repeated keys do not re-read weights"""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    if memo_key not in _sha256_memo:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+        _sha256_memo[memo_key] = digest.hexdigest()
+    return _sha256_memo[memo_key]
+
+def cache_key(source_path, options):
+    payload = {"source": file_sha256(source_path), "options": options, "converter": CONVERTER_VERSION}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+def load_cache_index():
+    try:
+        with open(CACHE_INDEX_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_cache_index(index):
+    with open(CACHE_INDEX_PATH, 'w') as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+
+def is_cached(index, output_path, key):
+    entry = index.get(os.path.relpath(output_path, MODELS_DIR).replace('\\', '/'))
+    return bool(entry) and entry.get('key') == key and os.path.exists(output_path) \
+        and os.path.getsize(output_path) == entry.get('size_bytes')
+
+def record_cache(index, output_path, key):
+    index[os.path.relpath(output_path, MODELS_DIR).replace('\\', '/')] = {
+        "key": key,
+        "size_bytes": os.path.getsize(output_path),
+        "updated_at": time.strftime('%Y-%m-%dT%H:%M:%S')
+    }
+
+# Independent default conversions: source weights, output artifact and the options that shape it
+CONVERSION_TASKS = {
+    'keras_tflite': {"source": 'fishclass.h5', "output": 'fishclass.tflite',
+                     "options": {"format": 'tflite', "precision": 'fp16'}},
+    'yolo_tflite': {"source": 'yolov8sfish.pt', "output": 'yolov8sfish_float32.tflite',
+                    "options": {"format": 'tflite', "imgsz": 640}},
+    'yolo_onnx': {"source": 'yolov8sfish.pt', "output": 'yolov8sfish.onnx',
+                  "options": {"format": 'onnx', "imgsz": 640}},
+}
+
+def run_conversion_task(name):
+    """Entry point of a conversion worker process; always returns a result dict"""
+    started = time.perf_counter()
+    try:
+        if name == 'keras_tflite':
+            path = convert_keras_to_tflite()
+        elif name == 'yolo_tflite':
+            path = convert_yolo_to_tflite(CONVERSION_TASKS[name]["options"]["imgsz"])
+        else:
+            path = export_yolo_to_onnx(CONVERSION_TASKS[name]["options"]["imgsz"])
+        return {"task": name, "status": "ok", "path": path, "seconds": round(time.perf_counter() - started, 1)}
+    except Exception as e:
+        return {"task": name, "status": "error", "error": str(e), "traceback": traceback.format_exc(),
+                "seconds": round(time.perf_counter() - started, 1)}
+
+def convert_all(tasks=None, jobs=None, force=False):
+    """Run the default conversions in parallel processes, skipping ones whose cache key still matches"""
+    tasks = tasks or list(CONVERSION_TASKS)
+    index = load_cache_index()
+    results = []
+    pending = {}
+    for name in tasks:
+        spec = CONVERSION_TASKS[name]
+        output_path = os.path.join(MODELS_DIR, spec["output"])
+        source_path = os.path.join(MODELS_DIR, spec["source"])
+        if not os.path.exists(source_path):
+            results.append({"task": name, "status": "error", "error": f"{spec['source']} not found at {source_path}"})
+            continue
+        key = cache_key(source_path, spec["options"])
+        if not force and is_cached(index, output_path, key):
+            print(f"♻️  {name}: {spec['source']} unchanged, keeping {spec['output']}")
+            results.append({"task": name, "status": "cached", "path": output_path, "seconds": 0.0})
+        else:
+            pending[name] = (output_path, key)
+
+    if pending:
+        # Spawned workers keep TensorFlow and torch state out of each other's way
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=jobs or len(pending), mp_context=context) as pool:
+            futures = {pool.submit(run_conversion_task, name): name for name in pending}
+            for future in as_completed(futures):
+                name = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # The worker process itself died, e.g. killed for memory
+                    result = {"task": name, "status": "error", "error": f"worker crashed: {e}"}
+                if result["status"] == "ok":
+                    output_path, key = pending[name]
+                    record_cache(index, output_path, key)
+                results.append(result)
+        save_cache_index(index)
+
+    order = {name: i for i, name in enumerate(tasks)}
+    return sorted(results, key=lambda r: order[r["task"]])
 
 def create_labels_file():
     """Create a labels file for the classification model"""
@@ -109,16 +273,7 @@ def create_labels_file():
     
     base_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
     
-    class_labels = [
-        'Bangus', 'Big Head Carp', 'Black Spotted Barb', 'Catfish', 
-        'Climbing Perch', 'Fourfinger Threadfin', 'Freshwater Eel', 
-        'Glass Perchlet', 'Goby', 'Gold Fish', 'Gourami', 'Grass Carp', 
-        'Green Spotted Puffer', 'Indian Carp', 'Indo-Pacific Tarpon', 
-        'Jaguar Gapote', 'Janitor Fish', 'Knifefish', 'Long-Snouted Pipefish', 
-        'Mosquito Fish', 'Mudfish', 'Mullet', 'Pangasius', 'Perch', 
-        'Scat Fish', 'Silver Barb', 'Silver Carp', 'Silver Perch', 
-        'Snakehead', 'Tenpounder', 'Tilapia'
-    ]
+    class_labels = CLASS_LABELS
     
     output_path = os.path.join(base_dir, 'models', 'labels.txt')
     with open(output_path, 'w') as f:
@@ -128,22 +283,693 @@ def create_labels_file():
     print(f"   ✅ Saved {len(class_labels)} labels to: {output_path}")
     return output_path
 
+# Label for accuracy deltas measured without --eval-images
+UNREPRESENTATIVE_EVAL_SET = "calibration (not representative)"
+
+def load_eval_images(image_dir=None, limit=20):
+    """
+    (RGB float32 images in [0, 1], eval set name, calibration images) for the accuracy deltas.
+    Eval images come from image_dir and the whole bundled calibration sample calibrates INT8.
+    Without image_dir the sample is split in two: the first half calibrates, the second half
+    is held out for evaluation; it is generic imagery, not fish, so those deltas are
+    reported as not representative.
+    """
+    calibration = list(np.load(CALIBRATION_PATH))
+    if image_dir:
+        import cv2
+        images = []
+        for name in sorted(os.listdir(image_dir)):
+            img = cv2.imread(os.path.join(image_dir, name))
+            if img is not None:
+                images.append(cv2.cvtColor(img, cv2.COLOR_BGR2RGB).astype(np.float32) / 255.0)
+            if len(images) >= limit:
+                break
+        if images:
+            return images, os.path.abspath(image_dir), calibration
+    half = len(calibration) // 2
+    return calibration[half:][:limit], UNREPRESENTATIVE_EVAL_SET, calibration[:half]
+
+def resize_batch(images, size):
+    return np.stack([tf.image.resize(img, (size, size)).numpy() for img in images]).astype(np.float32)
+
+def convert_onnx_precision(src_path, precision, output_path):
+    """Post-process an FP32 ONNX graph into FP16 (onnxconverter-common) or dynamic INT8 (onnxruntime)"""
+    if precision == 'fp32':
+        shutil.copyfile(src_path, output_path)
+    elif precision == 'fp16':
+        import onnx
+        from onnxconverter_common import float16
+        onnx.save(float16.convert_float_to_float16(onnx.load(src_path), keep_io_types=True), output_path)
+    elif precision == 'int8':
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        quantize_dynamic(src_path, output_path, weight_type=QuantType.QInt8)
+    return output_path
+
+def export_classifier_variant(model, precision, fmt, output_path, calibration):
+    """Export fishclass.h5 at one precision/format"""
+    if fmt == 'tflite':
+        converter = tf.lite.TFLiteConverter.from_keras_model(model)
+        if precision == 'fp16':
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            converter.target_spec.supported_types = [tf.float16]
+        elif precision == 'int8':
+            converter.optimizations = [tf.lite.Optimize.DEFAULT]
+            converter.representative_dataset = lambda: ([img[None]] for img in calibration)
+        with open(output_path, 'wb') as f:
+            f.write(converter.convert())
+        return output_path
+
+    import tf2onnx
+    spec = (tf.TensorSpec((None,) + tuple(model.input_shape[1:]), tf.float32, name='input'),)
+    with tempfile.TemporaryDirectory() as tmp:
+        fp32_path = os.path.join(tmp, 'fishclass_fp32.onnx')
+        tf2onnx.convert.from_keras(model, input_signature=spec, output_path=fp32_path)
+        return convert_onnx_precision(fp32_path, precision, output_path)
+
+def export_yolo_variant(imgsz, precision, fmt, output_path, calibration_data=None):
+    """Export yolov8sfish.pt at one input size/precision/format"""
+    if fmt == 'tflite':
+        kwargs = {'format': 'tflite', 'imgsz': imgsz}
+        if precision == 'fp16':
+            kwargs['half'] = True
+        elif precision == 'int8':
+            kwargs['int8'] = True
+            if calibration_data:
+                kwargs['data'] = calibration_data
+        return export_yolo_isolated(output_path, **kwargs)
+
+    # Ultralytics only emits FP16 ONNX on GPU, so quantize the FP32 graph on the host instead
+    with tempfile.TemporaryDirectory() as tmp:
+        fp32_path = export_yolo_isolated(os.path.join(tmp, 'yolov8sfish_fp32.onnx'), format='onnx', imgsz=imgsz)
+        return convert_onnx_precision(fp32_path, precision, output_path)
+
+def make_runner(path, fmt, settings=None):
+    """
+    Return (run(batch) -> output, input_shape) for a TFLite or ONNX artifact on CPU.
+    settings overrides the tuned runtime config; by default the config is applied if present.
+    """
+    if fmt == 'tflite':
+        interpreter = make_tflite_interpreter(path, settings)
+        inp = interpreter.get_input_details()[0]
+        out = interpreter.get_output_details()[0]
+
+        def run(batch):
+            if inp['dtype'] in (np.int8, np.uint8):
+                scale, zero_point = inp['quantization']
+                batch = np.clip(np.round(batch / scale + zero_point), np.iinfo(inp['dtype']).min,
+                                np.iinfo(inp['dtype']).max)
+            interpreter.set_tensor(inp['index'], batch.astype(inp['dtype']))
+            interpreter.invoke()
+            result = interpreter.get_tensor(out['index'])
+            if out['dtype'] in (np.int8, np.uint8):
+                scale, zero_point = out['quantization']
+                result = (result.astype(np.float32) - zero_point) * scale
+            return result
+        return run, [int(d) for d in inp['shape']]
+
+    session = make_onnx_session(path, settings)
+    inp = session.get_inputs()[0]
+    dtype = np.float16 if 'float16' in inp.type else np.float32
+
+    def run(batch):
+        return session.run(None, {inp.name: batch.astype(dtype)})[0]
+    return run, [d if isinstance(d, int) else 1 for d in inp.shape]
+
+def to_layout(batch, shape):
+    """Transpose NHWC images to NCHW when the artifact expects channels first"""
+    return np.transpose(batch, (0, 3, 1, 2)) if shape[1] == 3 else batch
+
+def measure_latency(run, shape, warmup=3, runs=20):
+    """Median and p90 single-image CPU latency in milliseconds"""
+    sample = np.random.default_rng(0).random(shape, dtype=np.float32)
+    for _ in range(warmup):
+        run(sample)
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        run(sample)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {"median": round(timings[len(timings) // 2], 2), "p90": round(timings[int(len(timings) * 0.9) - 1], 2)}
+
+def classifier_accuracy_delta(run, shape, reference_probs, batch):
+    """1 - top-1 agreement with the Keras model, plus mean absolute probability error"""
+    batch = to_layout(batch, shape)
+    probs = np.concatenate([run(batch[i:i + 1]) for i in range(len(batch))])
+    agreement = float(np.mean(np.argmax(probs, axis=1) == np.argmax(reference_probs, axis=1)))
+    return {"accuracy_delta": round(1.0 - agreement, 4),
+            "mean_abs_prob_error": round(float(np.mean(np.abs(probs - reference_probs))), 5),
+            "accuracy_metric": "1 - top-1 agreement with fishclass.h5"}
+
+def box_f1(predicted, reference, iou_threshold=0.5):
+    """F1 of greedy IoU matching between two xyxy box lists"""
+    if not predicted and not reference:
+        return 1.0
+    unmatched = list(reference)
+    matches = 0
+    for box in predicted:
+        best, best_iou = None, iou_threshold
+        for ref in unmatched:
+            ix = max(0, min(box[2], ref[2]) - max(box[0], ref[0]))
+            iy = max(0, min(box[3], ref[3]) - max(box[1], ref[1]))
+            inter = ix * iy
+            union = (box[2] - box[0]) * (box[3] - box[1]) + (ref[2] - ref[0]) * (ref[3] - ref[1]) - inter
+            iou = inter / union if union > 0 else 0.0
+            if iou >= best_iou:
+                best, best_iou = ref, iou
+        if best is not None:
+            unmatched.remove(best)
+            matches += 1
+    return 2.0 * matches / (len(predicted) + len(reference))
+
+def detect_boxes(model, images, imgsz):
+    uint8_images = [(img[..., ::-1] * 255).astype(np.uint8) for img in images]
+    return [r.boxes.xyxy.cpu().numpy().tolist() for r in model.predict(uint8_images, imgsz=imgsz, verbose=False)]
+
+def yolo_accuracy_delta(path, imgsz, reference_boxes, images):
+    """1 - box F1@0.5 against yolov8sfish.pt at 640, averaged over the eval images"""
+    boxes = detect_boxes(YOLO(path, task='detect'), images, imgsz)
+    f1 = float(np.mean([box_f1(p, r) for p, r in zip(boxes, reference_boxes)]))
+    return {"accuracy_delta": round(1.0 - f1, 4),
+            "accuracy_metric": f"1 - box F1@0.5 vs yolov8sfish.pt@{REFERENCE_YOLO_SIZE}"}
+
+def describe_artifact(entry, path, latency_runs):
+    """Fill size and latency fields of a manifest entry; returns the runner for accuracy checks"""
+    entry["path"] = os.path.relpath(path, MODELS_DIR).replace('\\', '/')
+    entry["size_bytes"] = os.path.getsize(path)
+    entry["size_mb"] = round(entry["size_bytes"] / (1024 * 1024), 2)
+    run, shape = make_runner(path, entry["format"])
+    entry["latency_ms"] = measure_latency(run, shape, runs=latency_runs)
+    return run, shape
+
+def export_matrix(sizes=None, precisions=None, formats=None, targets=('classifier', 'detector'),
+                  eval_images=None, calibration_data=None, latency_runs=20, force=False):
+    """Export every size x precision x format combination and write exports/manifest.json"""
+    sizes = sizes or MATRIX_SIZES
+    precisions = precisions or MATRIX_PRECISIONS
+    formats = formats or MATRIX_FORMATS
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    images, eval_set, calibration_images = load_eval_images(eval_images)
+    representative = eval_set != UNREPRESENTATIVE_EVAL_SET
+    if not representative:
+        print("⚠️  No --eval-images: accuracy deltas use held-out generic calibration images, not fish. "
+              "Do not pick artifacts against an accuracy budget from this manifest.")
+    entries = []
+    index = load_cache_index()
+
+    def attempt(entry, source_path, output_path, export_fn, accuracy_fn):
+        label = f"{entry['model']} {entry['input_size']} {entry['precision']} {entry['format']}"
+        print(f"\n🔄 Exporting {label}...")
+        try:
+            options = {k: entry[k] for k in ('format', 'precision', 'input_size')}
+            if entry['model'] == 'detector' and entry['precision'] == 'int8':
+                options['calibration_data'] = calibration_data
+            key = cache_key(source_path, options)
+            if not force and is_cached(index, output_path, key):
+                print("   ♻️  Source unchanged, reusing cached artifact")
+                entry["cached"] = True
+                path = output_path
+            else:
+                path = export_fn()
+                record_cache(index, path, key)
+            run, shape = describe_artifact(entry, path, latency_runs)
+            entry.update(accuracy_fn(path, run, shape))
+            entry["accuracy_representative"] = representative
+            entry["status"] = "ok"
+            print(f"   ✅ {entry['size_mb']:.2f} MB, {entry['latency_ms']['median']} ms, "
+                  f"accuracy delta {entry['accuracy_delta']}")
+        except ImportError as e:
+            entry["status"] = "skipped"
+            entry["reason"] = f"missing dependency: {e.name or e}"
+            print(f"   ⏭️  Skipped ({entry['reason']})")
+        except Exception as e:
+            entry["status"] = "error"
+            entry["reason"] = str(e)
+            print(f"   ⚠️  Error: {e}")
+        entries.append(entry)
+
+    if 'classifier' in targets:
+        classifier_path = os.path.join(MODELS_DIR, 'fishclass.h5')
+        model = tf.keras.models.load_model(classifier_path)
+        # classify_fish feeds BGR crops scaled to [0, 1]; INT8 calibration and the
+        # accuracy check use disjoint image sets
+        calibration = resize_batch([img[..., ::-1] for img in calibration_images], CLASSIFIER_SIZE)
+        eval_batch = resize_batch([img[..., ::-1] for img in images], CLASSIFIER_SIZE)
+        reference_probs = model.predict(eval_batch, verbose=0)
+        # The classifier has a fixed 224x224 input, so only precision and format vary
+        for fmt in formats:
+            for precision in precisions:
+                output_path = os.path.join(EXPORT_DIR, f"fishclass_{CLASSIFIER_SIZE}_{precision}.{fmt}")
+                entry = {"model": "classifier", "format": fmt, "precision": precision, "input_size": CLASSIFIER_SIZE}
+                attempt(entry, classifier_path, output_path,
+                        lambda p=precision, f=fmt, o=output_path: export_classifier_variant(model, p, f, o, calibration),
+                        lambda path, run, shape: classifier_accuracy_delta(run, shape, reference_probs, eval_batch))
+
+    if 'detector' in targets:
+        yolo_path = os.path.join(MODELS_DIR, 'yolov8sfish.pt')
+        reference_boxes = detect_boxes(YOLO(yolo_path), images, REFERENCE_YOLO_SIZE)
+        for fmt in formats:
+            for size in sizes:
+                for precision in precisions:
+                    output_path = os.path.join(EXPORT_DIR, f"yolov8sfish_{size}_{precision}.{fmt}")
+                    entry = {"model": "detector", "format": fmt, "precision": precision, "input_size": size}
+                    attempt(entry, yolo_path, output_path,
+                            lambda s=size, p=precision, f=fmt, o=output_path:
+                                export_yolo_variant(s, p, f, o, calibration_data),
+                            lambda path, run, shape, s=size: yolo_accuracy_delta(path, s, reference_boxes, images))
+
+    manifest = {
+        "generated_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+        "eval_set": eval_set,
+        "eval_images": len(images),
+        "eval_representative": representative,
+        "calibration_images": len(calibration_images),
+        "latency_runs": latency_runs,
+        "artifacts": entries
+    }
+    save_cache_index(index)
+    manifest_path = os.path.join(EXPORT_DIR, 'manifest.json')
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    print(f"\n📋 Manifest: {manifest_path}")
+    return manifest
+
+def prunable_layers(model):
+    """Conv2D and Dense layers except the output head, whose units map one-to-one to labels"""
+    layers = [l for l in model.layers if isinstance(l, (tf.keras.layers.Conv2D, tf.keras.layers.Dense))
+              and not isinstance(l, tf.keras.layers.DepthwiseConv2D)]
+    if layers and isinstance(layers[-1], tf.keras.layers.Dense):
+        layers = layers[:-1]
+    return layers
+
+def magnitude_prune_masks(model, sparsity):
+    """
+    Zero the lowest-L1 output filters/units of each prunable layer; returns {layer name: keep mask}.
+    Filters are masked, not removed: the graph keeps its shapes, so this only helps compression.
+    """
+    masks = {}
+    for layer in prunable_layers(model):
+        weights = layer.get_weights()
+        kernel = weights[0]
+        norms = np.abs(kernel).reshape(-1, kernel.shape[-1]).sum(axis=0)
+        drop = int(len(norms) * sparsity)
+        keep = np.ones(len(norms), dtype=bool)
+        keep[np.argsort(norms)[:drop]] = False
+        masks[layer.name] = keep
+    apply_prune_masks(model, masks)
+    return masks
+
+def apply_prune_masks(model, masks):
+    for layer in model.layers:
+        if layer.name not in masks:
+            continue
+        weights = layer.get_weights()
+        weights[0] = weights[0] * masks[layer.name]
+        if len(weights) > 1:
+            weights[1] = weights[1] * masks[layer.name]
+        layer.set_weights(weights)
+
+def cluster_kernel(kernel, clusters, iterations=15):
+    """1-D k-means over a kernel's values (linear centroid init); returns the snapped kernel"""
+    flat = kernel.reshape(-1)
+    nonzero = flat != 0
+    values = flat[nonzero]
+    if values.size <= clusters:
+        return kernel
+    centroids = np.linspace(values.min(), values.max(), clusters)
+    for _ in range(iterations):
+        assignment = np.abs(values[:, None] - centroids[None, :]).argmin(axis=1)
+        for c in range(clusters):
+            members = values[assignment == c]
+            if members.size:
+                centroids[c] = members.mean()
+    snapped = flat.copy()
+    # Pruned zeros stay zero so clustering preserves sparsity
+    snapped[nonzero] = centroids[np.abs(values[:, None] - centroids[None, :]).argmin(axis=1)]
+    return snapped.reshape(kernel.shape)
+
+def cluster_weights(model, clusters):
+    for layer in model.layers:
+        if isinstance(layer, (tf.keras.layers.Conv2D, tf.keras.layers.Dense)):
+            weights = layer.get_weights()
+            weights[0] = cluster_kernel(weights[0], clusters)
+            layer.set_weights(weights)
+
+def load_finetune_set(image_dir, limit=2000):
+    """Images from <image_dir>/<label>/* preprocessed like classify_fish (BGR, 224x224, [0, 1])"""
+    import cv2
+    images, labels = [], []
+    for label in sorted(os.listdir(image_dir)):
+        folder = os.path.join(image_dir, label)
+        if label not in CLASS_LABELS or not os.path.isdir(folder):
+            continue
+        for name in sorted(os.listdir(folder)):
+            img = cv2.imread(os.path.join(folder, name))
+            if img is None:
+                continue
+            images.append(cv2.resize(img, (CLASSIFIER_SIZE, CLASSIFIER_SIZE)).astype(np.float32) / 255.0)
+            labels.append(CLASS_LABELS.index(label))
+            if len(images) >= limit:
+                break
+    if not images:
+        return None
+    return np.stack(images), np.array(labels)
+
+class KeepPruned(tf.keras.callbacks.Callback):
+    """Re-applies pruning masks after every batch so fine-tuning cannot regrow pruned filters"""
+
+    def __init__(self, masks):
+        super().__init__()
+        self.masks = masks
+
+    def on_train_batch_end(self, batch, logs=None):
+        apply_prune_masks(self.model, self.masks)
+
+def finetune(model, dataset, epochs, masks=None):
+    x, y = dataset
+    model.compile(optimizer=tf.keras.optimizers.Adam(1e-5), loss='sparse_categorical_crossentropy',
+                  metrics=['accuracy'])
+    callbacks = [KeepPruned(masks)] if masks else []
+    history = model.fit(x, y, epochs=epochs, batch_size=16, validation_split=0.1 if len(x) >= 20 else 0.0,
+                        callbacks=callbacks, verbose=2)
+    return {k: round(float(v[-1]), 4) for k, v in history.history.items()}
+
+def weight_stats(model):
+    """Fraction of zero kernel weights and the largest per-kernel count of distinct values"""
+    total = zeros = 0
+    max_unique = 0
+    for layer in model.layers:
+        if isinstance(layer, (tf.keras.layers.Conv2D, tf.keras.layers.Dense)):
+            kernel = layer.get_weights()[0]
+            total += kernel.size
+            zeros += int(np.sum(kernel == 0))
+            max_unique = max(max_unique, len(np.unique(kernel)))
+    return {"sparsity": round(zeros / total, 4) if total else 0.0, "max_unique_weights_per_kernel": max_unique}
+
+def optimize_classifier(prune=None, cluster=None, finetune_dir=None, finetune_epochs=1, latency_runs=20):
+    """
+    Write pruned and/or clustered FP16 TFLite classifiers to exports/ with an optimization report.
+    Both reduce the gzipped download size only; latency is reported to show it is unchanged.
+    """
+    print("🔄 Optimizing fishclass.h5...")
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    source_path = os.path.join(MODELS_DIR, 'fishclass.h5')
+    dataset = load_finetune_set(finetune_dir) if finetune_dir else None
+    if finetune_dir and dataset is None:
+        print(f"   ⚠️  No labelled images under {finetune_dir}; skipping fine-tuning")
+
+    variants = [('baseline', None, None)]
+    if prune:
+        variants.append(('pruned', prune, None))
+    if cluster:
+        variants.append(('clustered', None, cluster))
+    if prune and cluster:
+        variants.append(('pruned_clustered', prune, cluster))
+
+    report = []
+    for name, sparsity, clusters in variants:
+        model = tf.keras.models.load_model(source_path)
+        entry = {"variant": name, "target_sparsity": sparsity, "clusters": clusters}
+        masks = magnitude_prune_masks(model, sparsity) if sparsity else None
+        if dataset is not None and name != 'baseline':
+            entry["finetune"] = finetune(model, dataset, finetune_epochs, masks)
+        # Cluster after fine-tuning so the shipped weights land exactly on the centroids
+        if clusters:
+            cluster_weights(model, clusters)
+        entry.update(weight_stats(model))
+
+        output_path = os.path.join(EXPORT_DIR, f"fishclass_{name}_fp16.tflite")
+        export_classifier_variant(model, 'fp16', 'tflite', output_path, None)
+        with open(output_path, 'rb') as f:
+            entry["compressed_size_bytes"] = len(gzip.compress(f.read(), compresslevel=9))
+        entry["format"] = "tflite"
+        describe_artifact(entry, output_path, latency_runs)
+        del entry["format"]
+        report.append(entry)
+        print(f"   ✅ {name}: sparsity {entry['sparsity']:.1%}, {entry['size_mb']:.2f} MB "
+              f"({entry['compressed_size_bytes'] / (1024 * 1024):.2f} MB gzipped), {entry['latency_ms']['median']} ms")
+
+    report_path = os.path.join(EXPORT_DIR, 'optimization_report.json')
+    with open(report_path, 'w') as f:
+        json.dump({"generated_at": time.strftime('%Y-%m-%dT%H:%M:%S'),
+                   "finetune_images": int(len(dataset[0])) if dataset is not None else 0,
+                   "variants": report}, f, indent=2)
+    print(f"\n📋 Report: {report_path}")
+    return report
+
+def build_fused_module(imgsz=640, max_detections=20, iou_threshold=0.45, score_threshold=0.25, padding=20):
+    """
+    tf.Module whose single call maps a letterboxed RGB image in [0, 1] to labelled boxes.
+    Mirrors classify_fish.process_image: YOLO decode, NMS, padded crop of the BGR image
+    resized to 224x224, classifier softmax. Padding is in pixels at imgsz resolution.
+    """
+    yolo_dir = export_yolo_isolated(os.path.join(EXPORT_DIR, f"yolov8sfish_{imgsz}_saved_model"),
+                                    format='saved_model', imgsz=imgsz)
+    detect_fn = tf.saved_model.load(yolo_dir).signatures['serving_default']
+    classifier = tf.keras.models.load_model(os.path.join(MODELS_DIR, 'fishclass.h5'))
+    size = float(imgsz)
+    pad = padding / size
+
+    class FusedFishModel(tf.Module):
+        def __init__(self):
+            super().__init__()
+            self.detect_fn = detect_fn
+            self.classifier = classifier
+
+        @tf.function(input_signature=[tf.TensorSpec([1, imgsz, imgsz, 3], tf.float32, name='image')])
+        def __call__(self, image):
+            raw = list(self.detect_fn(image).values())[0]
+            # (1, 4 + classes, anchors) -> (anchors, 4 + classes)
+            pred = tf.transpose(raw[0])
+            xywh = pred[:, :4]
+            # Some ultralytics TF exports emit pixel coordinates, others normalized ones
+            xywh = xywh / tf.where(tf.reduce_max(xywh) > 2.0, size, 1.0)
+            scores = tf.reduce_max(pred[:, 4:], axis=1)
+            cx, cy, w, h = tf.unstack(xywh, axis=1)
+            boxes = tf.stack([cy - h / 2, cx - w / 2, cy + h / 2, cx + w / 2], axis=1)
+
+            keep = tf.image.non_max_suppression(boxes, scores, max_detections, iou_threshold, score_threshold)
+            boxes = tf.gather(boxes, keep)
+            scores = tf.gather(scores, keep)
+            count = tf.shape(keep)[0]
+
+            crop_boxes = tf.clip_by_value(boxes + tf.constant([-pad, -pad, pad, pad]), 0.0, 1.0)
+            bgr = tf.reverse(image, axis=[-1])
+            crops = tf.image.crop_and_resize(bgr, crop_boxes, tf.zeros([count], tf.int32),
+                                             [CLASSIFIER_SIZE, CLASSIFIER_SIZE])
+            probs = self.classifier(crops, training=False)
+            labels = tf.argmax(probs, axis=1, output_type=tf.int32)
+            label_scores = tf.reduce_max(probs, axis=1)
+
+            # Fixed-size outputs padded to max_detections; num_detections says how many are real
+            y1, x1, y2, x2 = tf.unstack(crop_boxes * size, axis=1)
+            fill = max_detections - count
+            return {
+                "boxes": tf.pad(tf.stack([x1, y1, x2, y2], axis=1), [[0, fill], [0, 0]])[None],
+                "detection_scores": tf.pad(scores, [[0, fill]])[None],
+                "labels": tf.pad(labels, [[0, fill]], constant_values=-1)[None],
+                "label_scores": tf.pad(label_scores, [[0, fill]])[None],
+                "num_detections": tf.reshape(count, [1]),
+            }
+
+    return FusedFishModel()
+
+def export_fused(imgsz=640, fmt='tflite', max_detections=20, iou_threshold=0.45, score_threshold=0.25,
+                 padding=20, latency_runs=20):
+    """Export the fused detector + classifier graph and a JSON sidecar describing its I/O"""
+    print(f"🔄 Building fused detection + classification graph at {imgsz}px...")
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    module = build_fused_module(imgsz, max_detections, iou_threshold, score_threshold, padding)
+    output_path = os.path.join(EXPORT_DIR, f"fishvision_fused_{imgsz}.{fmt}")
+
+    if fmt == 'tflite':
+        converter = tf.lite.TFLiteConverter.from_concrete_functions([module.__call__.get_concrete_function()], module)
+        # CropAndResize and dynamic-batch NMS need the Flex delegate on device
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS, tf.lite.OpsSet.SELECT_TF_OPS]
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+        with open(output_path, 'wb') as f:
+            f.write(converter.convert())
+    else:
+        import tf2onnx
+        spec = [tf.TensorSpec([1, imgsz, imgsz, 3], tf.float32, name='image')]
+        tf2onnx.convert.from_function(module.__call__, input_signature=spec, opset=13, output_path=output_path)
+
+    sidecar = {
+        "model": os.path.basename(output_path),
+        "input": {"name": "image", "shape": [1, imgsz, imgsz, 3], "layout": "NHWC", "color": "RGB",
+                  "range": [0.0, 1.0], "note": "letterbox the photo to a square before resizing"},
+        "outputs": {
+            "boxes": "[1, max_detections, 4] x1,y1,x2,y2 in input pixels, padded like classify_fish",
+            "detection_scores": "[1, max_detections] YOLO confidence",
+            "labels": "[1, max_detections] index into labels, -1 for empty slots",
+            "label_scores": "[1, max_detections] classifier confidence",
+            "num_detections": "[1] number of valid rows"
+        },
+        "max_detections": max_detections,
+        "iou_threshold": iou_threshold,
+        "score_threshold": score_threshold,
+        "padding_px": padding,
+        "labels": CLASS_LABELS
+    }
+    entry = {"format": fmt}
+    describe_artifact(entry, output_path, latency_runs)
+    sidecar["size_bytes"] = entry["size_bytes"]
+    sidecar["latency_ms"] = entry["latency_ms"]
+    with open(os.path.splitext(output_path)[0] + '.json', 'w') as f:
+        json.dump(sidecar, f, indent=2)
+
+    print(f"   ✅ Saved to: {output_path}")
+    print(f"   📦 Size: {entry['size_mb']:.2f} MB, ⏱️  {entry['latency_ms']['median']} ms per image")
+    return output_path
+
+def thread_candidates():
+    cpus = os.cpu_count() or 1
+    return sorted({t for t in (1, 2, 4, 8, cpus) if t <= cpus})
+
+def runtime_candidates(fmt):
+    """Interpreter settings to sweep for one artifact format"""
+    if fmt == 'tflite':
+        return [{"num_threads": t, "xnnpack": x} for t in thread_candidates() for x in (True, False)]
+    candidates = [{"intra_op_num_threads": t, "inter_op_num_threads": 1, "graph_optimization_level": level,
+                   "execution_mode": 'sequential'}
+                  for t in thread_candidates() for level in ONNX_OPT_LEVELS]
+    # Parallel execution only pays off for graphs with independent branches; try it at full width
+    candidates.append({"intra_op_num_threads": thread_candidates()[-1], "inter_op_num_threads": 2,
+                       "graph_optimization_level": 'ORT_ENABLE_ALL', "execution_mode": 'parallel'})
+    return candidates
+
+def find_artifacts():
+    found = []
+    for folder in (MODELS_DIR, EXPORT_DIR):
+        if not os.path.isdir(folder):
+            continue
+        for name in sorted(os.listdir(folder)):
+            ext = os.path.splitext(name)[1].lstrip('.')
+            if ext in ('tflite', 'onnx'):
+                found.append((os.path.join(folder, name), ext))
+    return found
+
+def autotune(paths=None, latency_runs=20):
+    """
+    Time every runtime candidate per artifact and keep the fastest in runtime_config.json.
+    Settings of artifacts not tuned in this run are kept, unless the config was tuned on another host.
+    """
+    artifacts = [(p, os.path.splitext(p)[1].lstrip('.')) for p in paths] if paths else find_artifacts()
+    previous = load_runtime_config()
+    kept = previous.get("artifacts", {}) if previous.get("host") == host_fingerprint() else {}
+    if previous.get("host") and not kept:
+        print("   ⚠️ Runtime config was tuned on another host; starting a fresh one")
+    config = {"generated_at": time.strftime('%Y-%m-%dT%H:%M:%S'), "host": host_fingerprint(), "artifacts": dict(kept)}
+
+    for path, fmt in artifacts:
+        print(f"\n⏱️  Tuning {os.path.relpath(path, MODELS_DIR)}...")
+        trials = []
+        for settings in runtime_candidates(fmt):
+            try:
+                run, shape = make_runner(path, fmt, settings)
+                trials.append({"settings": settings, "latency_ms": measure_latency(run, shape, runs=latency_runs)})
+            except ImportError as e:
+                print(f"   ⏭️  Skipped ({fmt} runtime not installed: {e.name or e})")
+                break
+            except Exception as e:
+                trials.append({"settings": settings, "error": str(e)})
+        timed = [t for t in trials if "latency_ms" in t]
+        if not timed:
+            continue
+        best = min(timed, key=lambda t: t["latency_ms"]["median"])
+        slowest = max(t["latency_ms"]["median"] for t in timed)
+        config["artifacts"][artifact_key(path)] = {
+            "size_bytes": os.path.getsize(path),
+            "settings": best["settings"],
+            "latency_ms": best["latency_ms"],
+            "trials": trials
+        }
+        print(f"   ✅ {best['settings']}: {best['latency_ms']['median']} ms "
+              f"(slowest candidate {slowest} ms)")
+
+    with open(RUNTIME_CONFIG_PATH, 'w') as f:
+        json.dump(config, f, indent=2)
+    print(f"\n📋 Runtime config: {RUNTIME_CONFIG_PATH}")
+    return config
+
+def parse_list(value, cast=str):
+    return [cast(v.strip()) for v in value.split(',') if v.strip()]
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description="Convert fish models for mobile deployment")
+    parser.add_argument('--matrix', action='store_true',
+                        help="export every size/precision/format combination and write a manifest")
+    parser.add_argument('--sizes', type=lambda v: parse_list(v, int), default=MATRIX_SIZES,
+                        help="detector input sizes, e.g. 320,416,640")
+    parser.add_argument('--precisions', type=parse_list, default=MATRIX_PRECISIONS,
+                        help="any of fp32,fp16,int8")
+    parser.add_argument('--formats', type=parse_list, default=MATRIX_FORMATS, help="any of tflite,onnx")
+    parser.add_argument('--models', type=parse_list, default=['classifier', 'detector'],
+                        help="any of classifier,detector")
+    parser.add_argument('--eval-images',
+                        help="folder of fish images for accuracy deltas; without it deltas use held-out "
+                             "generic calibration images and are marked not representative")
+    parser.add_argument('--calibration-data', help="ultralytics dataset YAML used for detector INT8 calibration")
+    parser.add_argument('--latency-runs', type=int, default=20)
+    parser.add_argument('--prune', type=float,
+                        help="magnitude pruning: fraction of classifier filters to zero, e.g. 0.3; shrinks the "
+                             "gzipped model, not its shapes or latency")
+    parser.add_argument('--cluster', type=int, help="weight clustering: distinct values per classifier kernel, e.g. 16")
+    parser.add_argument('--finetune-dir', help="folder of <label>/<image> files for a short fine-tune after pruning")
+    parser.add_argument('--finetune-epochs', type=int, default=1)
+    parser.add_argument('--tasks', type=parse_list, default=list(CONVERSION_TASKS),
+                        help="default conversions to run: " + ",".join(CONVERSION_TASKS))
+    parser.add_argument('--jobs', type=int, default=None, help="parallel conversion processes (default: one per task)")
+    parser.add_argument('--force', action='store_true', help="reconvert even when the cache says nothing changed")
+    parser.add_argument('--autotune', nargs='*', metavar='ARTIFACT',
+                        help="sweep interpreter settings for the given (default: all converted) artifacts")
+    parser.add_argument('--fused', choices=['tflite', 'onnx'],
+                        help="export one detection + NMS + crop + classifier graph in this format")
+    parser.add_argument('--imgsz', type=int, default=640, help="fused graph input size")
+    parser.add_argument('--max-detections', type=int, default=20)
+    parser.add_argument('--iou-threshold', type=float, default=0.45)
+    parser.add_argument('--score-threshold', type=float, default=0.25)
+    parser.add_argument('--padding', type=int, default=20, help="fused crop padding in input pixels")
+    return parser
+
 def main():
+    args = build_arg_parser().parse_args()
+    if args.matrix:
+        print("=" * 60)
+        print("🐟 Fish Model Export Matrix")
+        print("=" * 60)
+        export_matrix(args.sizes, args.precisions, args.formats, args.models,
+                      args.eval_images, args.calibration_data, args.latency_runs, args.force)
+        return
+    if args.fused:
+        print("=" * 60)
+        print("🐟 Fused Detection + Classification Export")
+        print("=" * 60)
+        export_fused(args.imgsz, args.fused, args.max_detections, args.iou_threshold, args.score_threshold,
+                     args.padding, args.latency_runs)
+        return
+    if args.autotune is not None:
+        print("=" * 60)
+        print("🐟 Interpreter Autotune")
+        print("=" * 60)
+        autotune(args.autotune, args.latency_runs)
+        return
+    if args.prune or args.cluster:
+        print("=" * 60)
+        print("🐟 Fish Classifier Pruning & Clustering")
+        print("=" * 60)
+        optimize_classifier(args.prune, args.cluster, args.finetune_dir, args.finetune_epochs, args.latency_runs)
+        return
+
     print("=" * 60)
     print("🐟 Fish Classification Model Converter")
     print("   Converting models for mobile deployment")
     print("=" * 60)
     
     try:
-        # Convert classification model
-        fishclass_tflite = convert_keras_to_tflite()
-        
-        # Try to convert YOLO
-        yolo_tflite = convert_yolo_to_tflite()
-        
-        # If YOLO TFLite fails, export to ONNX
-        if yolo_tflite is None:
-            yolo_onnx = export_yolo_to_onnx()
+        # Keras TFLite, YOLO TFLite and YOLO ONNX are independent, so run them side by side
+        results = convert_all(args.tasks, args.jobs, args.force)
         
         # Create labels file
         labels_file = create_labels_file()
@@ -152,13 +978,21 @@ def main():
         print("✅ Conversion Complete!")
         print("=" * 60)
         print("\n📋 Summary:")
-        print(f"   ✅ Classification Model: fishclass.tflite")
-        if yolo_tflite:
-            print(f"   ✅ Detection Model: {os.path.basename(yolo_tflite)}")
-        else:
-            print(f"   ⚠️  Detection Model: Export to ONNX (manual conversion needed)")
+        for result in results:
+            if result["status"] == "error":
+                print(f"   ❌ {result['task']}: {result['error']}")
+            else:
+                icon = "♻️ " if result["status"] == "cached" else "✅"
+                print(f"   {icon} {result['task']}: {os.path.basename(result['path'])} ({result['seconds']}s)")
         print(f"   ✅ Labels: labels.txt")
         
+        failed = [r for r in results if r["status"] == "error"]
+        for result in failed:
+            if result.get("traceback"):
+                print(f"\n--- {result['task']} traceback ---\n{result['traceback']}")
+        if any(r["task"] == 'keras_tflite' for r in failed):
+            sys.exit(1)
+        
         print("\n📱 Next Steps:")
         print("   1. Copy .tflite files to fishclassify/assets/models/")
         print("   2. Copy labels.txt to fishclassify/assets/models/")
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Bulk export of labelled fish crops for retraining fishclass.h5.
+Runs the detector and classifier over a set of images and writes every padded
+crop, with its predicted label and confidence, into large shard files instead of
+one JPEG per crop. A pool of background writers encodes and appends crops so
+inference is never waiting on the filesystem.
+
+Layout of a dataset directory:
+    crops-00000.rec   concatenated JPEG-encoded crops
+    crops-00000.idx   one JSON line per record: offset, length, label, confidence, bbox, source
+    manifest.json     shard list with record counts plus per-label totals
+"""
+import os
+import sys
+import json
+import time
+import queue
+import argparse
+import threading
+
+import cv2
+
+from classify_fish import process_image, load_models
+
+# Usage: crop_export.py <images_dir> <dataset_dir> [--writers 4] [--shard-mb 256] [--padding 20]
+
+DEFAULT_WRITERS = 4
+DEFAULT_SHARD_MB = 256
+DEFAULT_JPEG_QUALITY = 95
+# Crops allowed to wait for a writer before inference blocks
+DEFAULT_QUEUE_SIZE = 256
+MANIFEST_NAME = 'manifest.json'
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+class ShardedCropWriter:
+    """
+    Background writer pool appending encoded crops to size-capped shards.
+    Each writer thread owns its current shard, so appends need no locking; only
+    shard numbering and the manifest are shared. Existing shards in the
+    directory are kept and new ones continue after the highest id in the manifest;
+    shard files are never overwritten, so ids left behind by a crashed run are skipped.
+    """
+
+    def __init__(self, dataset_dir, writers=DEFAULT_WRITERS, shard_bytes=DEFAULT_SHARD_MB * 2**20,
+                 jpeg_quality=DEFAULT_JPEG_QUALITY, queue_size=DEFAULT_QUEUE_SIZE):
+        self.dataset_dir = dataset_dir
+        self.shard_bytes = shard_bytes
+        self.jpeg_quality = jpeg_quality
+        self.queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        os.makedirs(dataset_dir, exist_ok=True)
+        self.manifest = load_manifest(dataset_dir)
+        self._next_shard = max((shard["id"] for shard in self.manifest["shards"]), default=-1) + 1
+        self.errors = []
+        self._threads = [threading.Thread(target=self._run, name=f"crop-writer-{i}", daemon=True)
+                         for i in range(writers)]
+        for t in self._threads:
+            t.start()
+
+    def submit(self, crop, detection, source):
+        """Queue one crop; blocks when the writers are behind so memory stays bounded"""
+        self.queue.put((crop.copy(), detection, source))
+
+    def _open_shard(self):
+        while True:
+            with self._lock:
+                shard_id = self._next_shard
+                self._next_shard += 1
+            name = f"crops-{shard_id:05d}"
+            # Exclusive creation: a shard file missing from the manifest still holds crops
+            try:
+                rec = open(os.path.join(self.dataset_dir, name + '.rec'), 'xb')
+            except FileExistsError:
+                continue
+            try:
+                idx = open(os.path.join(self.dataset_dir, name + '.idx'), 'x')
+            except FileExistsError:
+                rec.close()
+                os.remove(rec.name)
+                continue
+            break
+        return {"id": shard_id, "name": name, "rec": rec, "idx": idx, "records": 0, "bytes": 0, "labels": {}}
+
+    def _close_shard(self, shard):
+        shard["rec"].close()
+        shard["idx"].close()
+        if not shard["records"]:
+            os.remove(shard["rec"].name)
+            os.remove(shard["idx"].name)
+            return
+        with self._lock:
+            self.manifest["shards"].append({"id": shard["id"], "file": shard["name"] + '.rec',
+                                            "index": shard["name"] + '.idx', "records": shard["records"],
+                                            "bytes": shard["bytes"]})
+            self.manifest["total_records"] += shard["records"]
+            labels = self.manifest["labels"]
+            for label, count in shard["labels"].items():
+                labels[label] = labels.get(label, 0) + count
+
+    def _run(self):
+        shard = None
+        params = [int(cv2.IMWRITE_JPEG_QUALITY), self.jpeg_quality]
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                break
+            crop, detection, source = item
+            try:
+                ok, encoded = cv2.imencode('.jpg', crop, params)
+                if not ok:
+                    raise ValueError("JPEG encoding failed")
+                data = encoded.tobytes()
+                if shard is None or (shard["records"] and shard["bytes"] + len(data) > self.shard_bytes):
+                    if shard is not None:
+                        self._close_shard(shard)
+                    shard = self._open_shard()
+                record = {"offset": shard["bytes"], "length": len(data), "label": detection["label"],
+                          "confidence": round(detection["confidence"], 6), "bbox": detection["bbox"],
+                          "source": source}
+                shard["rec"].write(data)
+                shard["idx"].write(json.dumps(record) + "\n")
+                shard["records"] += 1
+                shard["bytes"] += len(data)
+                shard["labels"][detection["label"]] = shard["labels"].get(detection["label"], 0) + 1
+            except Exception as e:
+                with self._lock:
+                    self.errors.append(f"{source}: {e}")
+            finally:
+                self.queue.task_done()
+        if shard is not None:
+            self._close_shard(shard)
+
+    def close(self):
+        """Drain the queue, close every shard and write the manifest"""
+        for _ in self._threads:
+            self.queue.put(None)
+        for t in self._threads:
+            t.join()
+        self.manifest["shards"].sort(key=lambda s: s["id"])
+        tmp_path = os.path.join(self.dataset_dir, MANIFEST_NAME + '.tmp')
+        with open(tmp_path, 'w') as f:
+            json.dump(self.manifest, f, indent=2)
+        os.replace(tmp_path, os.path.join(self.dataset_dir, MANIFEST_NAME))
+        return self.manifest
+
+def load_manifest(dataset_dir):
+    path = os.path.join(dataset_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"format": "jpeg-concat", "version": 1, "total_records": 0, "labels": {}, "shards": []}
+    with open(path) as f:
+        return json.load(f)
+
+def iter_records(dataset_dir):
+    """Yield (record, jpeg_bytes) for every crop in a dataset, shard by shard"""
+    for shard in load_manifest(dataset_dir)["shards"]:
+        with open(os.path.join(dataset_dir, shard["file"]), 'rb') as rec, \
+                open(os.path.join(dataset_dir, shard["index"])) as idx:
+            for line in idx:
+                record = json.loads(line)
+                rec.seek(record["offset"])
+                yield record, rec.read(record["length"])
+
+def list_images(paths):
+    images = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in os.walk(path):
+                images.extend(os.path.join(root, n) for n in sorted(names) if n.lower().endswith(IMAGE_EXTENSIONS))
+        else:
+            images.append(path)
+    return images
+
+def export_crops(images, writer, models, padding=20, min_confidence=0.0):
+    """Run every image through process_image, sending each labelled crop to writer"""
+    processed = failed = crops = 0
+    for image_path in images:
+        def on_crop(crop, detection):
+            nonlocal crops
+            if detection["confidence"] >= min_confidence and crop.size:
+                writer.submit(crop, detection, image_path)
+                crops += 1
+
+        # No annotated image is wanted, so skip drawing it
+        result = process_image(image_path, None, padding, models=models, on_crop=on_crop, render=False)
+        if result.get("success"):
+            processed += 1
+        else:
+            failed += 1
+            print(f"⚠️  {image_path}: {result.get('error')}", file=sys.stderr)
+    return {"images": processed, "failed_images": failed, "crops": crops}
+
+def main():
+    parser = argparse.ArgumentParser(description="Export labelled fish crops into sharded record files")
+    parser.add_argument('inputs', nargs='+', help="image files or directories, followed by the dataset directory")
+    parser.add_argument('--padding', type=int, default=20)
+    parser.add_argument('--writers', type=int, default=DEFAULT_WRITERS, help="background writer threads")
+    parser.add_argument('--shard-mb', type=float, default=DEFAULT_SHARD_MB, help="target shard size in MB")
+    parser.add_argument('--jpeg-quality', type=int, default=DEFAULT_JPEG_QUALITY)
+    parser.add_argument('--min-confidence', type=float, default=0.0,
+                        help="drop crops the classifier is less sure about than this")
+    parser.add_argument('--stub-models', action='store_true',
+                        help="use the lightweight stand-in models from stub_models.py (testing only)")
+    args = parser.parse_args()
+    if len(args.inputs) < 2:
+        parser.error("need at least one image source and a dataset directory")
+    sources, dataset_dir = args.inputs[:-1], args.inputs[-1]
+
+    try:
+        models = load_models(os.path.dirname(os.path.abspath(__file__)), stub=args.stub_models)
+        images = list_images(sources)
+        writer = ShardedCropWriter(dataset_dir, args.writers, int(args.shard_mb * 2**20), args.jpeg_quality)
+        started = time.perf_counter()
+        try:
+            summary = export_crops(images, writer, models, args.padding, args.min_confidence)
+        finally:
+            manifest = writer.close()
+        elapsed = time.perf_counter() - started
+        summary.update({
+            "success": True,
+            "dataset": dataset_dir,
+            "shards": len(manifest["shards"]),
+            "total_records": manifest["total_records"],
+            "write_errors": writer.errors[:20],
+            "elapsed_s": round(elapsed, 3),
+            "images_per_s": round(summary["images"] / elapsed, 2) if elapsed > 0 else None
+        })
+        print(json.dumps(summary))
+    except Exception as e:
+        print(json.dumps({"success": False, "error": str(e)}))
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Local load generator for the fish classifier.
+Drives the CLI, an in-process worker or the HTTP service with synthetic images
+and reports throughput, latency percentiles and error rate as JSON.
+Falls back to the stub models when the real weights are not present.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import subprocess
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from classify_fish import load_models, models_available
+
+# Usage: load_test.py --target {cli,worker,http} [--concurrency N | --rate R] [--requests N]
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+CLASSIFY_SCRIPT = os.path.join(BASE_DIR, 'classify_fish.py')
+
+def synthetic_image(width, height, fish, rng):
+    """Dark textured background with `fish` bright elongated bodies at random poses"""
+    img = rng.integers(20, 60, size=(height, width, 3), dtype=np.uint8)
+    scale = min(width, height)
+    for _ in range(fish):
+        length = int(rng.uniform(0.08, 0.2) * scale)
+        girth = max(4, int(length * rng.uniform(0.25, 0.4)))
+        cx = int(rng.uniform(length, max(length + 1, width - length)))
+        cy = int(rng.uniform(length, max(length + 1, height - length)))
+        angle = float(rng.uniform(0, 180))
+        color = tuple(int(c) for c in rng.integers(140, 255, size=3))
+        cv2.ellipse(img, (cx, cy), (length // 2, girth // 2), angle, 0, 360, color, -1)
+        # Tail fin so crops are not perfectly symmetric
+        theta = np.deg2rad(angle)
+        tx, ty = cx - np.cos(theta) * length * 0.55, cy - np.sin(theta) * length * 0.55
+        tail = np.array([[cx - np.cos(theta) * length * 0.4, cy - np.sin(theta) * length * 0.4],
+                         [tx - np.sin(theta) * girth * 0.6, ty + np.cos(theta) * girth * 0.6],
+                         [tx + np.sin(theta) * girth * 0.6, ty - np.cos(theta) * girth * 0.6]], dtype=np.int32)
+        cv2.fillPoly(img, [tail], color)
+    return img
+
+def write_images(directory, count, width, height, fish, seed):
+    rng = np.random.default_rng(seed)
+    paths = []
+    for i in range(count):
+        # Vary density around the requested mean so images are not identical in cost
+        n = max(0, int(rng.poisson(fish)))
+        path = os.path.join(directory, f"synthetic_{i:03d}.jpg")
+        cv2.imwrite(path, synthetic_image(width, height, n, rng))
+        paths.append(path)
+    return paths
+
+class CliTarget:
+    """Spawns classify_fish.py per request, as the Node route does"""
+
+    def __init__(self, stub, python=sys.executable):
+        self.stub = stub
+        self.python = python
+
+    def __call__(self, image_path, output_path):
+        cmd = [self.python, CLASSIFY_SCRIPT, image_path, output_path]
+        if self.stub:
+            cmd.append('--stub-models')
+        proc = subprocess.run(cmd, capture_output=True, text=True)
+        try:
+            result = json.loads(proc.stdout)
+        except ValueError:
+            return False, proc.stderr.strip()[-200:] or f"exit code {proc.returncode}"
+        return bool(result.get('success')), result.get('error')
+
+    def close(self):
+        pass
+
+class WorkerTarget:
+    """Submits to an in-process ClassifierService"""
+
+    def __init__(self, models, max_queue, workers, deadline_ms, stub=False):
+        from classifier_service import ClassifierService
+        # Several workers each get their own process and models; threads cannot share one set
+        self.service = ClassifierService(models, max_queue=max_queue, workers=workers, isolate=workers > 1,
+                                         stub=stub).start()
+        self.deadline_ms = deadline_ms
+
+    def __call__(self, image_path, output_path):
+        from classifier_service import QueueFullError
+        deadline = time.time() + self.deadline_ms / 1000.0 if self.deadline_ms else None
+        try:
+            result = self.service.submit({"image_path": image_path, "output_path": output_path}, deadline).result()
+        except QueueFullError as e:
+            return False, str(e)
+        return bool(result.get('success')), result.get('error')
+
+    def close(self):
+        self.service.stop()
+
+class HttpTarget:
+    """POSTs to a running classifier_service, or to one started in-process when no URL is given"""
+
+    def __init__(self, url, models, max_queue, workers, deadline_ms, stub=False):
+        self.deadline_ms = deadline_ms
+        self.server = None
+        self.service = None
+        if url is None:
+            from classifier_service import ClassifierService, make_server
+            self.service = ClassifierService(models, max_queue=max_queue, workers=workers, isolate=workers > 1,
+                                             stub=stub).start()
+            self.server = make_server(self.service, port=0)
+            self.server.RequestHandlerClass.log_message = lambda *args: None
+            threading.Thread(target=self.server.serve_forever, daemon=True).start()
+            url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.url = url.rstrip('/') + '/classify'
+
+    def __call__(self, image_path, output_path):
+        payload = {"image_path": image_path, "output_path": output_path}
+        if self.deadline_ms:
+            payload["deadline_ms"] = self.deadline_ms
+        request = urllib.request.Request(self.url, data=json.dumps(payload).encode('utf-8'),
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request) as response:
+                result = json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            try:
+                result = json.loads(e.read())
+            except ValueError:
+                result = {"success": False, "error": f"HTTP {e.code}"}
+        except urllib.error.URLError as e:
+            return False, str(e.reason)
+        return bool(result.get('success')), result.get('error')
+
+    def close(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.service.stop()
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    k = (len(sorted_values) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = []
+        self.errors = {}
+        self.failures = 0
+
+    def record(self, latency, ok, error):
+        with self._lock:
+            self.latencies.append(latency)
+            if not ok:
+                self.failures += 1
+                key = (error or 'unknown error')[:120]
+                self.errors[key] = self.errors.get(key, 0) + 1
+
+    def summary(self, elapsed):
+        latencies = sorted(self.latencies)
+        total = len(latencies)
+
+        def ms(value):
+            return round(value * 1000, 2) if value is not None else None
+
+        return {
+            "requests": total,
+            "elapsed_s": round(elapsed, 3),
+            "throughput_rps": round(total / elapsed, 2) if elapsed > 0 else None,
+            "error_rate": round(self.failures / total, 4) if total else None,
+            "latency_ms": {
+                "p50": ms(percentile(latencies, 50)),
+                "p95": ms(percentile(latencies, 95)),
+                "p99": ms(percentile(latencies, 99)),
+                "max": ms(latencies[-1] if latencies else None),
+            },
+            "errors": self.errors,
+        }
+
+def run_closed_loop(target, images, output_dir, recorder, concurrency, requests, duration):
+    """Each of `concurrency` clients sends its next request as soon as the previous one returns"""
+    lock = threading.Lock()
+    issued = [0]
+    stop_at = time.perf_counter() + duration if duration else None
+
+    def claim():
+        with lock:
+            if requests is not None and issued[0] >= requests:
+                return None
+            if stop_at is not None and time.perf_counter() >= stop_at:
+                return None
+            issued[0] += 1
+            return issued[0] - 1
+
+    def client():
+        while True:
+            i = claim()
+            if i is None:
+                return
+            started = time.perf_counter()
+            ok, error = target(images[i % len(images)], os.path.join(output_dir, f"out_{i}.jpg"))
+            recorder.record(time.perf_counter() - started, ok, error)
+
+    threads = [threading.Thread(target=client) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+def run_open_loop(target, images, output_dir, recorder, rate, requests, duration, poisson, seed, max_in_flight):
+    """Requests arrive on a fixed schedule regardless of how fast earlier ones complete"""
+    rng = random.Random(seed)
+    total = requests or int(rate * duration)
+    pool = ThreadPoolExecutor(max_workers=max_in_flight)
+    start = time.perf_counter()
+    scheduled = start
+
+    def fire(i, scheduled_at):
+        ok, error = target(images[i % len(images)], os.path.join(output_dir, f"out_{i}.jpg"))
+        # Measured from the scheduled arrival so client-side queueing counts as latency
+        recorder.record(time.perf_counter() - scheduled_at, ok, error)
+
+    for i in range(total):
+        scheduled += rng.expovariate(rate) if poisson else 1.0 / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        pool.submit(fire, i, scheduled)
+    pool.shutdown(wait=True)
+
+def parse_size(value):
+    try:
+        width, height = (int(v) for v in value.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError("size must look like 1280x720")
+    return width, height
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the fish classifier locally")
+    parser.add_argument('--target', choices=['cli', 'worker', 'http'], default='worker')
+    parser.add_argument('--url', help="classifier_service base URL; an in-process server is started when omitted")
+    parser.add_argument('--models', choices=['auto', 'real', 'stub'], default='auto',
+                        help="auto uses the stub models when the real weights are missing")
+    parser.add_argument('--size', type=parse_size, default=(1280, 720), help="synthetic image size, WIDTHxHEIGHT")
+    parser.add_argument('--fish', type=float, default=4, help="mean fish per image")
+    parser.add_argument('--images', type=int, default=16, help="distinct synthetic images to cycle through")
+    parser.add_argument('--concurrency', type=int, default=4, help="closed loop: concurrent clients")
+    parser.add_argument('--rate', type=float, help="open loop: arrivals per second (enables open loop)")
+    parser.add_argument('--poisson', action='store_true', help="open loop: exponential inter-arrival times")
+    parser.add_argument('--max-in-flight', type=int, default=256, help="open loop: client-side request cap")
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--duration', type=float, help="seconds to run instead of a fixed request count")
+    parser.add_argument('--max-queue', type=int, default=64, help="worker/http: service queue bound")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="worker/http: service workers; more than one runs each in its own process")
+    parser.add_argument('--deadline-ms', type=float, default=0, help="worker/http: per-request deadline, 0 for none")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.models == 'auto':
+        stub = not models_available(BASE_DIR)
+    else:
+        stub = args.models == 'stub'
+    requests = None if args.duration and not args.rate else args.requests
+
+    with tempfile.TemporaryDirectory(prefix='fish_load_') as workdir:
+        images = write_images(workdir, args.images, args.size[0], args.size[1], args.fish, args.seed)
+        output_dir = os.path.join(workdir, 'out')
+        os.makedirs(output_dir)
+
+        if args.target == 'cli':
+            target = CliTarget(stub)
+        else:
+            # Isolated workers load their own models in their processes
+            in_process = not (args.target == 'http' and args.url) and args.workers == 1
+            models = load_models(BASE_DIR, stub=stub) if in_process else None
+            if args.target == 'worker':
+                target = WorkerTarget(models, args.max_queue, args.workers, args.deadline_ms, stub)
+            else:
+                target = HttpTarget(args.url, models, args.max_queue, args.workers, args.deadline_ms, stub)
+
+        recorder = Recorder()
+        started = time.perf_counter()
+        try:
+            if args.rate:
+                duration = args.duration or 0
+                run_open_loop(target, images, output_dir, recorder, args.rate, None if args.duration else requests,
+                              duration, args.poisson, args.seed, args.max_in_flight)
+            else:
+                run_closed_loop(target, images, output_dir, recorder, args.concurrency, requests, args.duration)
+        finally:
+            target.close()
+        elapsed = time.perf_counter() - started
+
+    summary = recorder.summary(elapsed)
+    summary["config"] = {
+        "target": args.target,
+        "models": 'stub' if stub else 'real',
+        "arrival": ('open/poisson' if args.poisson else 'open/constant') if args.rate else 'closed',
+        "rate": args.rate,
+        "concurrency": None if args.rate else args.concurrency,
+        "image_size": f"{args.size[0]}x{args.size[1]}",
+        "mean_fish_per_image": args.fish,
+    }
+    print(json.dumps(summary, indent=2))
+
+if __name__ == '__main__':
+    main()
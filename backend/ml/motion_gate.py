@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+"""
+Motion gating for fixed camera feeds (sorting tables, fish ladders).
+Consecutive frames from a fixed camera are mostly identical, so each frame is
+first compared with the last processed one at low resolution; YOLO and the
+classifier only run when enough of the scene changed or the keep-alive interval
+has passed. Prints one NDJSON line per processed frame and a summary with skip counts.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+import cv2
+import numpy as np
+
+from classify_fish import process_image, load_models
+
+# Usage: motion_gate.py <source> <output_dir> [--mode diff|mog2] [--min-changed F] [--keepalive S]
+
+# Width the gate works at; the check costs well under a millisecond at this size
+GATE_WIDTH = 160
+# Grey-level difference (0-255) at which a downscaled pixel counts as changed
+DEFAULT_PIXEL_THRESHOLD = 25
+# Fraction of changed pixels that makes a frame worth detecting on
+DEFAULT_MIN_CHANGED = 0.01
+# Seconds after which a frame is processed even if nothing moved
+DEFAULT_KEEPALIVE = 10.0
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+
+class MotionGate:
+    """
+    Decides per frame whether detection should run.
+    mode 'diff' compares against the last frame that was let through, so slow
+    drift still accumulates into a trigger; 'mog2' uses OpenCV's background
+    subtractor, which copes better with flicker and water surface noise.
+    """
+
+    def __init__(self, mode='diff', min_changed=DEFAULT_MIN_CHANGED, pixel_threshold=DEFAULT_PIXEL_THRESHOLD,
+                 keepalive=DEFAULT_KEEPALIVE, width=GATE_WIDTH):
+        if mode not in ('diff', 'mog2'):
+            raise ValueError(f"Unknown gate mode {mode}")
+        self.mode = mode
+        self.min_changed = min_changed
+        self.pixel_threshold = pixel_threshold
+        self.keepalive = keepalive
+        self.width = width
+        self.reference = None
+        self.last_processed_at = None
+        self.subtractor = None
+        if mode == 'mog2':
+            self.subtractor = cv2.createBackgroundSubtractorMOG2(history=200, varThreshold=pixel_threshold,
+                                                                 detectShadows=False)
+        self.frames = 0
+        self.processed = 0
+        self.skipped = 0
+        self.skipped_since_processed = 0
+
+    def _small_gray(self, frame):
+        h, w = frame.shape[:2]
+        scale = self.width / float(w)
+        small = cv2.resize(frame, (self.width, max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def changed_fraction(self, gray):
+        if self.mode == 'mog2':
+            mask = self.subtractor.apply(gray)
+            return float(np.count_nonzero(mask)) / mask.size
+        if self.reference is None:
+            return 1.0
+        diff = cv2.absdiff(gray, self.reference)
+        return float(np.count_nonzero(diff >= self.pixel_threshold)) / diff.size
+
+    def check(self, frame, timestamp):
+        """
+        Returns (process, reason, changed) for a BGR frame; timestamp is in seconds.
+        reason is 'first', 'motion' or 'keepalive' when processing, else 'static'.
+        """
+        self.frames += 1
+        gray = self._small_gray(frame)
+        changed = self.changed_fraction(gray)
+
+        if self.last_processed_at is None:
+            reason = 'first'
+        elif changed >= self.min_changed:
+            reason = 'motion'
+        elif self.keepalive and timestamp - self.last_processed_at >= self.keepalive:
+            reason = 'keepalive'
+        else:
+            self.skipped += 1
+            self.skipped_since_processed += 1
+            return False, 'static', changed
+
+        self.reference = gray
+        self.last_processed_at = timestamp
+        self.processed += 1
+        return True, reason, changed
+
+    def take_skipped(self):
+        """Frames skipped since the previous processed frame, resetting the count"""
+        skipped, self.skipped_since_processed = self.skipped_since_processed, 0
+        return skipped
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "frames_processed": self.processed,
+            "frames_skipped": self.skipped,
+            "skip_ratio": round(self.skipped / self.frames, 4) if self.frames else None
+        }
+
+def read_frames(source):
+    """Yield (index, timestamp_seconds, frame) from a video file, camera index or image directory"""
+    if os.path.isdir(source):
+        names = sorted(n for n in os.listdir(source) if n.lower().endswith(IMAGE_EXTENSIONS))
+        started = time.monotonic()
+        for i, name in enumerate(names):
+            frame = cv2.imread(os.path.join(source, name))
+            if frame is not None:
+                yield i, time.monotonic() - started, frame
+        return
+
+    capture = cv2.VideoCapture(int(source) if source.isdigit() else source)
+    if not capture.isOpened():
+        raise IOError(f"Could not open feed {source}")
+    live = source.isdigit()
+    started = time.monotonic()
+    i = 0
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                return
+            # Files keep their own clock so keep-alive means the same thing at any decode speed
+            position = capture.get(cv2.CAP_PROP_POS_MSEC) / 1000.0
+            timestamp = time.monotonic() - started if live or position <= 0 else position
+            yield i, timestamp, frame
+            i += 1
+    finally:
+        capture.release()
+
+def run_feed(source, output_dir, models, gate, padding=20, max_frames=None, on_result=None):
+    """Gate every frame of a feed and run process_image on the ones that pass"""
+    os.makedirs(output_dir, exist_ok=True)
+    detect_seconds = 0.0
+    for index, timestamp, frame in read_frames(source):
+        if max_frames is not None and index >= max_frames:
+            break
+        process, reason, changed = gate.check(frame, timestamp)
+        if not process:
+            continue
+
+        started = time.perf_counter()
+        output_path = os.path.join(output_dir, f"frame_{index:06d}.jpg")
+        result = process_image(f"{source}#{index}", output_path, padding, models=models, image=frame)
+        detect_seconds += time.perf_counter() - started
+        result.update({"frame": index, "timestamp": round(timestamp, 3), "gate": reason,
+                       "changed": round(changed, 4), "frames_skipped": gate.take_skipped()})
+        if on_result is not None:
+            on_result(result)
+
+    summary = gate.stats()
+    summary["detect_seconds"] = round(detect_seconds, 3)
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Detect and classify fish on a fixed camera feed, skipping static frames")
+    parser.add_argument('source', help="video file, camera index or directory of frames")
+    parser.add_argument('output_dir', help="annotated processed frames are written here")
+    parser.add_argument('padding', nargs='?', type=int, default=20)
+    parser.add_argument('--mode', choices=['diff', 'mog2'], default='diff',
+                        help="diff: compare with the last processed frame; mog2: background subtraction")
+    parser.add_argument('--min-changed', type=float, default=DEFAULT_MIN_CHANGED,
+                        help="fraction of downscaled pixels that must change to run detection")
+    parser.add_argument('--pixel-threshold', type=float, default=DEFAULT_PIXEL_THRESHOLD,
+                        help="grey-level change at which a pixel counts as changed")
+    parser.add_argument('--keepalive', type=float, default=DEFAULT_KEEPALIVE,
+                        help="process a frame at least this often in seconds, 0 to disable")
+    parser.add_argument('--max-frames', type=int, default=None)
+    parser.add_argument('--stub-models', action='store_true',
+                        help="use the lightweight stand-in models from stub_models.py (testing only)")
+    args = parser.parse_args()
+
+    def emit(result):
+        sys.stdout.write(json.dumps({"event": "frame", **result}) + "\n")
+        sys.stdout.flush()
+
+    try:
+        models = load_models(os.path.dirname(os.path.abspath(__file__)), stub=args.stub_models)
+        gate = MotionGate(args.mode, args.min_changed, args.pixel_threshold, args.keepalive)
+        summary = run_feed(args.source, args.output_dir, models, gate, args.padding, args.max_frames, emit)
+        print(json.dumps({"event": "summary", "success": True, **summary}))
+    except Exception as e:
+        print(json.dumps({"event": "summary", "success": False, "error": str(e)}))
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
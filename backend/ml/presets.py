@@ -0,0 +1,188 @@
+"""
+Named speed/accuracy presets for process_image.
+Each preset bundles the detector input size and thresholds, which converted
+artifact to run (backend and precision), and whether to classify and render.
+Converted artifacts come from convert_models_to_tflite.py --matrix; when the one
+a preset asks for is missing, the native .pt/.h5 models are used instead.
+"""
+import os
+
+import cv2
+import numpy as np
+
+from runtime_config import MODELS_DIR, make_tflite_interpreter, make_onnx_session
+
+EXPORT_DIR = os.path.join(MODELS_DIR, 'exports')
+# Matches CLASSIFIER_SIZE in convert_models_to_tflite.py
+CLASSIFIER_SIZE = 224
+
+PRESETS = {
+    # Fish count only: small input, no classifier, no annotated image
+    # Duplicate boxes are merged so each fish is counted once
+    'count-only': {"imgsz": 320, "conf": 0.35, "iou": 0.5, "backend": "tflite", "precision": "int8",
+                   "classify": False, "render": False, "dedup_mode": "merge"},
+    'fast': {"imgsz": 416, "conf": 0.3, "iou": 0.5, "backend": "tflite", "precision": "fp16",
+             "classify": True, "render": False},
+    # Same as running without a preset
+    'balanced': {"imgsz": 640, "conf": 0.25, "iou": 0.7, "backend": "native", "precision": "fp32",
+                 "classify": True, "render": True},
+    'accurate': {"imgsz": 640, "conf": 0.15, "iou": 0.7, "backend": "native", "precision": "fp32",
+                 "classify": True, "render": True, "dedup": False},
+}
+DEFAULT_PRESET = 'balanced'
+
+# (backend, precision, imgsz, classify) -> loaded (detector, classifier), per process
+_model_cache = {}
+
+def get_preset(name):
+    if name not in PRESETS:
+        raise ValueError(f"Unknown preset {name}; choose from {', '.join(PRESETS)}")
+    return PRESETS[name]
+
+def preset_options(name):
+    """process_image keyword arguments for a preset, excluding the models"""
+    preset = get_preset(name)
+    options = {
+        "predict_options": {"imgsz": preset["imgsz"], "conf": preset["conf"], "iou": preset["iou"]},
+        "classify": preset["classify"],
+        "render": preset["render"],
+    }
+    for key in ("dedup", "dedup_mode"):
+        if key in preset:
+            options[key] = preset[key]
+    return options
+
+def artifact_paths(preset):
+    """Converted (detector, classifier) paths a preset wants, or None for the native models"""
+    if preset["backend"] == 'native':
+        return None
+    ext, precision = preset["backend"], preset["precision"]
+    return (os.path.join(EXPORT_DIR, f"yolov8sfish_{preset['imgsz']}_{precision}.{ext}"),
+            os.path.join(EXPORT_DIR, f"fishclass_{CLASSIFIER_SIZE}_{precision}.{ext}"))
+
+class ArtifactModel:
+    """A converted TFLite or ONNX artifact loaded through the tuned runtime config factories"""
+
+    def __init__(self, path):
+        self.path = path
+        if path.endswith('.tflite'):
+            self.interpreter = make_tflite_interpreter(path)
+            self.input = self.interpreter.get_input_details()[0]
+            self.output = self.interpreter.get_output_details()[0]
+            self.session = None
+            self.input_shape = [int(d) for d in self.input['shape']]
+        else:
+            self.session = make_onnx_session(path)
+            self.input = self.session.get_inputs()[0]
+            self.input_shape = [d if isinstance(d, int) else 1 for d in self.input.shape]
+
+    def run(self, batch):
+        """Output for an NHWC float batch, transposed and quantized as the artifact expects"""
+        batch = np.asarray(batch, dtype=np.float32)
+        if self.session is not None:
+            if self.input_shape[1] == 3:
+                batch = np.transpose(batch, (0, 3, 1, 2))
+            dtype = np.float16 if 'float16' in self.input.type else np.float32
+            return self.session.run(None, {self.input.name: batch.astype(dtype)})[0]
+
+        inp, out = self.input, self.output
+        if inp['dtype'] in (np.int8, np.uint8):
+            scale, zero_point = inp['quantization']
+            info = np.iinfo(inp['dtype'])
+            batch = np.clip(np.round(batch / scale + zero_point), info.min, info.max)
+        self.interpreter.set_tensor(inp['index'], batch.astype(inp['dtype']))
+        self.interpreter.invoke()
+        preds = self.interpreter.get_tensor(out['index'])
+        if out['dtype'] in (np.int8, np.uint8):
+            scale, zero_point = out['quantization']
+            preds = (preds.astype(np.float32) - zero_point) * scale
+        return preds
+
+class ArtifactClassifier(ArtifactModel):
+    """Runs a converted classifier with the predict(batch, verbose=0) surface of the Keras model"""
+
+    def predict(self, batch, verbose=0, **kwargs):
+        return self.run(batch)
+
+class _Array:
+    """Stands in for the tensors ultralytics returns, which callers read with .cpu().numpy()"""
+
+    def __init__(self, array):
+        self.array = array
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.array
+
+class _Boxes:
+    def __init__(self, xyxy, conf):
+        self.xyxy = _Array(xyxy)
+        self.conf = _Array(conf)
+
+class _Result:
+    def __init__(self, xyxy, conf):
+        self.boxes = _Boxes(xyxy, conf)
+
+class ArtifactDetector(ArtifactModel):
+    """
+    Runs a converted YOLOv8 detector with the predict(img, conf=, iou=) surface
+    process_image uses: letterbox, decode, NMS. Loading it through the runtime
+    config factories (rather than ultralytics) applies the tuned thread and
+    delegate settings to the detector too.
+    """
+
+    def predict(self, img, verbose=False, imgsz=None, conf=0.25, iou=0.7, max_det=300, **kwargs):
+        # The artifact's input size is fixed at export; imgsz only selected the artifact
+        size = self.input_shape[2] if self.input_shape[1] == 3 else self.input_shape[1]
+        h, w = img.shape[:2]
+        scale = min(size / h, size / w)
+        new_w, new_h = int(round(w * scale)), int(round(h * scale))
+        pad_x, pad_y = (size - new_w) // 2, (size - new_h) // 2
+        canvas = np.full((size, size, 3), 114, dtype=np.uint8)
+        canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = cv2.resize(img, (new_w, new_h))
+        batch = canvas[None, :, :, ::-1].astype(np.float32) / 255.0
+
+        raw = np.asarray(self.run(batch))[0]
+        # (4 + classes, anchors) -> (anchors, 4 + classes)
+        pred = raw.T if raw.shape[0] < raw.shape[1] else raw
+        xywh = pred[:, :4].astype(np.float32)
+        # Some exports emit normalized coordinates, others pixels
+        if xywh.size and xywh.max() <= 2.0:
+            xywh = xywh * size
+        scores = pred[:, 4:].max(axis=1) if pred.shape[1] > 4 else np.zeros(len(pred), dtype=np.float32)
+        keep = scores >= conf
+        xywh, scores = xywh[keep], scores[keep]
+
+        xyxy = np.empty((0, 4), dtype=np.float32)
+        if len(scores):
+            corners = np.stack([xywh[:, 0] - xywh[:, 2] / 2, xywh[:, 1] - xywh[:, 3] / 2, xywh[:, 2], xywh[:, 3]], 1)
+            picked = np.asarray(cv2.dnn.NMSBoxes(corners.tolist(), scores.tolist(), conf, iou), dtype=int).reshape(-1)
+            picked = picked[np.argsort(-scores[picked])][:max_det]
+            x1 = (corners[picked, 0] - pad_x) / scale
+            y1 = (corners[picked, 1] - pad_y) / scale
+            x2 = x1 + corners[picked, 2] / scale
+            y2 = y1 + corners[picked, 3] / scale
+            xyxy = np.stack([x1.clip(0, w), y1.clip(0, h), x2.clip(0, w), y2.clip(0, h)], 1)
+            scores = scores[picked]
+        return [_Result(xyxy, np.asarray(scores, dtype=np.float32))]
+
+def models_for_preset(name, default_models, stub=False):
+    """
+    Returns (models, backend) for a preset. Native presets and stub runs reuse
+    default_models; converted artifacts are loaded once per process and cached.
+    """
+    preset = get_preset(name)
+    paths = artifact_paths(preset)
+    # Presets that skip classification do not need the classifier artifact
+    needed = paths if paths is None or preset["classify"] else paths[:1]
+    if stub or needed is None or not all(os.path.exists(p) for p in needed):
+        return default_models, 'native'
+
+    key = (preset["backend"], preset["precision"], preset["imgsz"], preset["classify"])
+    if key not in _model_cache:
+        detector_path, classifier_path = paths
+        classifier = ArtifactClassifier(classifier_path) if preset["classify"] else None
+        _model_cache[key] = (ArtifactDetector(detector_path), classifier)
+    return _model_cache[key], f"{preset['backend']}/{preset['precision']}"
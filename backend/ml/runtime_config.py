@@ -0,0 +1,83 @@
+"""
+Tuned interpreter settings for converted TFLite and ONNX artifacts.
+convert_models_to_tflite.py --autotune writes models/runtime_config.json for the
+current machine; the factories here apply it whenever an artifact is loaded.
+"""
+import os
+import json
+import platform
+
+MODELS_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..', 'models'))
+RUNTIME_CONFIG_PATH = os.path.join(MODELS_DIR, 'runtime_config.json')
+
+ONNX_OPT_LEVELS = ('ORT_DISABLE_ALL', 'ORT_ENABLE_BASIC', 'ORT_ENABLE_EXTENDED', 'ORT_ENABLE_ALL')
+
+_config_cache = {}
+
+def host_fingerprint():
+    """Identifies the CPU a config was tuned on"""
+    return {"machine": platform.machine(), "processor": platform.processor() or platform.machine(),
+            "cpu_count": os.cpu_count(), "system": platform.system()}
+
+def load_runtime_config(path=RUNTIME_CONFIG_PATH):
+    """Parsed runtime config, or an empty one when none was written; cached per file mtime"""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return {"artifacts": {}}
+    cached = _config_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path) as f:
+        config = json.load(f)
+    _config_cache[path] = (mtime, config)
+    return config
+
+def artifact_key(model_path):
+    return os.path.relpath(os.path.abspath(model_path), MODELS_DIR).replace('\\', '/')
+
+def settings_for(model_path, config=None):
+    """Tuned settings for an artifact, or {} if it was never tuned or has changed since"""
+    config = config if config is not None else load_runtime_config()
+    if config.get("host") and config["host"] != host_fingerprint():
+        return {}
+    entry = config.get("artifacts", {}).get(artifact_key(model_path))
+    if not entry or entry.get("size_bytes") != os.path.getsize(model_path):
+        return {}
+    return entry.get("settings", {})
+
+def make_tflite_interpreter(model_path, settings=None):
+    """tf.lite (or tflite_runtime) interpreter with tensors allocated and tuned settings applied"""
+    try:
+        import tensorflow as tf
+        Interpreter = tf.lite.Interpreter
+        no_delegates = tf.lite.experimental.OpResolverType.BUILTIN_WITHOUT_DEFAULT_DELEGATES
+    except ImportError:
+        from tflite_runtime.interpreter import Interpreter, OpResolverType
+        no_delegates = OpResolverType.BUILTIN_WITHOUT_DEFAULT_DELEGATES
+
+    settings = settings_for(model_path) if settings is None else settings
+    kwargs = {"model_path": model_path}
+    if settings.get("num_threads"):
+        kwargs["num_threads"] = settings["num_threads"]
+    if settings.get("xnnpack") is False:
+        kwargs["experimental_op_resolver_type"] = no_delegates
+    interpreter = Interpreter(**kwargs)
+    interpreter.allocate_tensors()
+    return interpreter
+
+def make_onnx_session(model_path, settings=None):
+    """CPU onnxruntime session with tuned thread counts and graph optimization level"""
+    import onnxruntime as ort
+
+    settings = settings_for(model_path) if settings is None else settings
+    options = ort.SessionOptions()
+    if settings.get("intra_op_num_threads"):
+        options.intra_op_num_threads = settings["intra_op_num_threads"]
+    if settings.get("inter_op_num_threads"):
+        options.inter_op_num_threads = settings["inter_op_num_threads"]
+    if settings.get("graph_optimization_level"):
+        options.graph_optimization_level = getattr(ort.GraphOptimizationLevel, settings["graph_optimization_level"])
+    if settings.get("execution_mode") == 'parallel':
+        options.execution_mode = ort.ExecutionMode.ORT_PARALLEL
+    return ort.InferenceSession(model_path, sess_options=options, providers=['CPUExecutionProvider'])
@@ -0,0 +1,187 @@
+"""
+Prometheus text-format metrics for the classifier service.
+Kept dependency-free so the service runs without prometheus_client installed.
+"""
+import sys
+import time
+import threading
+
+PREFIX = 'fishvision'
+
+# Upper bounds in seconds; covers fast crops through slow cold requests
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55)
+
+def read_rss_bytes():
+    """Current resident set size of this process, falling back to peak RSS off Linux"""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is bytes on macOS and kilobytes elsewhere
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except (ImportError, OSError):
+        return 0
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    parts = []
+    for key, value in labels:
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by a tuple of (label, value) pairs"""
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self.series = {}
+
+    def observe(self, value, labels=()):
+        counts, total = self.series.get(labels, ([0] * len(self.buckets), [0, 0.0]))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        total[0] += 1
+        total[1] += value
+        self.series[labels] = (counts, total)
+
+    def render(self, name):
+        lines = []
+        for labels, (counts, total) in sorted(self.series.items()):
+            for bound, count in zip(self.buckets, counts):
+                le = _format_labels(labels + (('le', _format_value(float(bound))),))
+                lines.append(f"{name}_bucket{le} {count}")
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {total[0]}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(total[1])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {total[0]}")
+        return lines
+
+class ServiceMetrics:
+    """Thread-safe metric registry fed by ClassifierService"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.requests = {}
+        self.presets = {}
+        self.labels = {}
+        self.stage_seconds = Histogram(LATENCY_BUCKETS)
+        self.batch_size = Histogram(COUNT_BUCKETS)
+        self.detections = Histogram(COUNT_BUCKETS)
+        self.model_load_seconds = 0.0
+        self.worker_rss = {}
+        self.recycles = {}
+        self.queue_depth = lambda: 0
+
+    def set_model_load_time(self, seconds):
+        with self._lock:
+            self.model_load_seconds = seconds
+
+    def observe_worker_rss(self, worker, rss):
+        with self._lock:
+            self.worker_rss[worker] = rss
+
+    def observe_recycle(self, reason):
+        with self._lock:
+            self.recycles[reason] = self.recycles.get(reason, 0) + 1
+
+    def bind_queue(self, depth_fn):
+        """Register a callable sampled for the queue depth gauge at scrape time"""
+        self.queue_depth = depth_fn
+
+    def observe_request(self, result, queue_seconds, total_seconds, preset=None):
+        if result.get('expired'):
+            status = 'expired'
+        elif result.get('queue_full'):
+            status = 'rejected'
+        elif not result.get('success'):
+            status = 'error'
+        else:
+            status = 'partial' if result.get('partial') else 'ok'
+
+        with self._lock:
+            self.requests[status] = self.requests.get(status, 0) + 1
+            # Requests without a preset run the balanced defaults
+            preset_key = (preset or result.get('preset') or 'default', status)
+            self.presets[preset_key] = self.presets.get(preset_key, 0) + 1
+            if queue_seconds is not None:
+                self.stage_seconds.observe(queue_seconds, (('stage', 'queue'),))
+            if status in ('ok', 'partial'):
+                for stage, seconds in result.get('timings', {}).items():
+                    self.stage_seconds.observe(seconds, (('stage', stage),))
+                self.stage_seconds.observe(total_seconds, (('stage', 'total'),))
+                # Crops sent to the classifier for one image form its inference batch
+                self.batch_size.observe(result.get('classifier_calls', 0))
+                self.detections.observe(result.get('fish_count', 0))
+                for det in result.get('detections', []):
+                    # Count-only presets report boxes without running the classifier
+                    label = det.get('label')
+                    if label is None:
+                        continue
+                    self.labels[label] = self.labels.get(label, 0) + 1
+
+    def render(self):
+        with self._lock:
+            lines = []
+
+            def metric(name, kind, help_text):
+                lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+                lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+                return f"{PREFIX}_{name}"
+
+            name = metric('requests_total', 'counter', 'Classification requests by outcome.')
+            for status, count in sorted(self.requests.items()):
+                lines.append(f"{name}{_format_labels((('status', status),))} {count}")
+
+            name = metric('preset_requests_total', 'counter', 'Classification requests by preset and outcome.')
+            for (preset, status), count in sorted(self.presets.items()):
+                lines.append(f"{name}{_format_labels((('preset', preset), ('status', status)))} {count}")
+
+            name = metric('stage_seconds', 'histogram', 'Latency per processing stage in seconds.')
+            lines.extend(self.stage_seconds.render(name))
+
+            name = metric('classifier_batch_size', 'histogram', 'Crops classified per request.')
+            lines.extend(self.batch_size.render(name))
+
+            name = metric('detections_per_image', 'histogram', 'Fish detected per image.')
+            lines.extend(self.detections.render(name))
+
+            name = metric('predictions_total', 'counter', 'Classifier predictions by label.')
+            for label, count in sorted(self.labels.items()):
+                lines.append(f"{name}{_format_labels((('label', label),))} {count}")
+
+            name = metric('queue_depth', 'gauge', 'Requests waiting for a worker.')
+            lines.append(f"{name} {self.queue_depth()}")
+
+            name = metric('model_load_seconds', 'gauge', 'Time taken to load the models at startup.')
+            lines.append(f"{name} {_format_value(self.model_load_seconds)}")
+
+            name = metric('resident_memory_bytes', 'gauge', 'Resident set size of the service process.')
+            lines.append(f"{name} {read_rss_bytes()}")
+
+            name = metric('worker_resident_memory_bytes', 'gauge', 'RSS of each worker after its latest request.')
+            for worker, rss in sorted(self.worker_rss.items()):
+                lines.append(f"{name}{_format_labels((('worker', worker),))} {rss}")
+
+            name = metric('worker_recycles_total', 'counter', 'Worker restarts by reason.')
+            for reason, count in sorted(self.recycles.items()):
+                lines.append(f"{name}{_format_labels((('reason', reason),))} {count}")
+
+            name = metric('uptime_seconds', 'gauge', 'Seconds since the service started.')
+            lines.append(f"{name} {_format_value(time.time() - self.started_at)}")
+
+            return '\n'.join(lines) + '\n'
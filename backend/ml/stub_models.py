@@ -0,0 +1,83 @@
+"""
+Lightweight stand-ins for the YOLO detector and Keras classifier.
+They expose the same call surface process_image uses, so the pipeline, the
+service and the load tester can run on machines without the real weights.
+"""
+import time
+import cv2
+import numpy as np
+
+# Simulated per-call cost, roughly a small CPU model
+DEFAULT_DETECT_SECONDS = 0.03
+DEFAULT_CLASSIFY_SECONDS = 0.01
+
+class _Tensor:
+    """Minimal torch-like wrapper supporting .cpu().numpy()"""
+
+    def __init__(self, array):
+        self._array = array
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self._array
+
+class _Boxes:
+    def __init__(self, xyxy, conf):
+        self.xyxy = _Tensor(np.asarray(xyxy, dtype=np.float32).reshape(-1, 4))
+        self.conf = _Tensor(np.asarray(conf, dtype=np.float32))
+
+class _Result:
+    def __init__(self, xyxy, conf):
+        self.boxes = _Boxes(xyxy, conf)
+
+class StubDetector:
+    """Finds bright blobs on a dark background, like the fish drawn by load_test.synthetic_image"""
+
+    def __init__(self, latency=DEFAULT_DETECT_SECONDS, threshold=100, min_area=64, duplicate_every=0):
+        self.latency = latency
+        self.threshold = threshold
+        self.min_area = min_area
+        # Emit a jittered copy of every Nth box to mimic YOLO's overlapping duplicates
+        self.duplicate_every = duplicate_every
+
+    def predict(self, img, verbose=False, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY) if img.ndim == 3 else img
+        _, mask = cv2.threshold(gray, self.threshold, 255, cv2.THRESH_BINARY)
+        contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        boxes, conf = [], []
+        for i, contour in enumerate(contours):
+            x, y, w, h = cv2.boundingRect(contour)
+            if w * h < self.min_area:
+                continue
+            boxes.append([x, y, x + w, y + h])
+            conf.append(0.9)
+            if self.duplicate_every and i % self.duplicate_every == 0:
+                boxes.append([x + 2, y + 2, x + w - 2, y + h - 2])
+                conf.append(0.6)
+        return [_Result(boxes, conf)]
+
+class StubClassifier:
+    """Deterministic classifier keyed on the crop's mean colour"""
+
+    def __init__(self, num_classes=31, latency=DEFAULT_CLASSIFY_SECONDS):
+        self.num_classes = num_classes
+        self.latency = latency
+
+    def predict(self, batch, verbose=0, **kwargs):
+        batch = np.asarray(batch)
+        if self.latency:
+            time.sleep(self.latency * len(batch))
+        preds = np.full((len(batch), self.num_classes), 0.1 / self.num_classes, dtype=np.float32)
+        for i, img in enumerate(batch):
+            class_id = int(img.mean() * 1000) % self.num_classes
+            preds[i, class_id] += 0.9
+        return preds
+
+def load_stub_models(detect_latency=DEFAULT_DETECT_SECONDS, classify_latency=DEFAULT_CLASSIFY_SECONDS):
+    """Return a (detector, classifier) pair shaped like safe_load_models()"""
+    return StubDetector(latency=detect_latency), StubClassifier(latency=classify_latency)
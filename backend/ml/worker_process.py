@@ -0,0 +1,175 @@
+"""
+Isolated classifier worker processes with memory accounting and recycling.
+TensorFlow and ultralytics grow RSS slowly over many predictions; running the
+models in a child process lets the service replace it before the OS kills it.
+"""
+import time
+import logging
+import multiprocessing
+
+from classify_fish import process_image, load_models
+from presets import models_for_preset, preset_options
+from service_metrics import read_rss_bytes
+
+log = logging.getLogger('classifier_service')
+
+# Request fields forwarded to process_image
+PROCESS_OPTIONS = ('padding', 'dedup', 'dedup_iou', 'dedup_containment', 'dedup_mode', 'species_summary')
+
+# Spawn rather than fork so children never inherit TensorFlow thread state
+_mp = multiprocessing.get_context('spawn')
+
+def run_request(models, request, deadline, stub=False):
+    """Run one service request dict through process_image, never raising"""
+    try:
+        options = {}
+        preset = request.get('preset')
+        if preset:
+            # Explicit request fields still override the preset's bundle
+            options.update(preset_options(preset))
+            models, backend = models_for_preset(preset, models, stub=stub)
+        options.update({k: request[k] for k in PROCESS_OPTIONS if k in request})
+        result = process_image(request['image_path'], request['output_path'], models=models,
+                               deadline=deadline, **options)
+        if preset:
+            result.update({"preset": preset, "backend": backend})
+        return result
+    except Exception as e:
+        return {"success": False, "error": str(e)}
+
+def _worker_main(conn, base_dir, stub):
+    """Child process loop: load models once, then answer (request, deadline) messages until None"""
+    started = time.perf_counter()
+    try:
+        models = load_models(base_dir, stub=stub)
+    except Exception as e:
+        conn.send(('error', str(e)))
+        return
+    conn.send(('ready', {"load_seconds": time.perf_counter() - started, "rss": read_rss_bytes()}))
+
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        request, deadline = message
+        result = run_request(models, request, deadline, stub)
+        conn.send(('result', result, read_rss_bytes()))
+
+class WorkerCrashed(RuntimeError):
+    """Raised when a worker process exits while handling a request"""
+
+class RecyclePolicy:
+    """Decides when a worker should be replaced: after max_requests, or above max_rss_bytes"""
+
+    def __init__(self, max_requests=None, max_rss_bytes=None):
+        self.max_requests = max_requests
+        self.max_rss_bytes = max_rss_bytes
+
+    def reason(self, worker):
+        if self.max_requests and worker.requests >= self.max_requests:
+            return 'max_requests'
+        if self.max_rss_bytes and worker.rss >= self.max_rss_bytes:
+            return 'max_rss'
+        return None
+
+    def check_baseline(self, worker):
+        """
+        Raise ValueError when a freshly started worker is already at the RSS ceiling:
+        it would be recycled after every request.
+        """
+        if self.max_rss_bytes and worker.baseline_rss >= self.max_rss_bytes:
+            raise ValueError(f"Worker {worker.slot} uses {worker.baseline_rss / 2**20:.0f} MB right after loading "
+                             f"models, above the {self.max_rss_bytes / 2**20:.0f} MB RSS ceiling")
+
+class WorkerProcess:
+    """Handle on one child process plus the memory it has accumulated"""
+
+    def __init__(self, slot, base_dir, stub=False):
+        self.slot = slot
+        self.generation = 0
+        self.base_dir = base_dir
+        self.stub = stub
+        self.process = None
+        self.conn = None
+        self.load_seconds = 0.0
+        self.crashed = False
+
+    def start(self):
+        parent_conn, child_conn = _mp.Pipe()
+        self.process = _mp.Process(target=_worker_main, args=(child_conn, self.base_dir, self.stub),
+                                   name=f"classifier-worker-{self.slot}", daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.conn = parent_conn
+        self.generation += 1
+
+        try:
+            message = self.conn.recv()
+        except EOFError:
+            message = ('error', f"worker exited with code {self.process.exitcode} while loading models")
+        if message[0] != 'ready':
+            self.process.join()
+            # Nothing left to stop; a later start() replaces it
+            self.conn.close()
+            self.process = None
+            raise RuntimeError(f"Worker {self.slot} failed to start: {message[1]}")
+
+        info = message[1]
+        self.load_seconds = info["load_seconds"]
+        self.crashed = False
+        self.requests = 0
+        self.baseline_rss = self.rss = info["rss"]
+        # Largest single-request RSS jump, to point at the inputs that leak
+        self.worst_delta = 0
+        self.worst_request = None
+        log.info("Worker %s started (pid %s, generation %s): models loaded in %.2fs, RSS %.1f MB",
+                 self.slot, self.pid, self.generation, self.load_seconds, self.rss / 2**20)
+        return self
+
+    @property
+    def pid(self):
+        return self.process.pid if self.process else None
+
+    def run(self, request, deadline):
+        try:
+            self.conn.send((request, deadline))
+            _, result, rss = self.conn.recv()
+        except (EOFError, OSError, BrokenPipeError):
+            self.process.join(timeout=1)
+            self.crashed = True
+            raise WorkerCrashed(f"Worker {self.slot} (pid {self.pid}) exited with code {self.process.exitcode}")
+
+        delta = rss - self.rss
+        if delta > self.worst_delta:
+            self.worst_delta = delta
+            self.worst_request = request.get('image_path')
+        self.rss = rss
+        self.requests += 1
+        return result
+
+    def stop(self, reason='shutdown'):
+        """Finish gracefully: the current request has already returned, so nothing is dropped"""
+        if self.process is None:
+            return
+        if self.process.is_alive():
+            try:
+                self.conn.send(None)
+            except (OSError, BrokenPipeError):
+                pass
+            self.process.join(timeout=10)
+            if self.process.is_alive():
+                self.process.terminate()
+                self.process.join()
+        log.info("Worker %s stopped (pid %s, reason %s): %s requests, RSS %.1f MB (+%.1f MB since start), "
+                 "largest single-request growth %.1f MB on %s",
+                 self.slot, self.pid, reason, self.requests, self.rss / 2**20,
+                 (self.rss - self.baseline_rss) / 2**20, self.worst_delta / 2**20, self.worst_request)
+        self.conn.close()
+        self.process = None
+
+    def recycle(self, reason):
+        self.stop(reason)
+        return self.start()
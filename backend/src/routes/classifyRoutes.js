@@ -23,7 +23,80 @@ const storage = multer.diskStorage({
 
 const upload = multer({ storage });
 
+// convert an output_image path to a URL served from /uploads
+function outputImageUrl(req, outputImage) {
+  const rel = path
+    .relative(path.join(__dirname, "..", "..", "data"), outputImage)
+    .replace(/\\/g, "/");
+  return `${req.protocol}://${req.get("host")}/${rel}`;
+}
+
+function wantsStream(req) {
+  return (
+    req.query.stream === "1" ||
+    (req.get("accept") || "").includes("text/event-stream")
+  );
+}
+
+// Forward classify_fish.py --stream NDJSON lines as server-sent events
+function streamClassification(req, res, py) {
+  res.set({
+    "Content-Type": "text/event-stream",
+    "Cache-Control": "no-cache",
+    Connection: "keep-alive",
+  });
+  res.flushHeaders();
+
+  const send = (event) => {
+    if (event.event === "summary" && event.output_image) {
+      event.output_image_url = outputImageUrl(req, event.output_image);
+    }
+    res.write(`event: ${event.event}\ndata: ${JSON.stringify(event)}\n\n`);
+  };
+
+  let buffered = "";
+  let stderr = "";
+  let summarySent = false;
+  py.stdout.on("data", (data) => {
+    buffered += data.toString();
+    const lines = buffered.split("\n");
+    buffered = lines.pop();
+    for (const line of lines) {
+      if (!line.trim()) continue;
+      try {
+        const event = JSON.parse(line);
+        if (event.event === "summary") summarySent = true;
+        send(event);
+      } catch (err) {
+        console.error("Parse stream line error", err, line);
+      }
+    }
+  });
+  py.stderr.on("data", (data) => {
+    stderr += data.toString();
+  });
+
+  // stop the classifier if the client goes away mid-stream
+  res.on("close", () => {
+    if (!res.writableEnded && py.exitCode === null) py.kill();
+  });
+
+  py.on("close", (code) => {
+    if (!summarySent) {
+      console.error("Python error:", stderr);
+      send({
+        event: "summary",
+        success: false,
+        message: "Classification failed",
+        error: stderr || `exit code ${code}`,
+      });
+    }
+    res.end();
+  });
+}
+
 // POST /api/classify - accepts multipart form with field 'image'
+// Send Accept: text/event-stream or ?stream=1 to receive each detection as an SSE event
 router.post("/", upload.single("image"), async (req, res) => {
   try {
     if (!req.file)
@@ -51,7 +124,17 @@ router.post("/", upload.single("image"), async (req, res) => {
       (req.body.padding || 20).toString(),
     ];
 
+    // optional speed/accuracy preset, e.g. "count-only" for a quick fish count
+    if (req.body.preset) args.push("--preset", String(req.body.preset));
+    // species_id when the label has a shipped catalog record; the compact species record only on request
+    if (req.body.speciesSummary === true || req.body.speciesSummary === "true") args.push("--species-summary");
+
+    const stream = wantsStream(req);
+    if (stream) args.push("--stream");
+
     const py = spawn(python, args, { cwd: path.join(__dirname, "..", "..") });
+    if (stream) return streamClassification(req, res, py);
+
     let stdout = "";
     let stderr = "";
     py.stdout.on("data", (data) => {
@@ -77,15 +160,7 @@ router.post("/", upload.single("image"), async (req, res) => {
         const result = JSON.parse(stdout);
         // convert output_image to URL path
         if (result.output_image) {
-          const rel = path
-            .relative(
-              path.join(__dirname, "..", "..", "data"),
-              result.output_image
-            )
-            .replace(/\\/g, "/");
-          result.output_image_url = `${req.protocol}://${req.get(
-            "host"
-          )}/${rel}`;
+          result.output_image_url = outputImageUrl(req, result.output_image);
         }
         return res.json(result);
       } catch (err) {